@@ -0,0 +1,208 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+""" BiosDiff Command for rdmc """
+
+import sys
+import json
+
+from optparse import OptionParser
+from rdmc_base_classes import RdmcCommandBase
+from rdmc_helper import ReturnCodes, InvalidCommandLineError, \
+                    InvalidCommandLineErrorOPTS, NoContentsFoundForOperationError
+from rdmc_bios_diff import ConfigGroups, bios_path, bios_attributes, \
+                    read_baseline
+from rdmc_fleet import read_serverlist, run_on_servers, open_session, \
+                    add_fleet_options
+
+#servers listed per configuration in the console report
+LISTEDHOSTS = 10
+
+class BiosDiffCommand(RdmcCommandBase):
+    """ Compare the BIOS configurations of many servers """
+    def __init__(self, rdmcObj):
+        RdmcCommandBase.__init__(self,\
+            name='biosdiff',\
+            usage='biosdiff --multiprocessing [FILENAME] [OPTIONS]\n\n\t'\
+                    'Collect the BIOS settings of every server of the file, '\
+                    'group the\n\tservers with identical settings and show how '\
+                    'each group differs\n\tfrom the most common settings.\n\t'\
+                    'example: biosdiff --multiprocessing servers.txt\n\n\t'\
+                    'Compare with the settings of a file written by the save '\
+                    'command\n\tinstead.\n\texample: biosdiff --multiprocessing'\
+                    ' servers.txt --baseline\n\tbios.json -f report.json\n\n\t'\
+                    'The server file holds one --url URL -u USER -p PASSWORD '\
+                    'line\n\tper server, as used by the load command.',\
+            summary='Finds the differences between the BIOS settings of many '\
+                    'servers.',\
+            aliases=['biosdiff'],\
+            optparser=OptionParser())
+        self.definearguments(self.parser)
+        self._rdmc = rdmcObj
+
+    def run(self, line):
+        """ Main BIOS diff worker function
+
+        :param line: string of arguments passed in
+        :type line: str.
+        """
+        try:
+            (options, args) = self._parse_arglist(line)
+        except:
+            if ("-h" in line) or ("--help" in line):
+                return ReturnCodes.SUCCESS
+            else:
+                raise InvalidCommandLineErrorOPTS("")
+
+        if args:
+            raise InvalidCommandLineError("BIOS diff does not take any "\
+                                                                "arguments.")
+        elif not options.mpfilename:
+            raise InvalidCommandLineError("Provide the file of servers to "\
+                                    "compare with the multiprocessing flag.")
+
+        baseline = read_baseline(options.baseline) if options.baseline else \
+                                                                        None
+        servers = read_serverlist(options.mpfilename)
+        groups = ConfigGroups()
+
+        sys.stderr.write(u"Collecting the BIOS settings of %s server(s).\n" % \
+                                                                len(servers))
+
+        results = run_on_servers(servers, lambda server: self.collectserver(\
+                        server, groups), workers=options.maxservers)
+        errors = [{u'Url': server[u'url'], u'Error': u'%s' % error} for \
+                                    (server, _, error) in results if error]
+
+        for error in errors:
+            sys.stderr.write(u"%s: %s\n" % (error[u'Url'], error[u'Error']))
+
+        if not groups.hosts:
+            raise NoContentsFoundForOperationError("No BIOS settings could be "\
+                                                                "collected.")
+
+        report = {u'Baseline': options.baseline or u'majority', u'Servers': \
+                        len(servers), u'Configurations': groups.report(\
+                        baseline), u'Errors': errors}
+
+        if options.filename:
+            with open(options.filename[0], 'w') as output:
+                json.dump(report, output, indent=2, sort_keys=True)
+
+            sys.stdout.write(u"Results written out to '%s'\n" % \
+                                                        options.filename[0])
+        elif options.json:
+            sys.stdout.write(json.dumps(report, indent=2, sort_keys=True) + \
+                                                                        u'\n')
+        else:
+            self.printreport(report, len(servers) - len(errors))
+
+        #Return code
+        if errors:
+            return ReturnCodes.NO_CONTENTS_FOUND_FOR_OPERATION
+
+        return ReturnCodes.SUCCESS
+
+    def collectserver(self, server, groups):
+        """ Log in to one server and add its BIOS settings to the groups
+
+        :param server: server read from the multiple server file
+        :type server: dict
+        :param groups: configurations collected so far
+        :type groups: ConfigGroups
+        :returns: digest of the settings of the server
+        """
+        with open_session(server, self._rdmc.opts.verbose) as session:
+            response = session.pool.get(bios_path(session.pool))
+
+            if response.status != 200 or not isinstance(response.dict, dict):
+                raise NoContentsFoundForOperationError(u"Unable to read the "\
+                                    u"BIOS settings, status %s." % \
+                                                            response.status)
+
+            return groups.add(session.host, bios_attributes(response.dict))
+
+    def printreport(self, report, collected):
+        """ Print the configurations and their differences
+
+        :param report: report of the comparison
+        :type report: dict
+        :param collected: number of servers collected
+        :type collected: int
+        """
+        configurations = report[u'Configurations']
+
+        sys.stdout.write(u"%s of %s server(s) collected, %s distinct BIOS "\
+                    u"configuration(s), compared with the %s.\n" % (collected, \
+                    report[u'Servers'], len(configurations), u'majority' if \
+                    report[u'Baseline'] == u'majority' else u"settings of '%s'"\
+                                                    % report[u'Baseline']))
+
+        for (number, configuration) in enumerate(configurations, 1):
+            hosts = configuration[u'Hosts']
+            differences = configuration[u'Differences']
+
+            sys.stdout.write(u"\nConfiguration %s (%s), %s server(s): %s\n" % \
+                    (number, configuration[u'Digest'][:12], len(hosts), \
+                    u'%s difference(s)' % len(differences) if differences \
+                                                else u'matches the baseline'))
+            sys.stdout.write(u"\t%s%s\n" % (u', '.join(hosts[:LISTEDHOSTS]), \
+                    u' and %s more' % (len(hosts) - LISTEDHOSTS) if len(hosts) \
+                                                        > LISTEDHOSTS else u''))
+
+            for name in sorted(differences):
+                sys.stdout.write(u"\t%s: %s -> %s\n" % (name, \
+                                differences[name][u'Baseline'], \
+                                differences[name][u'Value']))
+
+    def definearguments(self, customparser):
+        """ Wrapper function for new command main function
+
+        :param customparser: command line input
+        :type customparser: parser.
+        """
+        if not customparser:
+            return
+
+        add_fleet_options(customparser, "Compare every server")
+        customparser.add_option(
+            '--baseline',
+            dest='baseline',
+            help="Compare with the BIOS settings of this file, written by the"\
+            " save command or holding an object of BIOS attributes. By"\
+            " default the most common settings are the baseline.",
+            default=None,
+        )
+        customparser.add_option(
+            '-f',
+            '--filename',
+            dest='filename',
+            help="Use this flag to write the full comparison, with every"\
+            " server of each configuration, to the given JSON file.",
+            action="append",
+            default=None,
+        )
+        customparser.add_option(
+            '-j',
+            '--json',
+            dest='json',
+            action="store_true",
+            help="Optionally include this flag if you wish to change the"\
+            " displayed output to JSON format. Preserving the JSON data"\
+            " structure makes the information easier to parse.",
+            default=False
+        )
@@ -26,6 +26,9 @@ from rdmc_base_classes import RdmcCommandBase
 from rdmc_helper import ReturnCodes, InvalidCommandLineError, \
                     InvalidCommandLineErrorOPTS, BootOrderMissingEntriesError,\
                     InvalidOrNothingChangedSettingsError
+from rdmc_session_pool import SessionPool
+
+BOOTSOURCESPATH = '/rest/v1/systems/1/bios/Boot'
 
 class BootOrderCommand(RdmcCommandBase):
     """ Changes the boot order for the server that is currently logged in """
@@ -95,53 +98,45 @@ class BootOrderCommand(RdmcCommandBase):
             return ReturnCodes.SUCCESS
 
         bootoverride = None
-        self.selobj.selectfunction("HpBios.")
-        bootmode = self.getobj.getworkerfunction("BootMode", options, \
-                                                    "BootMode", results=True)
-
-        self.selobj.selectfunction("ComputerSystem.")
-        onetimebootsettings = self.getobj.getworkerfunction("Boot", options, \
-                            ['Boot/'+self.typepath.defs.bootoverridetargettype], \
-                            newargs=['Boot', self.typepath.defs.bootoverridetargettype], \
-                            results=True)
-
-        bootstatus = self.getobj.getworkerfunction("Boot", options, \
-                               ['Boot/BootSourceOverrideEnabled'], \
-                               newargs=['Boot', 'BootSourceOverrideEnabled'], \
-                               results=True)
-
-        targetstatus = self.getobj.getworkerfunction("Boot", options, \
-                                ['Boot/BootSourceOverrideTarget'], \
-                                newargs=['Boot', 'BootSourceOverrideTarget'], \
-                                results=True)
-
-        uefitargetstatus = self.getobj.getworkerfunction("Boot", options, \
-                            ['Boot/UefiTargetBootSourceOverride'], \
-                            newargs=['Boot', 'UefiTargetBootSourceOverride'], \
-                            results=True)
-
-        currentsettings = self._rdmc.app.get_handler(self.typepath.defs.systempath, \
-                    verbose=self._rdmc.opts.verbose, service=True, silent=True)
+        showorder = options.onetimeboot is None and options.continuousboot \
+                                is None and not options.disablebootflag
+
+        paths = [self.typepath.defs.systempath]
+        if showorder:
+            paths.append(BOOTSOURCESPATH)
+
+        #the live system and the boot sources are read together
+        pool = SessionPool(self._rdmc.app, verbose=self._rdmc.opts.verbose)
+        try:
+            responses = pool.getall(paths)
+        finally:
+            pool.close()
+
+        currentsettings = responses[0]
+
+        bootmode = self.project(self.selectedcontent("HpBios."), ["BootMode"])
+        system = self.selectedcontent("ComputerSystem.")
+        onetimebootsettings = self.project(system, ['Boot', \
+                                self.typepath.defs.bootoverridetargettype])
+        bootstatus = self.project(system, ['Boot', \
+                                                'BootSourceOverrideEnabled'])
+        targetstatus = self.project(system, ['Boot', \
+                                                'BootSourceOverrideTarget'])
+        uefitargetstatus = self.project(system, ['Boot', \
+                                            'UefiTargetBootSourceOverride'])
 
         if bootmode and bootmode["BootMode"] == "Uefi":
-            uefionetimebootsettings = self.getobj.getworkerfunction("Boot", \
-                  options, ['Boot/UefiTargetBootSourceOverrideSupported'], \
-                  newargs=['Boot', 'UefiTargetBootSourceOverrideSupported'], \
-                  results=True)
+            uefionetimebootsettings = self.project(system, ['Boot', \
+                                    'UefiTargetBootSourceOverrideSupported'])
         else:
             uefionetimebootsettings = None
 
-        if options.onetimeboot is None and options.continuousboot is None and \
-                                                    not options.disablebootflag:
-            self.selobj.selectfunction("HpServerBootSettings.")
-            bootsettings = \
-                    self.getobj.getworkerfunction("PersistentBootConfigOrder", \
-                          options, "PersistentBootConfigOrder", results=True)
+        if showorder:
+            bootsettings = self.project(self.selectedcontent(\
+                    "HpServerBootSettings."), ["PersistentBootConfigOrder"])
 
-            bootsources = self._rdmc.app.get_handler(\
-                                '/rest/v1/systems/1/bios/Boot', \
-                                verbose=self._rdmc.opts.verbose,\
-                                service=True, silent=True).dict['BootSources']
+            bootsources = (responses[1].dict or {}).get('BootSources') if \
+                                        responses[1].status == 200 else None
 
             if not args:
                 self.print_out_boot_order(bootsettings, onetimebootsettings, \
@@ -296,6 +291,53 @@ class BootOrderCommand(RdmcCommandBase):
         #Return code
         return ReturnCodes.SUCCESS
 
+    def selectedcontent(self, selector):
+        """ Select a type and read its first instance once, so that all the
+        properties needed are projected from the same content
+
+        :param selector: type to select
+        :type selector: string.
+        :returns: content of the first instance, None if there is none
+        """
+        self.selobj.selectfunction(selector)
+
+        for content in self._rdmc.app.get_save() or []:
+            if 'Attributes' in content:
+                content = dict(content)
+                content.update(content.pop('Attributes'))
+
+            return content
+
+        return None
+
+    def project(self, content, keys):
+        """ Nested dictionary of one property of a content, the keys are
+        matched ignoring case as the get command does
+
+        :param content: content of an instance
+        :type content: dict.
+        :param keys: path of the property, such as ['Boot', 'BootMode']
+        :type keys: list.
+        :returns: {key: {subkey: value}}, None if the property is missing
+        """
+        value = content
+
+        for key in keys:
+            if not isinstance(value, dict):
+                return None
+
+            match = [name for name in value if name.lower() == key.lower()]
+
+            if not match:
+                return None
+
+            value = value[match[0]]
+
+        for key in reversed(keys):
+            value = {key: value}
+
+        return value
+
     def searchcasestring(self, entry, content):
         """ Helper function for retrieving correct case for value
 
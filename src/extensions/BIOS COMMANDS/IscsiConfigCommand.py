@@ -30,6 +30,7 @@ from rdmc_base_classes import RdmcCommandBase
 from rdmc_helper import ReturnCodes, InvalidCommandLineError, \
                 InvalidCommandLineErrorOPTS, NicMissingOrConfigurationError,\
                 BootOrderMissingEntriesError
+from rdmc_session_pool import SessionPool
 
 class IscsiConfigCommand(RdmcCommandBase):
     """ Changes the iscsi configuration for the server that is currently """ \
@@ -296,23 +297,7 @@ class IscsiConfigCommand(RdmcCommandBase):
                                     re.match("PciSlot[0-9]Enable", str(assoc)):
                         [devicealloc.append(x) for x in item["Subinstances"]]
 
-        if self.typepath.defs.isgen10:
-            newpcilist = []
-
-            self.selobj.selectfunction("HpeServerPciDeviceCollection")
-            pcideviceslist = self.getobj.getworkerfunction("Members", options, \
-                                                       "Members", results=True)
-
-            for device in pcideviceslist["Members"]:
-                newpcilist.append(self._rdmc.app.get_handler(\
-                                         device['@odata.id'], silent=True).dict)
-
-            pcideviceslist = newpcilist
-        else:
-            self.selobj.selectfunction(["Collection.", "--filter", \
-                                            "MemberType=HpServerPciDevice."])
-            pcideviceslist = self.getobj.getworkerfunction("Items", options, \
-                                                "Items", results=True)["Items"]
+        pcideviceslist = self.pcidevices(options)
 
         self.selobj.selectfunction("HpiSCSISoftwareInitiator.")
         iscsibootsources = self.rawdatahandler(action="GET", silent=True, \
@@ -321,23 +306,24 @@ class IscsiConfigCommand(RdmcCommandBase):
 
         self.pcidevicehelper(devicealloc, iscsipath, bootpath, pcideviceslist)
 
+        pcidevicesbypath = self.indexby(pcideviceslist, \
+                                    lambda device: device.get("UEFIDevicePath"))
+        devicesbysource = self.indexby(devicealloc, self.nicsource)
+
         for item in iscsibootsources[self.typepath.defs.iscsisource]:
             if item["iSCSINicSource"]:
-                for device in devicealloc:
-                    listval = 1 if isinstance(device["Associations"][0], dict) else 0
-                    if item["iSCSINicSource"] == device["Associations"][listval]:
-                        for pcidevice in pcideviceslist:
-                            if device["CorrelatableID"] == \
-                                                    pcidevice["UEFIDevicePath"]:
-                                inputstring = pcidevice["DeviceType"] + " " + \
-                                            str(pcidevice["DeviceInstance"]) + \
-                                            " Port " + \
-                                            str(pcidevice["DeviceSubInstance"])\
-                                            + " : " + pcidevice["Name"]
-                                structeredlist.append({inputstring: \
-                                   {str("Attempt " + \
-                                    str(item[self.typepath.defs.iscsiattemptinstance])): \
-                                    item}})
+                for device in devicesbysource.get(item["iSCSINicSource"], []):
+                    for pcidevice in pcidevicesbypath.get(\
+                                                device["CorrelatableID"], []):
+                        inputstring = pcidevice["DeviceType"] + " " + \
+                                    str(pcidevice["DeviceInstance"]) + \
+                                    " Port " + \
+                                    str(pcidevice["DeviceSubInstance"])\
+                                    + " : " + pcidevice["Name"]
+                        structeredlist.append({inputstring: \
+                           {str("Attempt " + \
+                            str(item[self.typepath.defs.iscsiattemptinstance])): \
+                            item}})
             else:
                 structeredlist.append({"Not Added": {}})
         try:
@@ -390,20 +376,7 @@ class IscsiConfigCommand(RdmcCommandBase):
                                         re.match("PciSlot[0-9]Enable", str(assoc)):
                         [devicealloc.append(x) for x in item["Subinstances"]]
 
-        if self.typepath.defs.isgen10:
-            newpcilist = []
-            self.selobj.selectfunction("HpeServerPciDeviceCollection")
-            pcideviceslist = self.getobj.getworkerfunction("Members", options, \
-                                                        "Members", results=True)
-            for device in pcideviceslist["Members"]:
-                newpcilist.append(self._rdmc.app.get_handler(\
-                                         device['@odata.id'], silent=True).dict)
-            pcideviceslist = newpcilist
-        else:
-            self.selobj.selectfunction(["Collection.", "--filter", \
-                                            "MemberType=HpServerPciDevice."])
-            pcideviceslist = self.getobj.getworkerfunction("Items", options, \
-                                                "Items", results=True)["Items"]
+        pcideviceslist = self.pcidevices(options)
 
         self.selobj.selectfunction(self.typepath.defs.hpiscsisoftwareinitiatortype)
         iscsiinitiatorname = self.getobj.getworkerfunction(\
@@ -497,34 +470,22 @@ class IscsiConfigCommand(RdmcCommandBase):
         :type options: list.
         """
         if not pcideviceslist:
-            if self.typepath.defs.isgen10:
-                newpcilist = []
-                self.selobj.selectfunction("HpeServerPciDeviceCollection")
-                pcideviceslist = self.getobj.getworkerfunction("Members", \
-                                               options, "Members", results=True)
-
-                for device in pcideviceslist["Members"]:
-                    newpcilist.append(self._rdmc.app.get_handler(\
-                                         device['@odata.id'], silent=True).dict)
+            pcideviceslist = self.pcidevices(options)
 
-                pcideviceslist = newpcilist
-            else:
-                self.selobj.selectfunction(["Collection.", "--filter", \
-                                            "MemberType=HpServerPciDevice."])
-                pcideviceslist = self.getobj.getworkerfunction("Items", \
-                                       options, "Items", results=True)["Items"]
+        #the nic sources and the boot settings are read together
+        pool = SessionPool(self._rdmc.app)
         try:
-            iscsinic = self.rawdatahandler(action="GET", silent=True, \
-                   verbose=False, jsonflag=True, path=iscsipath)['iSCSINicSources']
-        except:
+            (iscsinic, bios) = [response.dict for response in \
+                                            pool.getall([iscsipath, bootpath])]
+        finally:
+            pool.close()
+
+        if not iscsinic or 'iSCSINicSources' not in iscsinic:
             raise NicMissingOrConfigurationError('No iSCSI nic sources available.')
 
-        pciids = [x['UEFIDevicePath'] for x in pcideviceslist]
+        bios = bios or dict()
         removal = list()
 
-        bios = self.rawdatahandler(action="GET", silent=True, verbose=False, \
-                                                jsonflag=True, path=bootpath)
-
         for item in devicealloc:
             if item['Associations'] and item['Associations'][0] \
                                                             in bios.iterkeys():
@@ -535,6 +496,61 @@ class IscsiConfigCommand(RdmcCommandBase):
 
         return removal
 
+    def pcidevices(self, options):
+        """ Helper function to get the pci devices, the members of the gen10
+        collection are fetched concurrently
+
+        :param options: command line options
+        :type options: list.
+        """
+        if self.typepath.defs.isgen10:
+            self.selobj.selectfunction("HpeServerPciDeviceCollection")
+            members = self.getobj.getworkerfunction("Members", options, \
+                                            "Members", results=True)["Members"]
+
+            pool = SessionPool(self._rdmc.app, workers=8)
+            try:
+                return [response.dict for response in pool.getall(\
+                                [device['@odata.id'] for device in members])]
+            finally:
+                pool.close()
+
+        self.selobj.selectfunction(["Collection.", "--filter", \
+                                            "MemberType=HpServerPciDevice."])
+        return self.getobj.getworkerfunction("Items", options, "Items", \
+                                                        results=True)["Items"]
+
+    def nicsource(self, device):
+        """ Helper function to get the nic source a device is associated with
+
+        :param device: device allocated
+        :type device: dict.
+        """
+        associations = device.get("Associations")
+
+        if not associations:
+            return None
+
+        return associations[1] if isinstance(associations[0], dict) else \
+                                                                associations[0]
+
+    def indexby(self, items, keyfunc):
+        """ Helper function to index devices by a key, so that correlating
+        them is a lookup instead of a loop
+
+        :param items: items to index
+        :type items: list.
+        :param keyfunc: returns the key of an item
+        :type keyfunc: function.
+        :returns: dictionary of key to the items with that key, in order
+        """
+        index = dict()
+
+        for item in items:
+            index.setdefault(keyfunc(item), []).append(item)
+
+        return index
+
     def iscsiconfigurationvalidation(self, options):
         """ iscsi configuration method validation function
 
@@ -602,18 +618,20 @@ class IscsiConfigCommand(RdmcCommandBase):
                                                             "Interfaces: \n")
                     count = 1
 
+                pcidevicesbypath = self.indexby(pcideviceslist, \
+                                    lambda device: device.get("UEFIDevicePath"))
+
                 for item in devicealloc:
-                    for pcidevice in pcideviceslist:
-                        if item["CorrelatableID"] == \
-                                                    pcidevice["UEFIDevicePath"]:
-                            sys.stdout.write("[%s] %s %s Port %s : %s\n" % \
-                                         (count, pcidevice["DeviceType"], \
-                                          pcidevice["DeviceInstance"], \
-                                          pcidevice["DeviceSubInstance"], \
-                                          pcidevice["Name"]))
-
-                            if not disabled:
-                                count += 1
+                    for pcidevice in pcidevicesbypath.get(\
+                                                    item["CorrelatableID"], []):
+                        sys.stdout.write("[%s] %s %s Port %s : %s\n" % \
+                                     (count, pcidevice["DeviceType"], \
+                                      pcidevice["DeviceInstance"], \
+                                      pcidevice["DeviceSubInstance"], \
+                                      pcidevice["Name"]))
+
+                        if not disabled:
+                            count += 1
             else:
                 raise BootOrderMissingEntriesError(u'No entries found for' \
                                            ' iscsi configurations devices.\n')
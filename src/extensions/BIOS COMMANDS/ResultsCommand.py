@@ -23,6 +23,8 @@ from optparse import OptionParser
 from rdmc_base_classes import RdmcCommandBase
 from rdmc_helper import ReturnCodes, InvalidCommandLineError, \
                     InvalidCommandLineErrorOPTS, NoContentsFoundForOperationError
+from rdmc_registry_store import RegistryFetcher, get_registry_store
+from rdmc_session_pool import SessionPool
 
 class ResultsCommand(RdmcCommandBase):
     """ Monolith class command """
@@ -65,12 +67,13 @@ class ResultsCommand(RdmcCommandBase):
             iscsipath = self.typepath.defs.biospath + '/iScsi'
             bootpath = self.typepath.defs.biospath + '/Boot'
 
-        biosresults = self._rdmc.app.get_handler(self.typepath.defs.biospath, \
-                    verbose=self._rdmc.opts.verbose, service=True, silent=True)
-        iscsiresults = self._rdmc.app.get_handler(iscsipath, \
-                    verbose=self._rdmc.opts.verbose, service=True, silent=True)
-        bootsresults = self._rdmc.app.get_handler(bootpath, \
-                    verbose=self._rdmc.opts.verbose, service=True, silent=True)
+        pool = SessionPool(self._rdmc.app, verbose=self._rdmc.opts.verbose)
+        try:
+            (biosresults, iscsiresults, bootsresults) = pool.getall([\
+                                self.typepath.defs.biospath, iscsipath, bootpath])
+        finally:
+            pool.close()
+
         try:
             results.update({'Bios:': biosresults.dict[self.typepath.defs.\
                                             biossettingsstring][u'Messages']})
@@ -89,14 +92,14 @@ class ResultsCommand(RdmcCommandBase):
 
         messagelist = list()
 
-        errmessages = self._rdmc.app.get_error_messages()
-
         for result in results:
             if results[result]:
                 messagelist.append((result, (results[result])))
             else:
                 sys.stderr.write(u"No messages found for %s.\n" % result[:-1])
 
+        errmessages = self.registrymessages(messagelist)
+
         sys.stdout.write(u"Results of the previous BIOS change:\n")
 
         for loc, messages  in messagelist:
@@ -137,6 +140,34 @@ class ResultsCommand(RdmcCommandBase):
 
         return ReturnCodes.SUCCESS
 
+    def registrymessages(self, messagelist):
+        """ Load only the message registries the messages refer to, from the
+        registry store when it holds them
+
+        :param messagelist: list of (location, messages)
+        :type messagelist: list.
+        :returns: message registry lookup table
+        """
+        messageids = [message.get('MessageId', message.get('MessageID')) for \
+                    (_, messages) in messagelist for message in messages if \
+                    isinstance(message, dict)]
+        messageids = [messageid for messageid in messageids if messageid]
+
+        if not messageids:
+            return {}
+
+        fetcher = RegistryFetcher(self._rdmc.app, get_registry_store(\
+                                self._rdmc), verbose=self._rdmc.opts.verbose)
+        errmessages = fetcher.get_registry_messages(messageids)
+
+        if set(messageid.split('.')[0] for messageid in messageids) - \
+                                                            set(errmessages):
+            for (prefix, registry) in (self._rdmc.app.get_error_messages() \
+                                                            or {}).iteritems():
+                errmessages.setdefault(prefix, registry)
+
+        return errmessages
+
     def resultsvalidation(self, options):
         """ Results method validation function
 
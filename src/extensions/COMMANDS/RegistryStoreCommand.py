@@ -0,0 +1,213 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+""" Registry Store Command for RDMC """
+
+import sys
+
+from optparse import OptionParser
+from rdmc_base_classes import RdmcCommandBase
+from rdmc_helper import ReturnCodes, InvalidCommandLineError, \
+                    InvalidCommandLineErrorOPTS, UI
+from rdmc_registry_store import REGISTRIES, SCHEMAS, RegistryFetcher, \
+                    get_registry_store
+
+class RegistryStoreCommand(RdmcCommandBase):
+    """ Manage the local registry and schema store """
+    def __init__(self, rdmcObj):
+        RdmcCommandBase.__init__(self,\
+            name='registrystore',\
+            usage='registrystore [list|populate|export|import|clear] [FILE]'\
+                    ' [OPTIONS]\n\n\tRun without arguments to list the '\
+                    'registries and schemas\n\tkept in the local registry '\
+                    'store\n\texample: registrystore\n\n\tDownload the '\
+                    'registries of the logged in server that\n\tare not in'\
+                    ' the store yet\n\texample: registrystore populate '\
+                    '--schemas\n\n\tExport the store to pre-seed another '\
+                    'system\n\texample: registrystore export store.tar.gz\n'\
+                    '\n\tImport a previously exported store\n\texample: '\
+                    'registrystore import store.tar.gz',\
+            summary='Manages the local store of registries and schemas shared'\
+                    ' between servers with the same firmware.',\
+            aliases=[],\
+            optparser=OptionParser())
+        self.definearguments(self.parser)
+        self._rdmc = rdmcObj
+        self.lobobj = rdmcObj.commandsDict["LoginCommand"](rdmcObj)
+
+    def run(self, line):
+        """ Main registry store worker function
+
+        :param line: command line input
+        :type line: string.
+        """
+        try:
+            (options, args) = self._parse_arglist(line)
+        except:
+            if ("-h" in line) or ("--help" in line):
+                return ReturnCodes.SUCCESS
+            else:
+                raise InvalidCommandLineErrorOPTS("")
+
+        action = args[0].lower() if args else 'list'
+        store = get_registry_store(self._rdmc, readonly=False)
+
+        if action in ('export', 'import'):
+            if len(args) != 2:
+                raise InvalidCommandLineError("The %s option requires an "\
+                                                    "archive filename." % action)
+        elif len(args) > 1:
+            raise InvalidCommandLineError("Registry store only takes 1 "\
+                                                                "argument.\n")
+
+        if action == 'list':
+            self.liststore(store, options)
+        elif action == 'populate':
+            self.registrystorevalidation(options)
+            kinds = (REGISTRIES, SCHEMAS) if options.schemas else (REGISTRIES,)
+            fetcher = RegistryFetcher(self._rdmc.app, store, \
+                                            verbose=self._rdmc.opts.verbose)
+            fetcher.populate(kinds=kinds)
+            sys.stdout.write(u"%s entries downloaded, %s entries already in the"\
+                        " store.\n" % (fetcher.downloaded, fetcher.reused))
+        elif action == 'export':
+            count = store.export_archive(args[1])
+            sys.stdout.write(u"%s entries exported to '%s'.\n" % (count, \
+                                                                    args[1]))
+        elif action == 'import':
+            count = store.import_archive(args[1])
+            sys.stdout.write(u"%s entries imported from '%s'.\n" % (count, \
+                                                                    args[1]))
+        elif action == 'clear':
+            store.clear()
+            sys.stdout.write(u"Registry store cleared.\n")
+        else:
+            raise InvalidCommandLineError("Invalid option '%s' for the "\
+                                        "registry store command." % args[0])
+
+        #Return code
+        return ReturnCodes.SUCCESS
+
+    def liststore(self, store, options):
+        """ Print the contents of the store
+
+        :param store: registry store to list
+        :type store: RegistryStore.
+        :param options: command line options
+        :type options: list.
+        """
+        entries = store.entries()
+
+        if options.json:
+            UI().print_out_json([{u'Kind': kind, u'Name': name, u'Version': \
+                        version, u'Hash': entry[u'hash'], u'Uri': entry[u'uri']}\
+                                for (kind, name, version, entry) in entries])
+            return
+
+        if not entries:
+            sys.stdout.write(u"The registry store at '%s' is empty.\n" % \
+                                                                store.storedir)
+            return
+
+        for (kind, name, version, entry) in entries:
+            sys.stdout.write(u"%-10s %-40s %-10s %s\n" % (kind, name, version, \
+                                                        entry[u'hash'][:12]))
+
+    def registrystorevalidation(self, options):
+        """ Registry store method validation function
+
+        :param options: command line options
+        :type options: list.
+        """
+        client = None
+        inputline = list()
+
+        try:
+            client = self._rdmc.app.get_current_client()
+        except:
+            if options.user or options.password or options.url:
+                if options.url:
+                    inputline.extend([options.url])
+                if options.user:
+                    inputline.extend(["-u", options.user])
+                if options.password:
+                    inputline.extend(["-p", options.password])
+            else:
+                if self._rdmc.app.config.get_url():
+                    inputline.extend([self._rdmc.app.config.get_url()])
+                if self._rdmc.app.config.get_username():
+                    inputline.extend(["-u", \
+                                  self._rdmc.app.config.get_username()])
+                if self._rdmc.app.config.get_password():
+                    inputline.extend(["-p", \
+                                  self._rdmc.app.config.get_password()])
+
+        if len(inputline):
+            self.lobobj.loginfunction(inputline, skipbuild=True)
+        elif not client:
+            raise InvalidCommandLineError("Please login or pass credentials" \
+                                                " to complete the operation.")
+
+    def definearguments(self, customparser):
+        """ Wrapper function for new command main function
+
+        :param customparser: command line input
+        :type customparser: parser.
+        """
+        if not customparser:
+            return
+
+        customparser.add_option(
+            '--url',
+            dest='url',
+            help="Use the provided iLO URL to login.",
+            default=None,
+        )
+        customparser.add_option(
+            '-u',
+            '--user',
+            dest='user',
+            help="If you are not logged in yet, including this flag along"\
+            " with the password and URL flags can be used to log into a"\
+            " server in the same command.""",
+            default=None,
+        )
+        customparser.add_option(
+            '-p',
+            '--password',
+            dest='password',
+            help="""Use the provided iLO password to log in.""",
+            default=None,
+        )
+        customparser.add_option(
+            '--schemas',
+            dest='schemas',
+            action="store_true",
+            help="Optionally include the schemas of the server when "\
+            "populating the store.",
+            default=False,
+        )
+        customparser.add_option(
+            '-j',
+            '--json',
+            dest='json',
+            action="store_true",
+            help="Optionally include this flag if you wish to change the"\
+            " displayed output to JSON format. Preserving the JSON data"\
+            " structure makes the information easier to parse.",
+            default=False
+        )
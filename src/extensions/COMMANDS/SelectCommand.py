@@ -24,6 +24,7 @@ from optparse import OptionParser
 from rdmc_base_classes import RdmcCommandBase
 from rdmc_helper import ReturnCodes, InvalidCommandLineError, \
                     InvalidCommandLineErrorOPTS
+from rdmc_filter import compile_filter
 
 class SelectCommand(RdmcCommandBase):
     """ Constructor """
@@ -62,27 +63,23 @@ class SelectCommand(RdmcCommandBase):
             if len(args) > 0:
                 sel = None
                 val = None
+                compiled = None
 
                 if options.filter:
-                    try:
-                        if (str(options.filter)[0] == str(options.filter)[-1])\
-                                and str(options.filter).startswith(("'", '"')):
-                            options.filter = options.filter[1:-1]
-
-                        (sel, val) = options.filter.split('=')
-                        sel = sel.strip()
-                        val = val.strip()
-
-                        if val.lower() == "true" or val.lower() == "false":
-                            val = val.lower() in ("yes", "true", "t", "1")
-                    except:
-                        raise InvalidCommandLineError("Invalid filter" \
-                          " parameter format [filter_attribute]=[filter_value]")
+                    compiled = compile_filter(options.filter)
+
+                    if compiled.simple:
+                        (sel, val) = compiled.simple
+                    else:
+                        self._rdmc.app.erase_filter_settings()
                 else:
                     self._rdmc.app.erase_filter_settings()
 
                 selections = self._rdmc.app.select(query=args, sel=sel, val=val)
 
+                if compiled and not compiled.simple:
+                    selections = self.selectmatching(args, compiled, selections)
+
                 if self._rdmc.opts.verbose and selections:
                     templist = list()
                     sys.stdout.write("Selected option(s): ")
@@ -108,6 +105,36 @@ class SelectCommand(RdmcCommandBase):
         except redfish.ris.InstanceNotFoundError, infe:
             raise redfish.ris.InstanceNotFoundError(infe)
 
+    def selectmatching(self, query, compiled, selections):
+        """ Narrow a selection to the instances matching a filter
+        expression. The library filters on a single attribute, so the
+        expression must match all instances or exactly one of them.
+
+        :param query: selected types
+        :type query: list.
+        :param compiled: compiled filter expression
+        :type compiled: CompiledFilter.
+        :param selections: selected instances
+        :type selections: list.
+        """
+        matching = [item for item in selections or [] if \
+                                                compiled.match(item.resp.dict)]
+
+        if not matching:
+            raise redfish.ris.InstanceNotFoundError("No instance of '%s' " \
+                    "matches the filter '%s'." % (', '.join(query), \
+                                                        compiled.expression))
+        elif len(matching) == len(selections):
+            return selections
+        elif len(matching) == 1 and u'@odata.id' in matching[0].resp.dict:
+            return self._rdmc.app.select(query=query, sel=u'@odata.id', \
+                                    val=matching[0].resp.dict[u'@odata.id'])
+
+        raise InvalidCommandLineError("The filter matches %s of the %s " \
+                    "selected instances. Refine it to match a single instance"\
+                    " or use [filter_attribute]=[filter_value]." % \
+                    (len(matching), len(selections)))
+
     def selectvalidation(self, options):
         """ Select data validation function
 
@@ -208,7 +235,9 @@ class SelectCommand(RdmcCommandBase):
             " objects that are all of that type. If you want to modify"\
             " the properties of only one of those objects, use the filter"\
             " flag to narrow down results based on properties."\
-            "\t\t\t\t\t Usage: --filter [ATTRIBUTE]=[VALUE]",
+            "\t\t\t\t\t Usage: --filter [ATTRIBUTE]=[VALUE] or an"\
+            " expression such as --filter \"Name~^Memory AND"\
+            " Oem.Hpe.Slot>=2\" that matches a single instance.",
             default=None,
         )
         customparser.add_option(
@@ -60,9 +60,8 @@ class TypesCommand(RdmcCommandBase):
 
         try:
             if len(args) == 0:
-                typeslist = list()
-                typeslist = list(set(self._rdmc.app.types(options.fulltypes)))
-                typeslist.sort()
+                typeslist = self._rdmc.typeindex.types(self._rdmc.app, \
+                                                            options.fulltypes)
 
                 if not returntypes:
                     sys.stdout.write("Type options:")
@@ -0,0 +1,282 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+""" RawBatch Command for rdmc """
+
+import os
+import sys
+import json
+
+from optparse import OptionParser
+from rdmc_base_classes import RdmcCommandBase
+from rdmc_helper import ReturnCodes, InvalidCommandLineError, \
+                    InvalidCommandLineErrorOPTS, InvalidFileInputError, \
+                    InvalidFileFormattingError
+from rdmc_session_pool import SessionPool
+
+METHODS = ['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE']
+
+class RawBatchCommand(RdmcCommandBase):
+    """ Run many raw requests over one session """
+    def __init__(self, rdmcObj):
+        RdmcCommandBase.__init__(self,\
+            name='rawbatch',\
+            usage='rawbatch [FILENAME] [OPTIONS]\n\n\tRun every request of '\
+                    'the input file over one session and\n\twrite one JSON '\
+                    'response per line.\n\texample: rawbatch requests.ndjson '\
+                    '-f responses.ndjson --concurrency=8\n\n\tThe input file '\
+                    'holds one JSON request per line:\n\t{"method": "PATCH", '\
+                    '"path": "/redfish/v1/systems/1", "body": \n\t{"AssetTag":'\
+                    ' "Tag"}, "headers": {"If-Match": "*"}, "id": "tag"}\n\n\t'\
+                    'A {"barrier": true} line waits for all previous requests '\
+                    'to\n\tcomplete before any following request is sent.',\
+            summary='Runs a file of raw requests concurrently over one session.',\
+            aliases=['rawbatch'],\
+            optparser=OptionParser())
+        self.definearguments(self.parser)
+        self._rdmc = rdmcObj
+        self.lobobj = rdmcObj.commandsDict["LoginCommand"](rdmcObj)
+
+    def run(self, line):
+        """ Main raw batch worker function
+
+        :param line: command line input
+        :type line: string.
+        """
+        try:
+            (options, args) = self._parse_arglist(line)
+        except:
+            if ("-h" in line) or ("--help" in line):
+                return ReturnCodes.SUCCESS
+            else:
+                raise InvalidCommandLineErrorOPTS("")
+
+        if len(args) > 1:
+            raise InvalidCommandLineError("Raw batch only takes 1 argument.\n")
+        elif len(args) == 0:
+            raise InvalidCommandLineError("Missing raw batch file input "\
+                                                                "argument.\n")
+
+        segments = self.readrequests(args[0])
+        self.batchvalidation(options)
+
+        pool = SessionPool(self._rdmc.app, workers=options.concurrency, \
+                                            verbose=self._rdmc.opts.verbose)
+
+        if options.filename:
+            output = open(options.filename[0], 'w')
+        else:
+            output = sys.stdout
+
+        failures = 0
+        total = 0
+
+        try:
+            for segment in segments:
+                for result in pool.imap(lambda req: self.runrequest(pool, req,\
+                                            options.getheaders), segment):
+                    total += 1
+                    if result[u'status'] is None or result[u'status'] >= 400:
+                        failures += 1
+
+                    output.write(json.dumps(result) + '\n')
+        finally:
+            pool.close()
+
+            if options.filename:
+                output.close()
+
+        if options.filename:
+            sys.stdout.write(u"%s requests completed, %s failed. Results "\
+                "written out to '%s'.\n" % (total, failures, options.filename[0]))
+
+        #Return code
+        if failures:
+            return ReturnCodes.UI_CLI_USAGE_EXCEPTION
+
+        return ReturnCodes.SUCCESS
+
+    def readrequests(self, filename):
+        """ Read the request file into segments separated by barriers
+
+        :param filename: NDJSON request file
+        :type filename: str.
+        :returns: list of lists of requests
+        """
+        if not os.path.isfile(filename):
+            raise InvalidFileInputError("File '%s' doesn't exist." % filename)
+
+        segments = [[]]
+
+        with open(filename, 'r') as inputfile:
+            for number, line in enumerate(inputfile, 1):
+                line = line.strip()
+
+                if not line or line.startswith('#'):
+                    continue
+
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    raise InvalidFileFormattingError("Line %s of '%s' is not "\
+                                            "valid JSON." % (number, filename))
+
+                if request.get(u'barrier', False):
+                    if segments[-1]:
+                        segments.append([])
+                    continue
+
+                method = request.get(u'method', u'GET').upper()
+
+                if method not in METHODS or not request.get(u'path', None):
+                    raise InvalidFileFormattingError("Line %s of '%s' needs a "\
+                            "path and one of the methods %s." % (number, \
+                                                filename, ', '.join(METHODS)))
+
+                request[u'method'] = method
+                request[u'line'] = number
+                segments[-1].append(request)
+
+        return [segment for segment in segments if segment]
+
+    def runrequest(self, pool, request, getheaders=False):
+        """ Run a single request of the batch, errors are reported in the
+        result instead of stopping the batch
+
+        :param pool: session pool to send the request through
+        :type pool: SessionPool.
+        :param request: request read from the input file
+        :type request: dict.
+        :param getheaders: include the response headers in the result
+        :type getheaders: boolean.
+        """
+        result = {u'line': request[u'line'], u'method': request[u'method'], \
+                  u'path': request[u'path'], u'status': None}
+
+        if u'id' in request:
+            result[u'id'] = request[u'id']
+
+        try:
+            response = pool.request(request[u'method'], request[u'path'], \
+                                body=request.get(u'body', None), \
+                                headers=request.get(u'headers', None))
+        except Exception, excp:
+            result[u'error'] = u'%s' % excp
+            return result
+
+        result[u'status'] = response.status
+        result[u'elapsed_ms'] = int(response.elapsed * 1000)
+
+        if getheaders:
+            result[u'headers'] = dict(response.getheaders())
+
+        if response.dict is not None:
+            result[u'body'] = response.dict
+        elif response.read:
+            result[u'body'] = response.read.decode('utf-8', 'replace') if \
+                        isinstance(response.read, str) else response.read
+
+        return result
+
+    def batchvalidation(self, options):
+        """ Raw batch validation function
+
+        :param options: command line options
+        :type options: list.
+        """
+        inputline = list()
+
+        if options.concurrency < 1:
+            raise InvalidCommandLineError("Concurrency must be at least 1.")
+
+        try:
+            self._rdmc.app.get_current_client()
+        except:
+            if options.user or options.password or options.url:
+                if options.url:
+                    inputline.extend([options.url])
+                if options.user:
+                    inputline.extend(["-u", options.user])
+                if options.password:
+                    inputline.extend(["-p", options.password])
+            else:
+                if self._rdmc.app.config.get_url():
+                    inputline.extend([self._rdmc.app.config.get_url()])
+                if self._rdmc.app.config.get_username():
+                    inputline.extend(["-u", \
+                                  self._rdmc.app.config.get_username()])
+                if self._rdmc.app.config.get_password():
+                    inputline.extend(["-p", \
+                                  self._rdmc.app.config.get_password()])
+
+            self.lobobj.loginfunction(inputline, skipbuild=True)
+
+    def definearguments(self, customparser):
+        """ Wrapper function for new command main function
+
+        :param customparser: command line input
+        :type customparser: parser.
+        """
+        if not customparser:
+            return
+
+        customparser.add_option(
+            '--url',
+            dest='url',
+            help="Use the provided iLO URL to login.",
+            default=None,
+        )
+        customparser.add_option(
+            '-u',
+            '--user',
+            dest='user',
+            help="If you are not logged in yet, including this flag along"\
+            " with the password and URL flags can be used to log into a"\
+            " server in the same command.""",
+            default=None,
+        )
+        customparser.add_option(
+            '-p',
+            '--password',
+            dest='password',
+            help="""Use the provided iLO password to log in.""",
+            default=None,
+        )
+        customparser.add_option(
+            '-f',
+            '--filename',
+            dest='filename',
+            help="""Write the responses to the specified file instead of """\
+                                                            """the console.""",
+            action="append",
+            default=None,
+        )
+        customparser.add_option(
+            '--concurrency',
+            dest='concurrency',
+            type="int",
+            help="Number of requests sent at the same time between barriers."\
+            " Local sessions always run one request at a time. (default 4)",
+            default=4,
+        )
+        customparser.add_option(
+            '--getheaders',
+            dest='getheaders',
+            action="store_true",
+            help="Use this flag to include the iLO response headers.",
+            default=False
+        )
@@ -17,14 +17,18 @@
 # -*- coding: utf-8 -*-
 """ RawGet Command for rdmc """
 
+import os
 import sys
 import json
+import fnmatch
 import redfish
 
 from optparse import OptionParser
 from rdmc_base_classes import RdmcCommandBase, RdmcOptionParser
 from rdmc_helper import ReturnCodes, InvalidCommandLineError, \
-                    InvalidCommandLineErrorOPTS, UI
+                    InvalidCommandLineErrorOPTS, UI, LOGGER
+from rdmc_download import download
+from rdmc_session_pool import SessionPool
 
 class RawGetCommand(RdmcCommandBase):
     """ Raw form of the get command """
@@ -33,7 +37,10 @@ class RawGetCommand(RdmcCommandBase):
             name='rawget',\
             usage='rawget [PATH] [OPTIONS]\n\n\tRun to to retrieve data from ' \
                     'the passed in path.\n\texample: rawget "/redfish/v1/' \
-                    'systems/(system ID)"',\
+                    'systems/(system ID)"\n\n\tRetrieve every resource '\
+                    'linked below the path\n\texample: rawget "/redfish/v1/'\
+                    'systems/1/" --recurse --depth 2\n\t--parallel 8 '\
+                    '--exclude=*/logservices* -f systems.ndjson',\
             summary='This is the raw form of the GET command.',\
             aliases=['rawget'],\
             optparser=OptionParser())
@@ -71,6 +78,12 @@ class RawGetCommand(RdmcCommandBase):
         if args[0].startswith('"') and args[0].endswith('"'):
             args[0] = args[0][1:-1]
 
+        if options.recurse and (options.expand or options.binfile or \
+                                    options.response or options.getheaders):
+            raise InvalidCommandLineError("The --recurse option cannot be " \
+                        "combined with --expand, --writebin, --response or " \
+                        "--getheaders.")
+
         if options.expand:
             args[0] = args[0] + '?$expand=.'
 
@@ -85,6 +98,23 @@ class RawGetCommand(RdmcCommandBase):
                     InvalidCommandLineError("Invalid format for --headers " \
                                                                     "option.")
 
+        if options.recurse:
+            return self.crawl(args[0], options, headers=headers, url=url)
+
+        if options.binfile:
+            pool = SessionPool(self._rdmc.app, verbose=self._rdmc.opts.verbose,\
+                                        url=url, sessionid=options.sessionid)
+
+            try:
+                download(pool, args[0], options.binfile[0], headers=headers, \
+                                checksum=options.checksum, resume=options.resume,\
+                                quiet=options.silent)
+            finally:
+                pool.close()
+
+            #Return code
+            return ReturnCodes.SUCCESS
+
         returnresponse = False
         if options.response or options.getheaders:
             returnresponse = True
@@ -94,14 +124,7 @@ class RawGetCommand(RdmcCommandBase):
                 url=url, headers=headers, response=returnresponse, \
                 silent=options.silent, service=options.service)
 
-        if results and options.binfile:
-            output = results.read
-
-            filehndl = open(options.binfile[0], "wb")
-            filehndl.write(output)
-            filehndl.close()
-
-        elif results and returnresponse:
+        if results and returnresponse:
             if options.getheaders:
                 sys.stdout.write(json.dumps(dict(\
                                  results._http_response.getheaders())) + "\n")
@@ -131,6 +154,186 @@ class RawGetCommand(RdmcCommandBase):
         #Return code
         return ReturnCodes.SUCCESS
 
+    def crawl(self, path, options, headers=None, url=None):
+        """ Breadth first crawl of the resources linked below path, every
+        level of the tree is fetched concurrently
+
+        :param path: path of the resource to start from
+        :type path: str.
+        :param options: command line options
+        :type options: list.
+        :param headers: additional request headers
+        :type headers: dict.
+        :param url: iLO url used with a session id
+        :type url: str.
+        """
+        if options.depth is not None and options.depth < 0:
+            raise InvalidCommandLineError("Depth must be 0 or greater.")
+        if options.parallel < 1:
+            raise InvalidCommandLineError("Parallel must be at least 1.")
+
+        root = path.split('?')[0].split('#')[0].rstrip('/')
+        include = [item.lower() for item in options.include or []]
+        exclude = [item.lower() for item in options.exclude or []]
+
+        pool = SessionPool(self._rdmc.app, workers=options.parallel, \
+                        verbose=self._rdmc.opts.verbose, url=url, \
+                        sessionid=options.sessionid)
+
+        output = None
+        if options.filename and not options.outputdir:
+            output = open(options.filename[0], 'w')
+        elif not options.outputdir:
+            output = sys.stdout
+
+        visited = set([root.lower()])
+        level = [path]
+        depth = 0
+        total = 0
+        failures = 0
+
+        fetch = lambda item: self.crawlfetch(pool, item, headers)
+        #every resource below the path is followed, include only selects
+        #the ones written out
+        included = lambda item: not include or any(fnmatch.fnmatch(item.split(\
+                    '?')[0].split('#')[0].rstrip('/').lower(), pattern) for \
+                                                        pattern in include)
+
+        try:
+            while level:
+                nextlevel = []
+
+                for (item, response) in pool.imap(fetch, level):
+                    body = response.dict if response else None
+
+                    if included(item):
+                        total += 1
+
+                        if not response or response.status != 200:
+                            failures += 1
+
+                        self.crawlwrite(output, options.outputdir, item, \
+                                                        depth, response, body)
+
+                    if body is None or (options.depth is not None and \
+                                                        depth >= options.depth):
+                        continue
+
+                    for link in self.crawllinks(body):
+                        key = link.rstrip('/').lower()
+
+                        if key in visited or not (key == root.lower() or \
+                                    key.startswith(root.lower() + '/')):
+                            continue
+
+                        visited.add(key)
+
+                        if any(fnmatch.fnmatch(key, pattern) for pattern in \
+                                                                    exclude):
+                            continue
+
+                        nextlevel.append(link)
+
+                level = nextlevel
+                depth += 1
+        finally:
+            pool.close()
+
+            if options.filename and not options.outputdir:
+                output.close()
+
+        if options.filename or options.outputdir:
+            sys.stdout.write(u"%s resources retrieved, %s failed. Results " \
+                        "written out to '%s'.\n" % (total, failures, \
+                        options.outputdir or options.filename[0]))
+
+        if not total or failures == total:
+            return ReturnCodes.NO_CONTENTS_FOUND_FOR_OPERATION
+
+        return ReturnCodes.SUCCESS
+
+    def crawlfetch(self, pool, path, headers=None):
+        """ Fetch one resource of the crawl, failures return no response
+
+        :param pool: session pool to send the request through
+        :type pool: SessionPool.
+        :param path: path of the resource
+        :type path: str.
+        :param headers: additional request headers
+        :type headers: dict.
+        """
+        try:
+            return (path, pool.get(path, headers=headers))
+        except Exception, excp:
+            LOGGER.info(u"Unable to retrieve '%s': %s" % (path, excp))
+            return (path, None)
+
+    def crawllinks(self, body):
+        """ Links to other resources found anywhere in a response body
+
+        :param body: decoded response body
+        :type body: dict.
+        :returns: list of paths in the order they appear
+        """
+        links = []
+        stack = [body]
+
+        while stack:
+            item = stack.pop()
+
+            if isinstance(item, dict):
+                for (key, value) in item.iteritems():
+                    if key in (u'@odata.id', u'href') and \
+                                    isinstance(value, basestring) and \
+                                    value.startswith(u'/'):
+                        links.append(value.split(u'#')[0])
+                    elif isinstance(value, (dict, list)):
+                        stack.append(value)
+            elif isinstance(item, list):
+                stack.extend(item)
+
+        return links
+
+    def crawlwrite(self, output, outputdir, path, depth, response, body):
+        """ Write one crawled resource as a JSON line or as a file mirroring
+        its path in the output directory
+
+        :param output: open NDJSON output, None when writing to a directory
+        :type output: file.
+        :param outputdir: output directory
+        :type outputdir: str.
+        :param path: path of the resource
+        :type path: str.
+        :param depth: distance to the starting path
+        :type depth: int.
+        :param response: response of the request, None if it failed
+        :type response: PooledResponse.
+        :param body: decoded response body
+        :type body: dict.
+        """
+        if output:
+            record = {u'path': path, u'depth': depth, u'status': \
+                                    response.status if response else None}
+            if body is not None:
+                record[u'body'] = body
+
+            output.write(json.dumps(record) + '\n')
+            output.flush()
+            return
+
+        if body is None:
+            return
+
+        filepath = os.path.join(outputdir, *[item for item in \
+                        path.split('?')[0].split('/') if item not in ('', '.', \
+                                                                        '..')])
+
+        if not os.path.isdir(filepath):
+            os.makedirs(filepath)
+
+        with open(os.path.join(filepath, 'index.json'), 'w') as filehndl:
+            filehndl.write(json.dumps(body, indent=2))
+
     def getvalidation(self, options):
         """ Raw get validation function
 
@@ -262,6 +465,22 @@ class RawGetCommand(RdmcCommandBase):
             action="append",
             default=None,
         )
+        customparser.add_option(
+            '--checksum',
+            dest='checksum',
+            help="Print the checksum of the file written with the writebin"\
+            " flag. Include the expected digest to verify the download."\
+            "\t\t\t\t\t Usage: --checksum=sha256[:DIGEST]",
+            default=None,
+        )
+        customparser.add_option(
+            '--resume',
+            dest='resume',
+            action="store_true",
+            help="Continue a partial file written with the writebin flag"\
+            " instead of downloading it again, if the server supports it.",
+            default=False,
+        )
         customparser.add_option(
             '--service',
             dest='service',
@@ -278,3 +497,54 @@ class RawGetCommand(RdmcCommandBase):
                                             """expand notation '?$expand=.'""",
             default=False,
         )
+        customparser.add_option(
+            '--recurse',
+            dest='recurse',
+            action="store_true",
+            help="Use this flag to also retrieve every resource linked below"\
+            " the path, one JSON line per resource. Use the filename flag to"\
+            " write the lines to a file instead of the console.",
+            default=False,
+        )
+        customparser.add_option(
+            '--depth',
+            dest='depth',
+            type="int",
+            help="Number of link levels followed below the path when using"\
+            " the recurse flag. By default all levels are followed.",
+            default=None,
+        )
+        customparser.add_option(
+            '--parallel',
+            dest='parallel',
+            type="int",
+            help="Number of resources retrieved at the same time when using"\
+            " the recurse flag. (default 4)",
+            default=4,
+        )
+        customparser.add_option(
+            '--include',
+            dest='include',
+            help="Only output the resources matching this pattern when using"\
+            " the recurse flag, the links of the others are still followed."\
+            " Can be used multiple times.\t\t\t\t\t Usage:"\
+            " --include=/redfish/v1/systems/1/bios*",
+            action="append",
+            default=None,
+        )
+        customparser.add_option(
+            '--exclude',
+            dest='exclude',
+            help="Do not follow links matching this pattern when using the"\
+            " recurse flag. Can be used multiple times.\t\t\t\t\t Usage:"\
+            " --exclude=*/logservices*",
+            action="append",
+            default=None,
+        )
+        customparser.add_option(
+            '--outputdir',
+            dest='outputdir',
+            help="Write every resource retrieved with the recurse flag to"\
+            " an index.json file in a folder tree mirroring its path.",
+            default=None,
+        )
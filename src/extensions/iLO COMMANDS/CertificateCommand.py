@@ -17,6 +17,7 @@
 # -*- coding: utf-8 -*-
 """ Certificates Command for rdmc """
 
+import os
 import sys
 
 from optparse import OptionParser
@@ -24,8 +25,14 @@ from rdmc_base_classes import RdmcCommandBase
 from rdmc_helper import ReturnCodes, InvalidCommandLineError, \
             InvalidCommandLineErrorOPTS, NoContentsFoundForOperationError, \
             InvalidFileInputError, IncompatibleiLOVersionError
+from rdmc_certificates import CSREXTENSION, https_cert, cert_action, \
+            host_filename, find_host_file
+from rdmc_fleet import read_serverlist, run_on_servers, server_host, \
+                    open_session, add_fleet_options
+from rdmc_progress import ProgressPoller, poll_many, DONE
 
 __filename__ = 'certificate.txt'
+__csrdirectory__ = 'csr'
 
 class CertificateCommand(RdmcCommandBase):
     """ Commands Certificates actions to the server """
@@ -42,7 +49,16 @@ class CertificateCommand(RdmcCommandBase):
                     'sure the order of arguments is correct. The\n\tparameters ' \
                     'are extracted base on their position in the arguments ' \
                     'list.\n\n\tGet certificate signing request.\n\texample: '\
-                    'certificate getcsr\n\n\tNOTE: Use the singlesignon command '
+                    'certificate getcsr\n\n\tGenerate the requests of every '\
+                    'server of a server file and save\n\tthem to a directory, '\
+                    'one HOST.csr file per server, as each\n\tserver completes '\
+                    'its request.\n\texample: certificate csr [ORG_NAME] '\
+                    '[ORG_UNIT] [COMMON_NAME] [COUNTRY]\n\t[STATE] [CITY] '\
+                    '--multiprocessing servers.txt --directory csr\n\n\t'\
+                    'Import the signed certificates of a directory, one HOST.crt,'\
+                    '\n\t.pem, .cer or .txt file per server of the server file.'\
+                    '\n\texample: certificate tls signed --multiprocessing '\
+                    'servers.txt\n\n\tNOTE: Use the singlesignon command '
                     'to import single sign on certificates',\
             summary="Command for importing both iLO and login authorization "\
                     "certificates as well as generating iLO certificate signing "\
@@ -79,6 +95,9 @@ class CertificateCommand(RdmcCommandBase):
             raise InvalidCommandLineError("This certificates command only takes "\
                                           "2 parameters.")
 
+        if options.mpfilename:
+            return self.fleethelper(args, options)
+
         self.certificatesvalidation(options)
 
         if args[0].lower() == 'csr':
@@ -290,6 +309,217 @@ class CertificateCommand(RdmcCommandBase):
 
         self._rdmc.app.post_handler(path, body)
 
+    def fleethelper(self, args, options):
+        """ Generate or fetch the signing requests, or import the signed
+        certificates, of every server of the multiple server file
+
+        :param args: list of args
+        :type args: list.
+        :param options: command line options
+        :type options: list.
+        """
+        servers = read_serverlist(options.mpfilename)
+        command = args[0].lower()
+
+        if command == 'tls':
+            if not os.path.isdir(args[1]):
+                raise InvalidFileInputError("Directory '%s' doesn't exist." \
+                                                                    % args[1])
+
+            results = [(server, u'Certificate imported' if not error else \
+                    None, error) for (server, _, error) in run_on_servers(\
+                    servers, lambda server: self.importserver(server, \
+                                    args[1]), workers=options.maxservers)]
+        elif command == 'csr':
+            if not os.path.isdir(options.directory):
+                os.makedirs(options.directory)
+
+            results = self.generatefleet(servers, args, options)
+        elif command == 'getcsr':
+            if not os.path.isdir(options.directory):
+                os.makedirs(options.directory)
+
+            results = run_on_servers(servers, lambda server: self.\
+                        fetchserver(server, options.directory), \
+                                                workers=options.maxservers)
+        else:
+            raise InvalidCommandLineError("Only the csr, getcsr and tls "\
+                        "certificates commands take multiple servers.")
+
+        failed = 0
+
+        for (server, result, error) in results:
+            if error:
+                failed += 1
+                sys.stderr.write(u"%s: %s\n" % (server[u'url'], error))
+            else:
+                sys.stdout.write(u"%s: %s\n" % (server[u'url'], result))
+
+        sys.stdout.write(u"%s of %s server(s) completed.\n" % (len(results) \
+                                                    - failed, len(results)))
+
+        if failed:
+            return ReturnCodes.MULTIPLE_SERVER_CONFIG_FAIL
+
+        return ReturnCodes.SUCCESS
+
+    def generatefleet(self, servers, args, options):
+        """ Start the signing requests of every server, then poll all of
+        them and save each request as soon as its server has it
+
+        :param servers: servers read from the multiple server file
+        :type servers: list.
+        :param args: list of args
+        :type args: list.
+        :param options: command line options
+        :type options: list.
+        :returns: list of (server, result, error)
+        """
+        results = []
+        pollers = []
+
+        #results are kept by position so that a server listed twice is
+        #reported twice
+        for (server, started, error) in run_on_servers(servers, lambda \
+                    server: self.startcsr(server, args), \
+                                                workers=options.maxservers):
+            results.append((server, None, error))
+
+            if not error:
+                (session, path, previous) = started
+                poller = ProgressPoller(session.pool, path, lambda resource, \
+                        previous=previous: u'Ready' if resource.get(\
+                        u'CertificateSigningRequest') not in (None, u'', \
+                        previous) else u'Generating', label=session.host, \
+                        interval=10.0, maxinterval=60.0, timeout=\
+                                        options.csrtimeout, lines=True)
+                poller.session = session
+                poller.server = server
+                poller.index = len(results) - 1
+                pollers.append(poller)
+
+        sys.stdout.write(u"iLO is creating a new certificate signing request "\
+                    u"on %s server(s). This process can take up to 10 " \
+                                            u"minutes.\n" % len(pollers))
+        try:
+            outcomes = poll_many(pollers, lambda poller: poller.state == \
+                        u'Ready' and self.savecsr(poller.session.host, \
+                        poller.resource, options.directory), \
+                                                workers=options.maxservers)
+        finally:
+            for poller in pollers:
+                poller.session.logout()
+
+        for (poller, outcome) in outcomes.iteritems():
+            if outcome == DONE:
+                results[poller.index] = (poller.server, u"Certificate "\
+                        u"signing request saved to %s" % host_filename(\
+                        options.directory, poller.session.host, \
+                                                        CSREXTENSION), None)
+            else:
+                error = NoContentsFoundForOperationError(u"No new certificate "\
+                            u"signing request after %s seconds." % \
+                                                        int(poller.elapsed))
+                results[poller.index] = (poller.server, None, error)
+
+        return results
+
+    def startcsr(self, server, args):
+        """ Log in to one server and start its signing request. The session
+        is kept to poll for the request.
+
+        :param server: server read from the multiple server file
+        :type server: dict
+        :param args: list of args
+        :type args: list.
+        :returns: (session, path of the HTTPS certificate, previous request)
+        """
+        session = open_session(server, self._rdmc.opts.verbose).login()
+        try:
+            (path, resource) = https_cert(session.pool)
+            (target, body) = cert_action(path, resource, u'GenerateCSR', \
+                    OrgName=args[1], OrgUnit=args[2], CommonName=args[3], \
+                            Country=args[4], State=args[5], City=args[6])
+            response = session.pool.request('POST', target, body=body)
+
+            if response.status not in (200, 201, 202, 204):
+                raise NoContentsFoundForOperationError(u"Unable to generate "\
+                    u"the certificate signing request, status %s." % \
+                                                            response.status)
+        except Exception:
+            session.logout()
+            raise
+
+        return (session, path, resource.get(u'CertificateSigningRequest'))
+
+    def fetchserver(self, server, directory):
+        """ Log in to one server and save its current signing request
+
+        :param server: server read from the multiple server file
+        :type server: dict
+        :param directory: directory of the signing requests
+        :type directory: str.
+        """
+        with open_session(server, self._rdmc.opts.verbose) as session:
+            (_, resource) = https_cert(session.pool)
+
+            if not self.savecsr(session.host, resource, directory):
+                raise NoContentsFoundForOperationError(u"Unable to find the "\
+                                        u"certificate signing request.")
+
+            return u"Certificate signing request saved to %s" % \
+                            host_filename(directory, session.host, CSREXTENSION)
+
+    def savecsr(self, host, resource, directory):
+        """ Save the signing request of a host to its file of the directory
+
+        :param host: address of the server
+        :type host: str.
+        :param resource: HTTPS certificate resource
+        :type resource: dict.
+        :param directory: directory of the signing requests
+        :type directory: str.
+        :returns: True when there was a request to save
+        """
+        csr = (resource or {}).get(u'CertificateSigningRequest')
+
+        if not csr:
+            return False
+
+        with open(host_filename(directory, host, CSREXTENSION), 'w') as \
+                                                                    outfile:
+            outfile.write(csr)
+
+        return True
+
+    def importserver(self, server, directory):
+        """ Log in to one server and import its signed certificate
+
+        :param server: server read from the multiple server file
+        :type server: dict
+        :param directory: directory of the signed certificates
+        :type directory: str.
+        """
+        host = server_host(server[u'url'])
+        filename = find_host_file(directory, host)
+
+        if not filename:
+            raise InvalidFileInputError(u"No certificate for %s in '%s'." % \
+                                                            (host, directory))
+
+        with open(filename) as certfile:
+            certdata = certfile.read()
+
+        with open_session(server, self._rdmc.opts.verbose) as session:
+            (path, resource) = https_cert(session.pool)
+            (target, body) = cert_action(path, resource, \
+                                u'ImportCertificate', Certificate=certdata)
+            response = session.pool.request('POST', target, body=body)
+
+            if response.status not in (200, 201, 202, 204):
+                raise NoContentsFoundForOperationError(u"Unable to import %s, "\
+                                    u"status %s." % (filename, response.status))
+
     def certificatesvalidation(self, options):
         """ certificates validation function
 
@@ -364,4 +594,22 @@ class CertificateCommand(RdmcCommandBase):
             " filename is %s." % __filename__,
             action="append",
             default=None,
+        )
+        add_fleet_options(customparser, "Use this flag with csr, getcsr or "\
+                                            "tls to work on every server")
+        customparser.add_option(
+            '--directory',
+            dest='directory',
+            help="Directory the certificate signing requests of many servers"\
+            " are saved to, one HOST%s file per server. The default directory"\
+            " is %s." % (CSREXTENSION, __csrdirectory__),
+            default=__csrdirectory__,
+        )
+        customparser.add_option(
+            '--csrtimeout',
+            dest='csrtimeout',
+            type="int",
+            help="Seconds to wait for the certificate signing requests of "\
+            "many servers. (default 900)",
+            default=900,
         )
\ No newline at end of file
@@ -24,6 +24,8 @@ from rdmc_base_classes import RdmcCommandBase
 from rdmc_helper import ReturnCodes, InvalidCommandLineError, \
                     InvalidCommandLineErrorOPTS, \
                     NoContentsFoundForOperationError
+from rdmc_progress import wait_for_reset
+from rdmc_session_pool import session_url
 
 class FactoryDefaultsCommand(RdmcCommandBase):
     """ Reset server to factory default settings """
@@ -93,8 +95,19 @@ class FactoryDefaultsCommand(RdmcCommandBase):
             body = {"Action": "ResetToFactoryDefaults", \
                                 "Target": "/Oem/Hp", "ResetType": "Default"}
 
+        (baseurl, islocal) = session_url(self._rdmc.app)
+
         self._rdmc.app.post_handler(path, body, service=True)
 
+        if options.wait and islocal:
+            sys.stdout.write(u'Waiting for iLO is only available for remote '\
+                                                            'sessions.\n')
+        elif options.wait:
+            wait_for_reset(baseurl, u'Factory reset', timeout=\
+                                                            options.timeout)
+            sys.stdout.write(u'iLO is available again with its factory '\
+                                                        'default settings.\n')
+
         return ReturnCodes.SUCCESS
 
     def factorydefaultsvalidation(self, options):
@@ -162,3 +175,19 @@ class FactoryDefaultsCommand(RdmcCommandBase):
             help="""Use the provided iLO password to log in.""",
             default=None,
         )
+        customparser.add_option(
+            '--wait',
+            dest='wait',
+            action="store_true",
+            help="Wait for iLO to reset and answer requests again before returning."\
+            " The progress is written as JSON lines when the output is not a"\
+            " terminal.",
+            default=False,
+        )
+        customparser.add_option(
+            '--timeout',
+            dest='timeout',
+            type="float",
+            help="Seconds to wait with the wait flag. (default 600)",
+            default=600,
+        )
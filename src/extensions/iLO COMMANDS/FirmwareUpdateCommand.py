@@ -17,14 +17,24 @@
 # -*- coding: utf-8 -*-
 """ Firmware Update Command for rdmc """
 
+import os
 import sys
-import time
+import urlparse
 
 from optparse import OptionParser
 from rdmc_base_classes import RdmcCommandBase
 from rdmc_helper import ReturnCodes, InvalidCommandLineError, \
                     InvalidCommandLineErrorOPTS, FirmwareUpdateError, \
                     NoContentsFoundForOperationError
+from rdmc_file_server import FileServer, serving_address
+from rdmc_firmware import update_service, update_request, update_state, \
+                    firmware_versions
+from rdmc_fleet import read_serverlist, run_on_servers, open_session, \
+                    add_fleet_options
+from rdmc_progress import ProgressPoller, UNREACHABLE, AVAILABLE, DONE, \
+                    poll_many, wait_for_reset
+from rdmc_session_pool import SessionPool, session_url, \
+                    session_credentials
 
 class FirmwareUpdateCommand(RdmcCommandBase):
     """ Reboot server that is currently logged in """
@@ -33,7 +43,15 @@ class FirmwareUpdateCommand(RdmcCommandBase):
             name='firmwareupdate',\
             usage='firmwareupdate [URI] [OPTIONS]\n\n\tApply a firmware ' \
                     'update to the current logged in server.\n\texample: ' \
-                    'firmwareupdate <iLO url/hostname>/images/image.bin',\
+                    'firmwareupdate <iLO url/hostname>/images/image.bin\n\n' \
+                    '\tApply a local firmware file, served to iLO by a ' \
+                    'temporary web server\n\trunning until the update ' \
+                    'completes.\n\texample: firmwareupdate ilo4_250.bin\n\n' \
+                    '\tUpdate every server of a file in waves, waiting for ' \
+                    'each wave to\n\treset and verifying the new version ' \
+                    'before starting the next.\n\texample: firmwareupdate ' \
+                    'ilo5_130.bin --multiprocessing servers.txt\n\t' \
+                    '--wavesize 20 --maxfailurerate 5',\
             summary='Perform a firmware update on the currently logged in ' \
                                                                     'server.',\
             aliases=['firmwareupdate'],\
@@ -58,15 +76,19 @@ class FirmwareUpdateCommand(RdmcCommandBase):
             else:
                 raise InvalidCommandLineErrorOPTS("")
 
-        if len(args) == 1:
-            self.firmwareupdatevalidation(options)
-        else:
+        if len(args) != 1:
             raise InvalidCommandLineError("Invalid number of parameters." \
                           " Firmware update takes exactly 1 parameter.")
 
         if args[0].startswith('"') and args[0].endswith('"'):
             args[0] = args[0][1:-1]
 
+        if options.mpfilename:
+            self.updatefleet(args[0], options)
+            return ReturnCodes.SUCCESS
+
+        self.firmwareupdatevalidation(options)
+
         action = None
         uri = "FirmwareURI"
         select = self.typepath.defs.hpilofirmwareupdatetype
@@ -100,88 +122,363 @@ class FirmwareUpdateCommand(RdmcCommandBase):
             put_path = update_path
             action = "Reset"
 
+        server = None
+        if os.path.isfile(args[0]):
+            (server, args[0]) = self.startfileserver(args[0], options)
+
         if options.tpmenabled:
             body = {"Action": action,\
                        uri: args[0], "TPMOverrideFlag": True}
         else:
             body = {"Action": action, uri: args[0]}
 
-        self._rdmc.app.post_handler(put_path, body, silent=True, service=True)
+        try:
+            self._rdmc.app.post_handler(put_path, body, silent=True, \
+                                                                service=True)
+
+            sys.stdout.write("\nStarting upgrading process...\n\n")
 
-        sys.stdout.write("\nStarting upgrading process...\n\n")
+            self.showupdateprogress(update_path, timeout=options.timeout, \
+                                        resettimeout=options.resettimeout)
+        finally:
+            if server:
+                server.stop()
 
-        self.showupdateprogress(update_path)
         self.logoutobj.logoutfunction("")
 
         #Return code
         return ReturnCodes.SUCCESS
 
-    def showupdateprogress(self, path):
-        """ handler function for updating the progress
+    def showupdateprogress(self, path, timeout=None, resettimeout=600):
+        """ handler function for updating the progress. An iLO going away
+        in the middle of the update resets to complete it, it is waited for
+        and logged in to again.
 
         :param path: path to update service.
         :tyep path: str
+        :param timeout: seconds to wait for the update to complete
+        :type timeout: float
+        :param resettimeout: seconds to wait for iLO to answer after a reset
+        :type resettimeout: float
+        """
+        pool = SessionPool(self._rdmc.app)
+        (username, password) = session_credentials(self._rdmc.app)
+        poller = ProgressPoller(pool, path, update_state, label=\
+                u'Updating', interval=1.0, maxinterval=10.0, timeout=timeout)
+
+        try:
+            poller.wait(lambda _: self.updatedone(poller), isfailed=lambda \
+                        state: (state or u'').lower().startswith("error"), \
+                                                    error=FirmwareUpdateError)
+        finally:
+            pool.close()
+
+        if poller.state == UNREACHABLE and not pool.islocal:
+            sys.stdout.write(u'\niLO is resetting to complete the update.\n')
+            wait_for_reset(pool.baseurl, u'iLO reset', timeout=resettimeout, \
+                                                                resetting=True)
+
+            if username and password:
+                self.lobobj.loginfunction([pool.baseurl, u'-u', username, \
+                                            u'-p', password], skipbuild=True)
+
+            sys.stdout.write(u'\nFirmware update has completed and iLO is'\
+                             ' available again.\nA reboot may be required'\
+                             ' for firmware changes to take effect.\n')
+            return
+
+        sys.stdout.write(u'\nFirmware update has completed and iLO' \
+                         ' may reset. \nIf iLO resets the' \
+                         ' session will be terminated.\nPlease wait' \
+                         ' for iLO to initialize completely before' \
+                         ' logging in again.\nA reboot may be required'\
+                         ' for firmware changes to take effect.\n')
+
+    def startfileserver(self, filename, options):
+        """ Serve a local firmware file to iLO, on the address of the
+        interface iLO is reached through unless one is given
+
+        :param filename: local firmware file
+        :type filename: str
+        :param options: command line options
+        :type options: list.
+        :returns: (the started FileServer, url of the file)
+        """
+        (baseurl, islocal) = session_url(self._rdmc.app)
+
+        if islocal and not options.serveraddress:
+            raise InvalidCommandLineError("Provide the address iLO can reach"\
+                        " this system on with the serveraddress flag to update"\
+                        " from a local file in local mode.")
+
+        (bindaddress, address) = serving_address([urlparse.urlparse(\
+                            baseurl).hostname], options.serveraddress)
+        server = FileServer(filename, address=bindaddress, port=\
+                        options.serverport, certfile=options.certfile, \
+                        keyfile=options.keyfile).start()
+        url = server.url(address)
+
+        sys.stdout.write(u"Serving %s to iLO at %s\n" % (filename, url))
+        return (server, url)
+
+    def updatefleet(self, firmware, options):
+        """ Update every server of the multiple server file, a wave of
+        servers at a time. The servers of a wave are updated together and
+        polled by one poller, then waited for while iLO resets and logged
+        in to again to verify the firmware version. No more waves are
+        started once the failure rate passes the limit.
+
+        :param firmware: firmware URI or local firmware file
+        :type firmware: str
+        :param options: command line options
+        :type options: list.
         """
-        counter = 0
-        written = False
-        uploadingpost = False
-        spinner = ['|', '/', '-', '\\']
-        position = 0
-
-        while True:
-            if counter == 100:
-                raise FirmwareUpdateError("Error occurred while updating "\
-                                          "the firmware.")
+        if options.wavesize < 1:
+            raise InvalidCommandLineError("The wave size must be at least 1.")
+        elif not 0 <= options.maxfailurerate <= 100:
+            raise InvalidCommandLineError("The maximum failure rate is a "\
+                                        "percentage between 0 and 100.")
+
+        servers = read_serverlist(options.mpfilename)
+        waves = [servers[index:index + options.wavesize] for index in \
+                                xrange(0, len(servers), options.wavesize)]
+        fileserver = None
+        report = []
+
+        if os.path.isfile(firmware):
+            (bindaddress, address) = serving_address([urlparse.urlparse(\
+                                server[u'url']).hostname for server in \
+                                servers], options.serveraddress)
+            fileserver = FileServer(firmware, address=bindaddress, port=\
+                            options.serverport, certfile=options.certfile, \
+                            keyfile=options.keyfile).start()
+            firmware = fileserver.url(address)
+            sys.stdout.write(u"Serving %s at %s\n" % (fileserver.filename, \
+                                                                    firmware))
+
+        try:
+            for (number, wave) in enumerate(waves, 1):
+                failed = len([result for result in report if \
+                                            result[u'Result'] != u'Updated'])
+
+                if report and failed * 100.0 / len(report) > \
+                                                        options.maxfailurerate:
+                    sys.stderr.write(u"%s of %s server(s) failed, above the "\
+                        u"maximum failure rate of %s%%. Skipping the "\
+                        u"remaining waves.\n" % (failed, len(report), \
+                                                    options.maxfailurerate))
+                    for server in servers[len(report):]:
+                        report.append({u'Url': server[u'url'], u'Result': \
+                                                                u'Skipped'})
+                    break
+
+                sys.stdout.write(u"\nWave %s of %s: updating %s server(s)\n" \
+                                                % (number, len(waves), len(wave)))
+                report.extend(self.updatewave(wave, firmware, options))
+        finally:
+            if fileserver:
+                fileserver.stop()
+
+        sys.stdout.write(u'\n')
+        for result in report:
+            detail = result.get(u'Error') or u', '.join(result.get(\
+                                                        u'Changes', []))
+            sys.stdout.write(u"%s: %s%s\n" % (result[u'Url'], \
+                    result[u'Result'], u' (%s)' % detail if detail else u''))
+
+        failed = len([result for result in report if result[u'Result'] != \
+                                                                u'Updated'])
+        if failed:
+            raise FirmwareUpdateError(u"%s of %s server(s) were not updated." \
+                                                        % (failed, len(report)))
+
+        sys.stdout.write(u"All %s server(s) were updated.\n" % len(report))
+
+    def updatewave(self, wave, firmware, options):
+        """ Update one wave of servers, wait for their resets and verify
+        their firmware versions
+
+        :param wave: servers read from the multiple server file
+        :type wave: list
+        :param firmware: firmware URI, the url a local file is served at
+        :type firmware: str
+        :param options: command line options
+        :type options: list.
+        :returns: list of per server results
+        """
+        results = []
+        pollers = []
+
+        #results are kept by position so that a server listed twice is
+        #reported twice
+        for (server, started, error) in run_on_servers(wave, lambda server: \
+                    self.startupdate(server, firmware, options), \
+                    workers=len(wave)):
+            results.append({u'Url': server[u'url'], u'Result': u'Failed', \
+                                u'Error': u'%s' % error if error else None})
+            if not error:
+                (session, path, versions) = started
+                session.index = len(results) - 1
+                results[-1][u'Versions'] = versions
+                pollers.append(ProgressPoller(session.pool, path, update_state, \
+                            label=session.host, interval=2.0, maxinterval=15.0, \
+                            timeout=options.timeout, lines=True))
+                pollers[-1].session = session
+
+        isfailed = lambda poller: (poller.state or u'').lower().startswith(\
+                                                                    u'error')
+        try:
+            outcomes = poll_many(pollers, lambda poller: self.updatedone(\
+                        poller), isfailed=isfailed, workers=len(wave))
+        finally:
+            for poller in pollers:
+                poller.session.logout()
+
+        updated = []
+        for (poller, outcome) in outcomes.iteritems():
+            if outcome == DONE:
+                updated.append(poller.session)
             else:
-                counter += 1
-
-            results = self._rdmc.app.get_handler(path, silent=True)
-            results = results.dict
-            try:
-                results = results['Oem']['Hpe']
-            except:
-                pass
-
-            if not results:
-                raise FirmwareUpdateError("Unable to contact Update Service. Please"\
-                                    " re-login and try again.")
-
-            if results["State"].lower().startswith("idle"):
-                time.sleep(2)
-            elif results["State"].lower().startswith("uploading"):
-                counter = 0
-                if not uploadingpost:
-                    uploadingpost = True
-                else:
-                    if written == False:
-                        written = True
-                        sys.stdout.write("iLO is uploading the necessary files."\
-                                         " Please wait...")
-                time.sleep(0.5)
-            elif results["State"].lower().startswith(("progressing", "updating", \
-                                                        "verifying", "writing")):
-                counter = 0
-                for _ in range(2):
-                    if position < 4:
-                        sys.stdout.write("Updating: "+ spinner[position]+"\r")
-                        position += 1
-                        time.sleep(0.1)
-                    else:
-                        position = 0
-                        sys.stdout.write("Updating: "+ spinner[position]+"\r")
-                        position += 1
-                        time.sleep(0.1)
-            elif results["State"].lower().startswith("complete"):
-                sys.stdout.write(u'\n\nFirmware update has completed and iLO' \
-                                 ' may reset. \nIf iLO resets the' \
-                                 ' session will be terminated.\nPlease wait' \
-                                 ' for iLO to initialize completely before' \
-                                 ' logging in again.\nA reboot may be required'\
-                                 ' for firmware changes to take effect.\n')
-                break
-            elif results["State"].lower().startswith("error"):
-                raise FirmwareUpdateError("Error occurred while updating "\
-                                                                "the firmware.")
+                results[poller.session.index][u'Error'] = u"The update ended "\
+                        u"in state %s after %s seconds." % (poller.state, \
+                                                        int(poller.elapsed))
+
+        for session in self.waitforresets(updated, options):
+            results[session.index][u'Error'] = u"iLO did not answer again " \
+                        u"within %s seconds." % int(options.resettimeout)
+            updated.remove(session)
+
+        indexes = sorted(session.index for session in updated)
+        verified = run_on_servers([wave[index] for index in indexes], \
+                    lambda server: self.serverversions(server), \
+                    workers=len(wave))
+
+        for (index, (_, versions, error)) in zip(indexes, verified):
+            result = results[index]
+
+            if error:
+                result[u'Error'] = u"Unable to verify the version: %s" % error
+                continue
+
+            before = result.pop(u'Versions')
+            changes = [u'%s %s -> %s' % (name, before.get(name, u'-'), \
+                            version) for (name, version) in sorted(\
+                            versions.iteritems()) if before.get(name) != version]
+
+            if options.expectedversion:
+                matched = any(options.expectedversion in version for version \
+                                                        in versions.values())
+            else:
+                matched = bool(changes)
+
+            if matched:
+                (result[u'Result'], result[u'Error']) = (u'Updated', None)
+                result[u'Changes'] = changes
+            else:
+                result[u'Error'] = u"The firmware version did not change." if \
+                        not options.expectedversion else u"Version %s not " \
+                        u"found after the update." % options.expectedversion
+
+        for result in results:
+            result.pop(u'Versions', None)
+
+        return results
+
+    def startupdate(self, server, firmware, options):
+        """ Log in to one server, record its firmware versions and start
+        the update
+
+        :param server: server read from the multiple server file
+        :type server: dict
+        :param firmware: firmware URI, the url a local file is served at
+        :type firmware: str
+        :param options: command line options
+        :type options: list.
+        :returns: (logged in session, update service path, versions)
+        """
+        session = open_session(server, self._rdmc.opts.verbose, \
+                                                        workers=2).login()
+
+        try:
+            (path, service) = update_service(session.pool)
+            versions = firmware_versions(session.pool)
+
+            (target, body) = update_request(service, firmware, \
+                                                        options.tpmenabled)
+            response = session.pool.request('POST', target, body=body)
+
+            if response.status not in (200, 202, 204):
+                raise FirmwareUpdateError(u"The update was refused, status " \
+                                                    u"%s." % response.status)
+        except:
+            session.logout()
+            raise
+
+        return (session, path, versions)
+
+    def updatedone(self, poller):
+        """ An update is done when the service says so, or when iLO went
+        away in the middle of it to reset, which the version check after the
+        reset then confirms
+
+        :param poller: poller of the update service
+        :type poller: ProgressPoller
+        """
+        state = (poller.state or u'').lower()
+
+        if state.startswith(u'complete'):
+            return True
+
+        return state == UNREACHABLE.lower() and any(previous not in (None, \
+                                    UNREACHABLE) for previous in poller.history)
+
+    def waitforresets(self, sessions, options):
+        """ Wait for the iLOs of updated servers to reset and answer again.
+        An iLO still answering after the grace period is taken as not
+        resetting, for firmware that needs no iLO reset.
+
+        :param sessions: sessions of the updated servers
+        :type sessions: list
+        :param options: command line options
+        :type options: list.
+        :returns: sessions of the servers that did not answer in time
+        """
+        pollers = []
+
+        for session in sessions:
+            pollers.append(ProgressPoller(SessionPool(None, workers=1, \
+                        timeout=10, url=session.url), u'/redfish/v1/', \
+                        lambda _: AVAILABLE, label=u'%s iLO' % session.host, \
+                        interval=2.0, maxinterval=15.0, timeout=\
+                        options.resettimeout, lines=True))
+            pollers[-1].session = session
+
+        if not pollers:
+            return []
+
+        sys.stdout.write(u"Waiting for %s iLO(s) to reset\n" % len(pollers))
+
+        try:
+            outcomes = poll_many(pollers, lambda poller: poller.state == \
+                        AVAILABLE and (UNREACHABLE in poller.history or \
+                        poller.elapsed >= options.resetgrace), \
+                        workers=len(pollers))
+        finally:
+            for poller in pollers:
+                poller.pool.close()
+
+        return [poller.session for (poller, outcome) in outcomes.iteritems() \
+                                                            if outcome != DONE]
+
+    def serverversions(self, server):
+        """ Log in to one server again and read its firmware versions
+
+        :param server: server read from the multiple server file
+        :type server: dict
+        """
+        with open_session(server, self._rdmc.opts.verbose, workers=4) as \
+                                                                    session:
+            return firmware_versions(session.pool)
 
     def firmwareupdatevalidation(self, options):
         """ Firmware update method validation function
@@ -256,3 +553,84 @@ class FirmwareUpdateCommand(RdmcCommandBase):
             " has a TPM chip installed.",
             default=False
         )
+        customparser.add_option(
+            '--timeout',
+            dest='timeout',
+            type="float",
+            help="Seconds to wait for the update to complete. (default 1800)",
+            default=1800,
+        )
+        customparser.add_option(
+            '--serveraddress',
+            dest='serveraddress',
+            help="Address iLO reaches this system on when updating from a"\
+            " local file, the file is then served on every interface. By"\
+            " default it is only served on the interface iLO is reached"\
+            " through, which has to be the same for every server in"\
+            " multiple server mode.",
+            default=None,
+        )
+        customparser.add_option(
+            '--serverport',
+            dest='serverport',
+            type="int",
+            help="Port the local file is served on. By default any free port"\
+            " is used.",
+            default=0,
+        )
+        customparser.add_option(
+            '--certfile',
+            dest='certfile',
+            help="PEM certificate to serve the local file over HTTPS with.",
+            default=None,
+        )
+        customparser.add_option(
+            '--keyfile',
+            dest='keyfile',
+            help="PEM private key of the certificate given with the certfile"\
+            " flag, if it is not part of the certificate file.",
+            default=None,
+        )
+        add_fleet_options(customparser, "Update every server", note="A local"\
+                    " firmware file is served to all of them at once.", \
+                                                            maxservers=False)
+        customparser.add_option(
+            '--wavesize',
+            dest='wavesize',
+            type="int",
+            help="Number of servers updated at the same time when updating"\
+            " multiple servers. (default 10)",
+            default=10,
+        )
+        customparser.add_option(
+            '--maxfailurerate',
+            dest='maxfailurerate',
+            type="float",
+            help="Percentage of failed servers above which no more waves are"\
+            " started when updating multiple servers. (default 10)",
+            default=10,
+        )
+        customparser.add_option(
+            '--expectedversion',
+            dest='expectedversion',
+            help="Firmware version the servers must report after the update"\
+            " when updating multiple servers. By default any changed version"\
+            " is accepted.",
+            default=None,
+        )
+        customparser.add_option(
+            '--resettimeout',
+            dest='resettimeout',
+            type="float",
+            help="Seconds to wait for each iLO to reset and answer again"\
+            " after the update. (default 600)",
+            default=600,
+        )
+        customparser.add_option(
+            '--resetgrace',
+            dest='resetgrace',
+            type="float",
+            help="Seconds after which an iLO that kept answering is taken as"\
+            " not resetting after the update. (default 60)",
+            default=60,
+        )
@@ -23,6 +23,11 @@ from optparse import OptionParser
 from rdmc_base_classes import RdmcCommandBase
 from rdmc_helper import ReturnCodes, InvalidCommandLineError, AccountExists,\
                     InvalidCommandLineErrorOPTS, NoContentsFoundForOperationError
+from rdmc_accounts import read_account_file, apply_accounts
+from rdmc_collection import MemberCache, member_path
+from rdmc_fleet import read_serverlist, run_on_servers, open_session, \
+                    add_fleet_options
+from rdmc_session_pool import SessionPool
 
 class IloAccountsCommand(RdmcCommandBase):
     """ command to manipulate/add ilo user accounts """
@@ -39,7 +44,17 @@ class IloAccountsCommand(RdmcCommandBase):
                 'Get Id and LoginName info of iLO user accounts.\n\t'\
                 'example: iloaccounts\n\n\tDelete an iLO account.\n\t'\
                 'iloaccounts delete [LOGINNAMEorID#]\n\t'\
-                'example: iloaccounts delete accountLoginName\n\n'
+                'example: iloaccounts delete accountLoginName\n\n\t'\
+                'Create, update and delete accounts so that they match an '\
+                'account\n\tfile, on the logged in server or every server '\
+                'of a server file.\n\t'\
+                'iloaccounts apply [FILENAME] [--multiprocessing SERVERFILE]\n\t'\
+                'example: iloaccounts apply accounts.json\n\t'\
+                'The file holds {"Accounts": [{"UserName": ..., "LoginName": '\
+                '...,\n\t"Password": ..., "Privileges": {...}}]}. Accounts '\
+                'with "Absent": true\n\tare deleted, with --prune every '\
+                'account not listed is. A password\n\tgiven is always set,'\
+                ' other properties only when they differ.\n\n'
                 '\tDESCRIPTIONS:\n\tLOGINNAME:  The account name, not used ' \
                 'to login.\n\tUSERNAME: The account username name, used' \
                 ' to login. \n\tPASSWORD:  The account password, used to login.'
@@ -56,6 +71,7 @@ class IloAccountsCommand(RdmcCommandBase):
         self.typepath = rdmcObj.app.typepath
         self.lobobj = rdmcObj.commandsDict["LoginCommand"](rdmcObj)
         self.logoutobj = rdmcObj.commandsDict["LogoutCommand"](rdmcObj)
+        self.membercache = MemberCache()
 
     def run(self, line):
         """ Main iloaccounts function
@@ -73,22 +89,15 @@ class IloAccountsCommand(RdmcCommandBase):
         if len(args) > 4:
             raise InvalidCommandLineError("Invalid number of parameters for "\
                                           "this command.")
+        elif args and args[0].lower() == 'apply':
+            return self.applyaccounts(args[1:], options)
 
         self.iloaccountsvalidation(options)
 
-        redfish = self._rdmc.app.current_client.monolith.is_redfish
-        results = self._rdmc.app.get_handler(self.typepath.defs.accountspath,\
-                                              service=False, silent=True).dict\
-                                        [self.typepath.defs.collectionstring]
+        #listing reads the accounts again, changes reuse the last listing
+        results = self.getaccounts(refresh=len(args) == 0)
         path = None
 
-        if 'Id' not in results[0].keys():
-            newresults = []
-            for acct in results:
-                acct = self._rdmc.app.get_handler(acct[self.typepath.defs.\
-                                hrefstring], service=True, silent=True).dict
-                newresults.append(acct)
-            results = newresults
         if not results:
             raise NoContentsFoundForOperationError("")
 
@@ -106,17 +115,7 @@ class IloAccountsCommand(RdmcCommandBase):
                                             oemhp]['LoginName'], privstr))
         elif args[0].lower() == 'changepass':
             if len(args) == 3:
-                account = args[1]
-                for acct in results:
-                    if acct['Id'] == account or acct['Oem'][self.typepath.\
-                                                            defs.oemhp]\
-                                                    ['LoginName'] == account:
-                        if redfish:
-                            path = acct['@odata.id']
-                            break
-                        else:
-                            path = acct['links']['self']['href']
-                            break
+                path = self.accountpath(args[1], results)
                 body = {'Password': args[2]}
                 if path and body:
                     self._rdmc.app.patch_handler(path, body, service=True)
@@ -144,6 +143,7 @@ class IloAccountsCommand(RdmcCommandBase):
 
             if path and body:
                 resp = self._rdmc.app.post_handler(path, body)
+                self.membercache.invalidate(path)
 
         elif args[0].lower() == 'delete':
             args.remove('delete')
@@ -152,19 +152,11 @@ class IloAccountsCommand(RdmcCommandBase):
             except:
                 raise InvalidCommandLineError('No item entered to delete.')
 
-            for acct in results:
-                if acct['Id'] == account or acct['Oem'][self.typepath.\
-                                                    defs.oemhp]\
-                                            ['LoginName'] == account:
-                    if redfish:
-                        path = acct['@odata.id']
-                        break
-                    else:
-                        path = acct['links']['self']['href']
-                        break
+            path = self.accountpath(account, results)
 
             if path:
                 self._rdmc.app.delete_handler(path)
+                self.membercache.invalidate(self.typepath.defs.accountspath)
             else:
                 raise NoContentsFoundForOperationError('Unable to find '\
                                             'the specified account.')
@@ -173,6 +165,138 @@ class IloAccountsCommand(RdmcCommandBase):
 
         return ReturnCodes.SUCCESS
 
+    def applyaccounts(self, args, options):
+        """ Bring the accounts of the logged in server, or of every server of
+        the multiple server file, to the state of an account file
+
+        :param args: account file
+        :type args: list.
+        :param options: command line options
+        :type options: list.
+        """
+        if not len(args) == 1:
+            raise InvalidCommandLineError('Provide one account file to apply.')
+
+        accounts = read_account_file(args[0])
+
+        if not options.mpfilename:
+            self.iloaccountsvalidation(options)
+            pool = SessionPool(self._rdmc.app, workers=8, \
+                                            verbose=self._rdmc.opts.verbose)
+            try:
+                result = apply_accounts(pool, accounts, self.typepath.defs.\
+                        accountspath, self.typepath.defs.collectionstring, \
+                        self.typepath.defs.oemhp, options.prune, \
+                                                        self.sessionuser())
+            finally:
+                pool.close()
+                self.membercache.invalidate(self.typepath.defs.accountspath)
+
+            self.printresult(self._rdmc.app.config.get_url() or u'local', \
+                                                                        result)
+            if result[u'Errors']:
+                return ReturnCodes.MULTIPLE_SERVER_CONFIG_FAIL
+
+            return ReturnCodes.SUCCESS
+
+        servers = read_serverlist(options.mpfilename)
+        failed = False
+
+        for (server, result, error) in run_on_servers(servers, lambda server: \
+                    self.applyserver(server, accounts, options.prune), \
+                                                workers=options.maxservers):
+            if error:
+                sys.stderr.write(u"%s: %s\n" % (server[u'url'], error))
+                failed = True
+            else:
+                self.printresult(server[u'url'], result)
+                failed = failed or bool(result[u'Errors'])
+
+        if failed:
+            return ReturnCodes.MULTIPLE_SERVER_CONFIG_FAIL
+
+        return ReturnCodes.SUCCESS
+
+    def applyserver(self, server, accounts, prune):
+        """ Log in to one server and apply the account file over that session
+
+        :param server: server read from the multiple server file
+        :type server: dict
+        :param accounts: accounts of the account file
+        :type accounts: list.
+        :param prune: delete the accounts the file does not list
+        :type prune: boolean.
+        """
+        with open_session(server, self._rdmc.opts.verbose) as session:
+            return apply_accounts(session.pool, accounts, prune=prune, \
+                                                        keep=server[u'user'])
+
+    def printresult(self, url, result):
+        """ Print what applying the account file changed on one server
+
+        :param url: server the file was applied to
+        :type url: str.
+        :param result: result of applying the file
+        :type result: dict.
+        """
+        changes = [u'%s %s' % (action.lower(), u', '.join(result[action])) \
+                    for action in (u'Created', u'Updated', u'Deleted') if \
+                                                                result[action]]
+        changes.append(u'%s unchanged' % result[u'Unchanged'])
+
+        sys.stdout.write(u"%s: %s\n" % (url, u'; '.join(changes)))
+
+        for error in result[u'Errors']:
+            sys.stderr.write(u"%s: %s\n" % (url, error))
+
+    def sessionuser(self):
+        """ User name of the current session, the account apply never
+        deletes """
+        try:
+            rest_client = self._rdmc.app.current_client._rest_client
+            sespath = rest_client._RestClientBase__session_location
+            sespath = rest_client.default_prefix + sespath.split(\
+                                                rest_client.default_prefix)[-1]
+            return self._rdmc.app.get_handler(sespath, service=False, \
+                                                silent=True).dict['UserName']
+        except Exception:
+            return self._rdmc.app.config.get_username()
+
+    def getaccounts(self, refresh=False):
+        """ Accounts of the logged in server, read with their members
+        expanded or fetched concurrently and cached for the session
+
+        :param refresh: read the accounts even when cached
+        :type refresh: boolean.
+        """
+        pool = SessionPool(self._rdmc.app, workers=8, \
+                                            verbose=self._rdmc.opts.verbose)
+        try:
+            return self.membercache.members(pool, self.typepath.defs.\
+                accountspath, self.typepath.defs.collectionstring, refresh)
+        finally:
+            pool.close()
+
+    def accountpath(self, account, accounts):
+        """ Path of an account given by Id or login name. Accounts cached by
+        an earlier command are read again when the account is not in them.
+
+        :param account: Id or login name of the account
+        :type account: str.
+        :param accounts: accounts of the server
+        :type accounts: list.
+        """
+        for retry in (False, True):
+            if retry:
+                accounts = self.getaccounts(refresh=True)
+
+            for acct in accounts:
+                if acct['Id'] == account or acct['Oem'][self.typepath.\
+                                        defs.oemhp]['LoginName'] == account:
+                    return member_path(acct)
+
+        return None
+
     def getprivs(self, options):
         """ find and return the current available session privileges """
         if self._rdmc.app.current_client:
@@ -334,3 +458,13 @@ class IloAccountsCommand(RdmcCommandBase):
             help="Optionally include this flag if you wish to set the "\
             "login privileges to false."
         )
+        customparser.add_option(
+            '--prune',
+            dest='prune',
+            action="store_true",
+            help="Use this flag with apply to delete every account the "\
+            "account file does not list, except the one logged in with.",
+            default=False,
+        )
+        add_fleet_options(customparser, "Use this flag with apply to apply "\
+                                    "the account file to every server")
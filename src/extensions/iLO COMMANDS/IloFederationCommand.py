@@ -23,6 +23,8 @@ from optparse import OptionParser
 from rdmc_base_classes import RdmcCommandBase
 from rdmc_helper import ReturnCodes, InvalidCommandLineError, AccountExists,\
                     InvalidCommandLineErrorOPTS, NoContentsFoundForOperationError
+from rdmc_collection import MemberCache, member_path
+from rdmc_session_pool import SessionPool
 
 class IloFederationCommand(RdmcCommandBase):
     """ Add a new ilo account to the server """
@@ -54,6 +56,7 @@ class IloFederationCommand(RdmcCommandBase):
         self._rdmc = rdmcObj
         self.typepath = rdmcObj.app.typepath
         self.lobobj = rdmcObj.commandsDict["LoginCommand"](rdmcObj)
+        self.membercache = MemberCache()
 
     def run(self, line):
         """ Main addfederation function
@@ -74,20 +77,9 @@ class IloFederationCommand(RdmcCommandBase):
 
         self.addfederationvalidation(options)
 
-        redfish = self._rdmc.app.current_client.monolith.is_redfish
         path = self.typepath.defs.federationpath
-        results = self._rdmc.app.get_handler(path,\
-                                              service=True, silent=True).dict
-        newresults = []
-        if redfish:
-            results = results['Members']
-        else:
-            results = results['links']['Member']
-        for fed in results:
-            fed = self._rdmc.app.get_handler(fed[self.typepath.defs.hrefstring]\
-                                              , service=True, silent=True).dict
-            newresults.append(fed)
-            results = newresults
+        #listing reads the groups again, changes reuse the last listing
+        results = self.getfederations(refresh=len(args) == 0)
 
         if len(args) == 0:
             sys.stdout.write("iLO Federation Id list with Privileges:\n")
@@ -115,6 +107,7 @@ class IloFederationCommand(RdmcCommandBase):
 
             if path and body:
                 resp = self._rdmc.app.post_handler(path, body, response=True)
+                self.membercache.invalidate(path)
 
             if resp and resp.dict:
                 if 'resourcealreadyexist' in str(resp.dict).lower():
@@ -128,14 +121,7 @@ class IloFederationCommand(RdmcCommandBase):
             except:
                 raise InvalidCommandLineError('Invalid number of parameters.')
 
-            for fed in results:
-                if fed['Id'] == name:
-                    if redfish:
-                        path = fed['@odata.id']
-                        break
-                    else:
-                        path = fed['links']['self']['href']
-                        break
+            path = self.federationpath(name, results) or path
             body = {'Key': newkey}
             if path and body:
                 self._rdmc.app.patch_handler(path, body, service=True)
@@ -150,16 +136,10 @@ class IloFederationCommand(RdmcCommandBase):
             except:
                 raise InvalidCommandLineError("No Id entered to delete.")
 
-            for fed in results:
-                if fed['Id'] == name:
-                    if redfish:
-                        path = fed['@odata.id']
-                        break
-                    else:
-                        path = fed['links']['self']['href']
-                        break
+            path = self.federationpath(name, results) or path
             if not path == self.typepath.defs.federationpath:
                 self._rdmc.app.delete_handler(path)
+                self.membercache.invalidate(self.typepath.defs.federationpath)
             else:
                 raise NoContentsFoundForOperationError('Unable to find the specified'\
                                                                     ' account.')
@@ -168,6 +148,40 @@ class IloFederationCommand(RdmcCommandBase):
 
         return ReturnCodes.SUCCESS
 
+    def getfederations(self, refresh=False):
+        """ Federation groups of the logged in server, read with their
+        members expanded or fetched concurrently and cached for the session
+
+        :param refresh: read the groups even when cached
+        :type refresh: boolean.
+        """
+        pool = SessionPool(self._rdmc.app, workers=8, \
+                                            verbose=self._rdmc.opts.verbose)
+        try:
+            return self.membercache.members(pool, self.typepath.defs.\
+                                                federationpath, refresh=refresh)
+        finally:
+            pool.close()
+
+    def federationpath(self, name, feds):
+        """ Path of a federation group. Groups cached by an earlier command
+        are read again when the group is not in them.
+
+        :param name: Id of the federation group
+        :type name: str.
+        :param feds: federation groups of the server
+        :type feds: list.
+        """
+        for retry in (False, True):
+            if retry:
+                feds = self.getfederations(refresh=True)
+
+            for fed in feds:
+                if fed['Id'] == name:
+                    return member_path(fed)
+
+        return None
+
     def addvalidation(self, username, key, feds):
         """ add validation function
 
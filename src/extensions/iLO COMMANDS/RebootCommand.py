@@ -24,6 +24,12 @@ from optparse import OptionParser
 from rdmc_base_classes import RdmcCommandBase
 from rdmc_helper import ReturnCodes, InvalidCommandLineError, \
                 InvalidCommandLineErrorOPTS, NoContentsFoundForOperationError
+from rdmc_progress import ProgressPoller
+from rdmc_session_pool import SessionPool
+
+#states of a server that finished booting
+BOOTEDSTATES = ['FinishedPost', 'InPostDiscoveryComplete', 'On']
+POWEREDOFFSTATES = ['PowerOff', 'Off']
 
 class RebootCommand(RdmcCommandBase):
     """ Reboot server that is currently logged in """
@@ -95,7 +101,7 @@ class RebootCommand(RdmcCommandBase):
             pass
 
         if results:
-            put_path = results.resp.request.path
+            put_path = system_path = results.resp.request.path
         else:
             raise NoContentsFoundForOperationError("Unable to find %s" % select)
 
@@ -141,11 +147,66 @@ class RebootCommand(RdmcCommandBase):
             body = {"Action": action, "ResetType": "ForceRestart"}
 
         self._hprmc.app.post_handler(put_path, body)
+
+        if options.wait:
+            self.waitforreboot(system_path, args[0].lower() if args else \
+                                        "forcerestart", timeout=options.timeout)
+
         self.logoutobj.logoutfunction("")
 
         #Return code
         return ReturnCodes.SUCCESS
 
+    def waitforreboot(self, path, flag, timeout=None):
+        """wait for the server to reach the state the reset leads to
+
+        :param path: path of the computer system
+        :type path: str
+        :param flag: reset that was requested
+        :type flag: str
+        :param timeout: seconds to wait
+        :type timeout: float
+        """
+        if flag == "nmi":
+            return
+
+        pool = SessionPool(self._hprmc.app)
+        poller = ProgressPoller(pool, path, self.poststate, label=u'Reboot', \
+                            interval=2.0, maxinterval=15.0, timeout=timeout)
+
+        if flag in ("forceoff", "pressandhold"):
+            isdone = lambda state: state in POWEREDOFFSTATES
+        elif flag == "on":
+            isdone = lambda state: state in BOOTEDSTATES
+        elif flag in ("press", "pushpowerbutton"):
+            #the button toggles the power, any other stable state will do
+            isdone = lambda state: state in BOOTEDSTATES + POWEREDOFFSTATES \
+                            and len(poller.history) > 1 and state not in \
+                            (BOOTEDSTATES if poller.history[0] in BOOTEDSTATES \
+                                                        else POWEREDOFFSTATES)
+        else:
+            isdone = lambda state: state in BOOTEDSTATES and any(prev not in \
+                                    BOOTEDSTATES for prev in poller.history)
+
+        try:
+            poller.wait(isdone)
+        finally:
+            pool.close()
+
+    def poststate(self, results):
+        """POST state of the server, its power state if there is none
+
+        :param results: computer system resource
+        :type results: dict
+        """
+        for oem in ('Hpe', 'Hp'):
+            try:
+                return results['Oem'][oem]['PostState']
+            except (KeyError, TypeError):
+                pass
+
+        return results['PowerState']
+
     def printreboothelp(self, flag):
         """helper print function for reboot function
 
@@ -285,3 +346,19 @@ class RebootCommand(RdmcCommandBase):
             help="Optionally include logs in the data retrieval process.",
             default=False,
         )
+        customparser.add_option(
+            '--wait',
+            dest='wait',
+            action="store_true",
+            help="Wait for the server to finish booting, or to be powered"\
+            " off, before returning. The progress is written as JSON lines"\
+            " when the output is not a terminal.",
+            default=False,
+        )
+        customparser.add_option(
+            '--timeout',
+            dest='timeout',
+            type="float",
+            help="Seconds to wait with the wait flag. (default 900)",
+            default=900,
+        )
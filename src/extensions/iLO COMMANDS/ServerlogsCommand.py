@@ -22,11 +22,15 @@ import sys
 import json
 import time
 import ctypes
+import select
 import string
+import struct
 import tempfile
 import datetime
 import platform
 import itertools
+import urllib
+import threading
 import subprocess
 
 from optparse import OptionParser
@@ -35,6 +39,18 @@ from rdmc_helper import ReturnCodes, InvalidCommandLineError, \
                 InvalidCommandLineErrorOPTS, InvalidFileInputError, \
                 NoContentsFoundForOperationError, IncompatibleiLOVersionError,\
                 InvalidCListFileError, PartitionMoutingError
+from rdmc_compress import compress_file, compression_for, open_output, \
+                                                                    write_json
+from rdmc_download import download
+from rdmc_filter import compile_filter
+from rdmc_fleet import LineWriter, read_serverlist, run_on_servers, \
+                                            open_session, add_fleet_options
+from rdmc_log_collect import LOGFILES, LOGENTRYTYPES, ahs_location, \
+            discover_ahs, iter_log_entries, log_filename, write_manifest
+from rdmc_log_follow import LogFollower, discover_log_path, follow_events
+from rdmc_log_sync import LogWatermarks, entry_key, host_key, is_newer, \
+                                                                    member_id
+from rdmc_session_pool import SessionPool
 
 import redfish.hpilo.risblobstore2 as risblobstore2
 
@@ -43,6 +59,13 @@ if os.name == 'nt':
 elif sys.platform != 'darwin':
     import pyudev
 
+#seconds to wait for the blackbox to be mounted
+BBMOUNTTIMEOUT = 20
+#seconds left to the OS to mount the blackbox before mounting it manually
+BBAUTOMOUNTGRACE = 4
+#seconds followed servers are given to log out once following is stopped
+FOLLOWSTOPTIMEOUT = 10
+
 class ServerlogsCommand(RdmcCommandBase):
     """ Download logs from the server that is currently logged in """
     def __init__(self, rdmcObj):
@@ -60,13 +83,26 @@ class ServerlogsCommand(RdmcCommandBase):
                     ' logs from the logged in server.\n\texample: serverlogs ' \
                     '--selectlog=IML -f IMLlog.txt\n\n\tClear the IML logs ' \
                     'from the logged in server.\n\texample: serverlogs ' \
-                    '--selectlog=IML --clearlog\n\n\t(IML LOGS ONLY FEATURE)' \
+                    '--selectlog=IML --clearlog\n\n\tAppend the IML entries ' \
+                    'added since the previous sync to an archive.\n\texample: '\
+                    'serverlogs --selectlog=IML --sync -f IMLlog.ndjson' \
+                    '\n\n\tWrite new IEL entries of many servers as they are ' \
+                    'logged.\n\texample: serverlogs --selectlog=IEL --follow '\
+                    '--multiprocessing servers.txt' \
+                    '\n\n\tCollect the IML, IEL and AHS of many servers at ' \
+                    'once into one directory per server.\n\texample: serverlogs'\
+                    ' --selectlog=IML,IEL,AHS --multiprocessing servers.txt '\
+                    '--directorypath=logs --compression=gzip' \
+                    '\n\n\t(IML LOGS ONLY FEATURE)' \
                     '\n\tInsert entry in the IML logs from the logged in ' \
                     'server.\n\texample: serverlogs --selectlog=IML -m "Text' \
                     ' message for maintenance"\n\n\t(AHS LOGS ONLY FEATURE IN REMOTE MODE)'\
                     '\n\tInsert customized string if required for AHS log to be'\
                     ' downloaded. \n\texample: serverlogs --selectlog=AHS -f '\
                     'AHSlog.ahs --customiseAHS "from=2014-03-01&&to=2014-03-30"'\
+                    '\n\n\t(AHS LOGS ONLY FEATURE)\n\tDownload the AHS logs of a' \
+                    ' date range.\n\texample: serverlogs --selectlog=AHS '\
+                    '--from=2017-10-01 --to=2017-10-15'\
                     '\n\n\t(AHS LOGS ONLY FEATURE)\n\tInsert the location/path of' \
                     'directory where AHS log needs to be saved.'\
                     ' \n\texample: serverlogs --selectlog=AHS -f '\
@@ -97,6 +133,14 @@ class ServerlogsCommand(RdmcCommandBase):
             else:
                 raise InvalidCommandLineErrorOPTS("")
 
+        if options.follow and options.mpfilename:
+            self.followlogs(options=options)
+            return ReturnCodes.SUCCESS
+        elif options.mpfilename:
+            if self.collectfleet(options):
+                return ReturnCodes.NO_CONTENTS_FOUND_FOR_OPERATION
+            return ReturnCodes.SUCCESS
+
         self.serverlogsvalidation(options)
 
         self.serverlogsworkerfunction(options)
@@ -121,6 +165,8 @@ class ServerlogsCommand(RdmcCommandBase):
             path = self.returnielpath(options=options)
         elif options.service == 'AHS' and options.filter:
             raise InvalidCommandLineError("Cannot filter AHS logs.")
+        elif options.service == 'AHS' and (options.sync or options.follow):
+            raise InvalidCommandLineError("Cannot sync or follow AHS logs.")
         elif options.service == 'AHS' and self.typepath.url.\
                 startswith(u"blobstore") and not options.clearlog:
             self.downloadahslocally(options=options)
@@ -136,6 +182,12 @@ class ServerlogsCommand(RdmcCommandBase):
             self.clearlog(path)
         elif options.mainmes:
             self.addmaintenancelogentry(options, path=path)
+        elif options.service == 'AHS':
+            self.downloadahsdata(path=path, options=options)
+        elif options.follow:
+            self.followlogs(path=path, options=options)
+        elif options.sync:
+            self.synclog(path=path, options=options)
         else:
             data = self.downloaddata(path=path, options=options)
         self.savedata(options=options, data=data)
@@ -187,26 +239,35 @@ class ServerlogsCommand(RdmcCommandBase):
             self._rdmc.app.post_handler(path, bodydict[u"body"], verbose=\
                                          self._rdmc.opts.verbose)
 
-    def downloaddata(self, path=None, options=None):
+    def downloaddata(self, path=None, options=None, since=None):
         """Worker function to download the log files
 
         :param options: command line options
         :type options: list.
         :param path: path to download logs
         :type path: str
+        :param since: watermark of the entries already collected, used to
+                      skip older entries where the log layout allows it
+        :type since: dict
         """
         if path:
-            if options.service == 'AHS':
-                data = self._rdmc.app.get_handler(path, silent=True, \
-                                                        uncache=True)
-                if data:
-                    return data.read
-                else:
-                    raise NoContentsFoundForOperationError\
-                                        (u"Unable to retrieve AHS logs.")
-            elif self.typepath.defs.isgen10:
-                path = path + u'?$expand=.'
-                data = self._rdmc.app.get_handler(path, silent=True)
+            compiled = compile_filter(options.filter) if options.filter else \
+                                                                        None
+            filtered = False
+
+            if self.typepath.defs.isgen10:
+                data = None
+                odata = compiled.odata(LOGENTRYTYPES) if compiled else None
+
+                if odata and self.filterquerysupported():
+                    data = self._rdmc.app.get_handler(path + u'?$expand=.&' \
+                                u'$filter=' + urllib.quote(odata.encode(\
+                                'utf-8'), safe=''), silent=True, uncache=True)
+                    filtered = bool(data) and data.status == 200
+
+                if not filtered:
+                    path = path + u'?$expand=.'
+                    data = self._rdmc.app.get_handler(path, silent=True)
             else:
                 data = self._rdmc.app.get_handler(path, silent=True)
             datadict = data.dict
@@ -217,33 +278,48 @@ class ServerlogsCommand(RdmcCommandBase):
                 sys.stdout.write(u'No data available within log.\n')
                 raise NoContentsFoundForOperationError("Unable to retrieve logs.")
 
-            if self.typepath.defs.flagforrest:
-                morepages = True
-                while morepages:
-                    if 'links' in datadict and 'NextPage' in datadict['links']:
-                        next_link_uri = path + '?page=' + \
-                                        str(datadict['links']['NextPage']['page'])
-                        href = u'%s' % next_link_uri
-                        data = self._rdmc.app.get_handler(href, silent=True)
-                        datadict = data.dict
-                        try:
-                            completedatadictlist = completedatadictlist+\
-                                                    datadict[u'Items']
-                        except:
-                            sys.stdout.write(u'No data available within log.\n')
-                            raise NoContentsFoundForOperationError(u"Unable to "\
-                                                           u"retrieve logs.")
+            if self.typepath.defs.flagforrest or not self.typepath.defs.isgen10:
+                pool = SessionPool(self._rdmc.app, workers=options.parallel, \
+                                            verbose=self._rdmc.opts.verbose)
+                try:
+                    if self.typepath.defs.flagforrest:
+                        completedatadictlist = self.downloadpages(pool, path, \
+                                datadict, list(completedatadictlist), since=since)
                     else:
-                        morepages = False
-            elif not self.typepath.defs.isgen10:
-                datadict = list()
-                for members in completedatadictlist:
-                    memberpath = members[self.typepath.defs.hrefstring]
-                    data = self._rdmc.app.get_handler(memberpath, silent=True)
-                    datadict = datadict+[data.dict]
-                completedatadictlist = datadict
-
-            if completedatadictlist:
+                        hrefstring = self.typepath.defs.hrefstring
+
+                        if since:
+                            completedatadictlist = self.newermembers(\
+                                                    completedatadictlist, since)
+
+                        paths = [member[hrefstring] for member in \
+                                                        completedatadictlist]
+                        responses = pool.getall(paths)
+                        failed = [u'%s (%s)' % (memberpath, response.status) \
+                                    for (memberpath, response) in zip(paths, \
+                                    responses) if response.status != 200]
+
+                        if failed:
+                            raise NoContentsFoundForOperationError(u"Unable "\
+                                    u"to retrieve log entries: %s" % \
+                                                        u', '.join(failed))
+
+                        completedatadictlist = [response.dict for response \
+                                                                in responses]
+                finally:
+                    pool.close()
+
+            if filtered:
+                #the entries the service filtered are matched the same way
+                #as entries filtered here
+                completedatadictlist = list(compiled.filter(\
+                                                    completedatadictlist))
+
+                if not completedatadictlist and not options.sync:
+                    raise NoContentsFoundForOperationError("Filter returned"\
+                                                            " no matches.")
+
+            if completedatadictlist or options.sync:
                 try:
                     return completedatadictlist
                 except Exception:
@@ -256,6 +332,371 @@ class ServerlogsCommand(RdmcCommandBase):
             sys.stdout.write(u"Path not found for input log!\n")
             raise NoContentsFoundForOperationError(u"Unable to retrieve logs.")
 
+    def downloadpages(self, pool, path, datadict, items, since=None):
+        """Download the remaining pages of a REST log collection. A window
+        of pages ahead of the last one read is requested concurrently and
+        the pages are appended in order until one has no next page.
+
+        :param pool: session pool used for the page requests
+        :type pool: SessionPool.
+        :param path: path of the log entries collection
+        :type path: str
+        :param datadict: first page of the collection
+        :type datadict: dict
+        :param items: entries of the first page
+        :type items: list
+        :param since: watermark, pages of a newest first log stop being
+                      requested once an entry at or below it is seen
+        :type since: dict
+        """
+        descending = len(items) > 1 and entry_key(items[0]) > \
+                                                        entry_key(items[-1])
+        reachedmark = lambda entries: since and descending and not \
+                            all(is_newer(entry, since) for entry in entries)
+
+        if not ('links' in datadict and 'NextPage' in datadict['links']) or \
+                                                            reachedmark(items):
+            return items
+
+        page = int(datadict['links']['NextPage']['page'])
+        getpage = lambda num: pool.get(u'%s?page=%s' % (path, num)).dict
+
+        while True:
+            for datadict in pool.imap(getpage, range(page, page+pool.workers)):
+                try:
+                    items.extend(datadict[u'Items'])
+                except:
+                    sys.stdout.write(u'No data available within log.\n')
+                    raise NoContentsFoundForOperationError(u"Unable to "\
+                                                           u"retrieve logs.")
+
+                if not ('links' in datadict and 'NextPage' in datadict['links'])\
+                                            or reachedmark(datadict[u'Items']):
+                    return items
+
+            page += pool.workers
+
+    def filterquerysupported(self):
+        """Check if the service root announces $filter support"""
+        prefix = self._rdmc.app.current_client._rest_client.default_prefix
+
+        try:
+            root = self._rdmc.app.get_handler(prefix, silent=True).dict
+            return root[u'ProtocolFeaturesSupported'][u'FilterQuery'] is True
+        except Exception:
+            return False
+
+    def newermembers(self, members, since):
+        """Drop the log members whose Id is not above the watermark. All
+        members are kept when the Ids look like the log was cleared.
+
+        :param members: members of the log entries collection
+        :type members: list
+        :param since: watermark of the entries already collected
+        :type since: dict
+        """
+        hrefstring = self.typepath.defs.hrefstring
+        ids = [member_id(member.get(hrefstring)) for member in members]
+
+        if None in ids or not ids or max(ids) < since.get(u'Id', -1):
+            return members
+
+        return [member for (member, ident) in zip(members, ids) if \
+                                                    ident > since[u'Id']]
+
+    def synclog(self, path=None, options=None):
+        """Append the log entries newer than the watermark of the server to
+        an NDJSON archive and move the watermark
+
+        :param options: command line options
+        :type options: list.
+        :param path: path to download logs
+        :type path: str
+        """
+        if not options.filename:
+            raise InvalidCommandLineError("Provide a filename for the log "\
+                                                                "archive.")
+
+        watermarks = LogWatermarks(self._rdmc.app.config.get_cachedir(), \
+                                                            self.typepath.url)
+        mark = watermarks.get(options.service)
+
+        entries = self.downloaddata(path=path, options=options, since=mark)
+        entries = sorted([entry for entry in entries if isinstance(entry, dict)\
+                                and is_newer(entry, mark)], key=entry_key)
+
+        try:
+            archived = self.filterdata(data=entries, tofilter=options.filter)
+        except NoContentsFoundForOperationError:
+            archived = []
+
+        with open_output(options.filename[0], 'a', options.compression) as \
+                                                                    archive:
+            for entry in archived:
+                archive.write(json.dumps(entry) + '\n')
+
+        watermarks.update(options.service, entries)
+
+        sys.stdout.write(u"%s new entries appended to '%s'.\n" % \
+                                        (len(archived), options.filename[0]))
+
+    def followlogs(self, path=None, options=None):
+        """Write new log entries as JSON lines until interrupted, for the
+        logged in server or for every server of the multiple server file
+
+        :param options: command line options
+        :type options: list.
+        :param path: path of the log entries of the logged in server
+        :type path: str
+        """
+        if options.service not in ('IML', 'IEL'):
+            raise InvalidCommandLineError("Follow mode is only available for"\
+                                                        " the IML and IEL.")
+        elif not options.mpfilename and self.typepath.defs.flagforrest:
+            raise InvalidCommandLineError("Follow mode needs a Redfish log "\
+                                                                    "service.")
+
+        entryfilter = compile_filter(options.filter) if options.filter else \
+                                                                            None
+        output = open_output(options.filename[0], 'a', options.compression) \
+                                        if options.filename else sys.stdout
+        writer = LineWriter(output)
+        stopevent = threading.Event()
+        threads = []
+
+        if options.mpfilename:
+            for server in read_serverlist(options.mpfilename):
+                threads.append(threading.Thread(target=self.followserver, \
+                        args=(server, options, writer, entryfilter, stopevent)))
+        else:
+            pool = SessionPool(self._rdmc.app, workers=options.parallel, \
+                                            verbose=self._rdmc.opts.verbose)
+            threads.append(threading.Thread(target=self.followpool, args=(\
+                                pool, path, self.typepath.url, options, \
+                                            writer, entryfilter, stopevent)))
+
+        sys.stderr.write(u"Following the %s of %s server(s), press Ctrl-C "\
+                                u"to stop.\n" % (options.service, len(threads)))
+
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            stopevent.set()
+            deadline = time.time() + FOLLOWSTOPTIMEOUT
+
+            for thread in threads:
+                thread.join(max(deadline - time.time(), 0))
+        finally:
+            writer.close()
+
+            if options.filename:
+                output.close()
+
+    def followserver(self, server, options, writer, entryfilter, stopevent):
+        """Log in to one server of the multiple server file and follow its
+        log
+
+        :param server: server read from the multiple server file
+        :type server: dict
+        """
+        try:
+            session = open_session(server, self._rdmc.opts.verbose, workers=\
+                                        options.parallel, timeout=None).login()
+        except Exception, excp:
+            sys.stderr.write(u"%s: %s\n" % (server[u'url'], excp))
+            return
+
+        try:
+            path = discover_log_path(session.pool, options.service)
+            self.followpool(session.pool, path, session.host, options, \
+                                            writer, entryfilter, stopevent)
+        except Exception, excp:
+            sys.stderr.write(u"%s: %s\n" % (session.host, excp))
+        finally:
+            session.logout()
+
+    def followpool(self, pool, path, host, options, writer, entryfilter, \
+                                                                    stopevent):
+        """Follow the log of one server, with its event stream next to it
+        when requested
+
+        :param pool: session pool of the server
+        :type pool: SessionPool.
+        :param path: path of the log entries
+        :type path: str
+        :param host: server written with each entry
+        :type host: str
+        """
+        if options.events:
+            events = threading.Thread(target=self.followevents, args=(pool, \
+                                                    host, writer, stopevent))
+            events.daemon = True
+            events.start()
+
+        LogFollower(pool, path, host, options.service, writer, interval=\
+                    options.interval, maxinterval=options.maxinterval, \
+                    entryfilter=entryfilter).run(stopevent)
+
+    def followevents(self, pool, host, writer, stopevent):
+        """Follow the event stream of a server, if it has one"""
+        if not follow_events(pool, host, writer, stopevent):
+            sys.stderr.write(u"%s has no event stream, the log is only polled"\
+                                                            u".\n" % host)
+
+    def collectfleet(self, options):
+        """Collect the selected logs of every server of the multiple server
+        file at the same time into one directory per server, with a manifest
+        of what was collected
+
+        :param options: command line options
+        :type options: list.
+        :returns: number of servers with logs that could not be collected
+        """
+        services = [service.strip().upper() for service in (options.service \
+                                    or u'').split(u',') if service.strip()]
+        if not services or set(services) - set(LOGFILES):
+            raise InvalidCommandLineError("Select the logs to collect among "\
+                        "IML, IEL and AHS, such as --selectlog=IML,IEL,AHS.")
+        elif options.clearlog or options.mainmes or options.sync:
+            raise InvalidCommandLineError("Only collecting logs is available "\
+                                                    "for multiple servers.")
+        elif u'AHS' in services and (options.fromdate or options.todate) and \
+                            (options.downloadallahs or options.customiseAHS):
+            raise InvalidCommandLineError("The from and to flags cannot be "\
+                        "used with the downloadallahs or customiseAHS flags.")
+
+        outdir = options.directorypath or os.getcwd()
+        compression = compression_for(u'', options.compression)
+        entryfilter = compile_filter(options.filter) if options.filter else \
+                                                                            None
+        servers = read_serverlist(options.mpfilename)
+
+        sys.stdout.write(u"Collecting the %s of %s server(s).\n" % \
+                                        (u', '.join(services), len(servers)))
+
+        results = run_on_servers(servers, lambda server: self.collectserver(\
+                            server, services, outdir, options, entryfilter, \
+                            compression), workers=options.maxservers)
+
+        report = []
+        failed = 0
+        for (server, result, error) in results:
+            if error:
+                result = {u'Host': host_key(server[u'url']), u'Url': \
+                                    server[u'url'], u'Error': u'%s' % error}
+            report.append(result)
+            errors = [u'%s: %s' % (log[u'Log'], log[u'Error']) for log in \
+                            result.get(u'Logs', []) if log.get(u'Error')]
+            if error:
+                errors.append(u'%s' % error)
+            if errors:
+                failed += 1
+                sys.stderr.write(u"%s: %s\n" % (server[u'url'], \
+                                                        u'; '.join(errors)))
+
+        manifest = write_manifest(outdir, report)
+        sys.stdout.write(u"Logs of %s of %s server(s) collected, manifest "\
+                        u"written to '%s'.\n" % (len(servers) - failed, \
+                                                    len(servers), manifest))
+        return failed
+
+    def collectserver(self, server, services, outdir, options, entryfilter, \
+                                                                compression):
+        """Log in to one server of the multiple server file and collect its
+        logs one after the other over the same session
+
+        :param server: server read from the multiple server file
+        :type server: dict
+        :param services: logs to collect
+        :type services: list
+        :param outdir: output directory of the collection
+        :type outdir: str
+        :returns: manifest entry of the server
+        """
+        starttime = time.time()
+        host = host_key(server[u'url'])
+        logs = []
+
+        with open_session(server, self._rdmc.opts.verbose, workers=options.\
+                                        parallel, timeout=None) as session:
+            for service in services:
+                logs.append(self.collectserverlog(session.pool, host, service, \
+                                outdir, options, entryfilter, compression))
+
+        return {u'Host': host, u'Url': server[u'url'], u'Logs': logs, \
+                            u'Duration': round(time.time() - starttime, 3)}
+
+    def collectserverlog(self, pool, host, service, outdir, options, \
+                                                    entryfilter, compression):
+        """Collect one log of a server into its file, IML and IEL entries
+        are written as JSON lines as they are read
+
+        :param pool: session pool of the server
+        :type pool: SessionPool.
+        :param host: directory name of the server
+        :type host: str
+        :param service: IML, IEL or AHS
+        :type service: str
+        :returns: manifest entry of the log
+        """
+        starttime = time.time()
+        filename = log_filename(outdir, host, service, compression)
+        result = {u'Log': service, u'File': os.path.relpath(filename, outdir)}
+
+        try:
+            if service == u'AHS':
+                download(pool, self.fleetahspath(pool, options), filename, \
+                            quiet=True, compression=compression or 'none')
+            else:
+                result[u'Entries'] = 0
+                with open_output(filename, 'w', compression or 'none') as \
+                                                                    output:
+                    for entry in iter_log_entries(pool, discover_log_path(\
+                                                            pool, service)):
+                        if entryfilter and not entryfilter.match(entry):
+                            continue
+                        output.write(json.dumps(entry) + '\n')
+                        result[u'Entries'] += 1
+            result[u'Bytes'] = os.path.getsize(filename)
+        except Exception, excp:
+            result[u'Error'] = u'%s' % excp
+
+        result[u'Duration'] = round(time.time() - starttime, 3)
+        return result
+
+    def fleetahspath(self, pool, options):
+        """AHS download path of a server of the multiple server file, for
+        the last week logged unless asked otherwise
+
+        :param pool: session pool of the server
+        :type pool: SessionPool.
+        :param options: command line options
+        :type options: list.
+        """
+        ahs = discover_ahs(pool)
+        path = ahs_location(ahs)
+
+        if options.downloadallahs:
+            return path
+        elif options.customiseAHS:
+            custr = options.customiseAHS.strip('"\'')
+            if custr.startswith(u"from="):
+                path = path.split(u"downloadAll=1")[0]
+            return path + custr
+
+        first = ahs.get(u"AHSFileStart") if options.fromdate or \
+                                                    options.todate else None
+        (strdate, enddate) = self.getahsdaterange(options, first=first, \
+                                                last=ahs.get(u"AHSFileEnd"))
+        return path.split(u"downloadAll=1")[0] + u"from=%s&&to=%s" % \
+                                                            (strdate, enddate)
+
     def returnimlpath(self, options=None):
         """Return the requested path of the IML logs
 
@@ -384,7 +825,13 @@ class ServerlogsCommand(RdmcCommandBase):
                                 else filtereddict[u"Links"]
                     ahslocpath = linkpath[u'AHSLocation']
                     path = ahslocpath[u'extref']
-                    if options.downloadallahs:
+                    if options.fromdate or options.todate:
+                        (strdate, enddate) = self.getahsdaterange(options, \
+                            first=filtereddict.get("AHSFileStart"), \
+                            last=filtereddict.get("AHSFileEnd"))
+                        path = path.split(u"downloadAll=1")[0]
+                        path = path+"from=%s&&to=%s" % (strdate, enddate)
+                    elif options.downloadallahs:
                         path = path
                     elif options.customiseAHS:
                         custr = options.customiseAHS
@@ -431,20 +878,35 @@ class ServerlogsCommand(RdmcCommandBase):
         """
         if data:
             data = self.filterdata(data=data, tofilter=options.filter)
-            if options.service == 'AHS':
-                filename = self.getahsfilename(options)
-                with open(filename, 'wb') as foutput:
-                    foutput.write(data)
-            elif options.filename:
-                with open(options.filename[0], 'w') as foutput:
-                    if options.json:
-                        foutput.write(str(json.dumps(data, indent=2)))
-                    else:
-                        foutput.write(str(json.dumps(data)))
+            if options.filename:
+                with open_output(options.filename[0], 'w', \
+                                            options.compression) as foutput:
+                    write_json(foutput, data, indent=2 if options.json else \
+                                                                        None)
             else:
                 sys.stdout.write('Provide filename to store data.\n')
                 raise InvalidFileInputError("")
 
+    def downloadahsdata(self, path=None, options=None):
+        """Stream the remote AHS log into the AHS file in chunks
+
+        :param options: command line options
+        :type options: list.
+        :param path: path to download the AHS log
+        :type path: str
+        """
+        filename = self.getahsfilename(options)
+        pool = SessionPool(self._rdmc.app, verbose=self._rdmc.opts.verbose)
+
+        try:
+            download(pool, path, filename, checksum=options.checksum, \
+                    resume=options.resume, compression=options.compression)
+        except NoContentsFoundForOperationError:
+            raise NoContentsFoundForOperationError(u"Unable to retrieve AHS "\
+                                                                    u"logs.")
+        finally:
+            pool.close()
+
     def downloadahslocally(self, options=None):
         """Download AHS logs locally
 
@@ -471,7 +933,7 @@ class ServerlogsCommand(RdmcCommandBase):
         self.lib = risblobstore2.BlobStore2.gethprestchifhandle()
 
         try:
-            (manual_ovr, abspath) = self.getbbabspath()
+            (manual_ovr, abspath) = self.getbbabspath(timeout=0)
         except PartitionMoutingError:
             self.mountbb()
             (manual_ovr, abspath) = self.getbbabspath()
@@ -482,8 +944,18 @@ class ServerlogsCommand(RdmcCommandBase):
         self.updateiloversion()
         allfiles = self.getfilenames(options=options)
         cfilelist = self.getclistfilelisting()
+        allfiles = self.selectahsfiles(cfilelist=cfilelist, allfile=allfiles)
         self.getdatfilelisting(cfilelist=cfilelist, allfile=allfiles)
-        self.createahsfile(ahsfile=self.getahsfilename(options))
+        ahsfile = self.getahsfilename(options)
+        if compression_for(ahsfile, options.compression):
+            #the library writes the file, it is compressed once complete
+            self.createahsfile(ahsfile=ahsfile + '.tmp')
+            try:
+                compress_file(ahsfile + '.tmp', ahsfile, options.compression)
+            finally:
+                self.clearahsfile(ahsfile=ahsfile + '.tmp')
+        else:
+            self.createahsfile(ahsfile=ahsfile)
 
         if not manual_ovr:
             self.unmountbb()
@@ -528,40 +1000,113 @@ class ServerlogsCommand(RdmcCommandBase):
         :param allfile: all files within blackbox
         :type allfile: list
         """
+        cfilenames = set(x.split(".")[0] for x in cfilelist)
+        self.lib.gendatlisting.argtypes = [ctypes.c_char_p, \
+                                    ctypes.c_bool, ctypes.c_uint]
         for files in allfile:
             if files.startswith((".", "..")):
                 continue
             bisrequiredfile = False
-            if files.split(".")[0] in [x.split(".")[0] for x in cfilelist]:
-                if files.endswith("bb"):
-                    bisrequiredfile = True
-                    self.lib.updatenfileoptions()
-            self.lib.gendatlisting.argtypes = [ctypes.c_char_p, \
-                                    ctypes.c_bool, ctypes.c_uint]
+            if files.endswith("bb") and files.split(".")[0] in cfilenames:
+                bisrequiredfile = True
+                self.lib.updatenfileoptions()
             filesize = os.stat(os.path.join(self.abspath, files)).st_size
             self.lib.gendatlisting(files, bisrequiredfile, filesize)
 
+    def selectahsfiles(self, cfilelist=None, allfile=None):
+        """Leave out the log files dated outside of the collected range,
+        going by their names, so the library only reads the files needed.
+        The size of the remaining files is printed before collecting.
+
+        :param cfilelist: configuration files in blackbox
+        :type cfilelist: list of strings
+        :param allfile: all files within blackbox
+        :type allfile: list
+        """
+        (strdate, enddate) = self.ahsdaterange
+        cfilenames = set(x.split(".")[0] for x in cfilelist)
+        selected = []
+        totalsize = 0
+        for files in allfile:
+            if files.startswith((".", "..")):
+                continue
+            filedate = self.getbbfiledate(files)
+            outofrange = filedate and strdate <= enddate and not strdate <= \
+                                                        filedate <= enddate
+            if outofrange and files.split(".")[0] not in cfilenames:
+                continue
+            selected.append(files)
+            totalsize += os.stat(os.path.join(self.abspath, files)).st_size
+        sys.stdout.write(u"Collecting AHS logs from %s to %s, %s of %s files"\
+                u" (about %.1f MB).\n" % (strdate, enddate, len(selected), \
+                        len(allfile), totalsize / (1024.0 * 1024.0)))
+        return selected
+
+    def getbbfiledate(self, filename):
+        """Date of a blackbox log file from its name, None if it has none
+
+        :param filename: name of a file within blackbox
+        :type filename: str
+        """
+        if not filename.endswith("bb"):
+            return None
+        filesplit = filename.rsplit(".", 1)[0].split("-")
+        try:
+            return datetime.date(int(filesplit[1]), int(filesplit[2]), \
+                                                            int(filesplit[3]))
+        except (IndexError, ValueError):
+            return None
+
+    def getahsdaterange(self, options, first=None, last=None):
+        """Start and end dates given with the from and to flags. A missing
+        start defaults to the first day logged, a missing end to the last.
+
+        :param options: command line options
+        :type options: list.
+        :param first: first day logged, if known
+        :type first: datetime obj or str
+        :param last: last day logged, if known
+        :type last: datetime obj or str
+        """
+        if options.downloadallahs or options.customiseAHS:
+            raise InvalidCommandLineError("The from and to flags cannot be "\
+                        "used with the downloadallahs or customiseAHS flags.")
+        dates = []
+        for (flag, value) in (('from', options.fromdate), ('to', \
+                    options.todate), (None, first), (None, last)):
+            if isinstance(value, basestring):
+                try:
+                    value = datetime.datetime.strptime(value.split("T")[0], \
+                                                            "%Y-%m-%d").date()
+                except ValueError:
+                    if not flag:
+                        value = None
+                    else:
+                        raise InvalidCommandLineError("Invalid %s date '%s', "\
+                                "use the YYYY-MM-DD format." % (flag, value))
+            dates.append(value)
+        enddate = dates[1] or dates[3] or datetime.date.today()
+        strdate = dates[0] or dates[2] or enddate - datetime.timedelta(days=7)
+        if strdate > enddate:
+            raise InvalidCommandLineError("The from date is after the to "\
+                                                                    "date.")
+        return (strdate, enddate)
+
     def getfilenames(self, options=None):
         """Get all file names from the blacbox directory."""
-        datelist = []
         filenames = next(os.walk(self.abspath))[2]
         timenow = (str(datetime.datetime.now()).\
                                             split()[0]).split('-')
         strdate = enddate = datetime.date(int(timenow[0]),\
                             int(timenow[1]), int(timenow[2]))
-        for files in filenames:
-            if not files.endswith("bb"):
-                continue
-            filenoext = files.rsplit(".", 1)[0]
-            filesplit = filenoext.split("-")
-
-            try:
-                datelist.append(datetime.date(int(filesplit[1]),\
-                                      int(filesplit[2]), int(filesplit[3])))
-            except:
-                pass
-
-        if options.downloadallahs:
+        datelist = [filedate for filedate in (self.getbbfiledate(files) for \
+                                    files in filenames) if filedate]
+
+        if options.fromdate or options.todate:
+            (strdate, enddate) = self.getahsdaterange(options, first=min(\
+                datelist) if datelist else None, last=max(datelist) if \
+                                                        datelist else None)
+        elif options.downloadallahs:
             strdate = min(datelist) if len(datelist) else strdate
             enddate = max(datelist) if len(datelist) else enddate
         else:
@@ -571,6 +1116,7 @@ class ServerlogsCommand(RdmcCommandBase):
                                      int(weekagostr[2]))
             strdate = max(min(datelist), strdate) if len(datelist) else strdate
             enddate = min(max(datelist), enddate) if len(datelist) else enddate
+        self.ahsdaterange = (strdate, enddate)
         self.updateminmaxdate(strdate=strdate, enddate=enddate)
         return filenames
 
@@ -594,34 +1140,59 @@ class ServerlogsCommand(RdmcCommandBase):
         sclistpath = os.path.join(self.abspath, "clist.pkg")
         cfilelist = []
         if os.path.isfile(sclistpath):
-            cfile = open(sclistpath, 'rb')
-            data = cfile.read()
+            with open(sclistpath, 'rb') as cfile:
+                data = cfile.read()
             if data == "":
                 raise InvalidCListFileError("Could not read Cfile\n")
-            sizeofcfile = len(str(data))
             sizeofrecord = self.lib.sizeofchifbbfilecfgrecord()
-            count = sizeofcfile/sizeofrecord
-            revcount = 0
-            while count >= 1:
-                dat = data[revcount*sizeofrecord:(revcount+1)*sizeofrecord]
-                dat = ctypes.create_string_buffer(dat)
-                self.lib.getbbfilecfgrecordname.argtypes = [ctypes.c_char_p]
-                self.lib.getbbfilecfgrecordname.restype = ctypes.c_char_p
-                ptrname = self.lib.getbbfilecfgrecordname(dat)
-                name = str(bytearray(ptrname[:32][:]))
-                if name not in cfilelist:
+            count = len(data)/sizeofrecord
+            self.lib.getbbfilecfgrecordname.argtypes = [ctypes.c_char_p]
+            self.lib.getbbfilecfgrecordname.restype = ctypes.c_void_p
+            offset = self.getclistnameoffset(data[:sizeofrecord])
+            seen = set()
+            for record in xrange(count):
+                if offset is None:
+                    dat = ctypes.create_string_buffer(data[record*sizeofrecord:\
+                                                    (record+1)*sizeofrecord])
+                    name = ctypes.string_at(self.lib.\
+                                            getbbfilecfgrecordname(dat))[:32]
+                else:
+                    name = struct.unpack_from('32s', data, record*sizeofrecord+\
+                                                    offset)[0].split('\0', 1)[0]
+                if name not in seen:
+                    seen.add(name)
                     cfilelist.append(name)
-                count = count-1
-                revcount = revcount+1
         return cfilelist
 
-    def getbbabspath(self):
-        """Get blackbox folder path."""
-        count = 0
-        while count < 20:
-            if os.name == 'nt':
-                drives = self.get_available_drives()
-                for i in drives:
+    def getclistnameoffset(self, record):
+        """Offset of the file name within a clist.pkg record. The library
+        is asked for the name of the first record only, the other names are
+        read from the same offset. None if the name is not stored inline.
+
+        :param record: first record of clist.pkg
+        :type record: str
+        """
+        if len(record) < 32:
+            return None
+        dat = ctypes.create_string_buffer(record)
+        pointer = self.lib.getbbfilecfgrecordname(dat)
+        offset = (pointer or 0) - ctypes.addressof(dat)
+        if 0 <= offset <= len(record) - 32 and struct.unpack_from('32s', \
+                record, offset)[0].split('\0', 1)[0] == \
+                                            ctypes.string_at(pointer)[:32]:
+            return offset
+        return None
+
+    def getbbabspath(self, timeout=BBMOUNTTIMEOUT):
+        """Get blackbox folder path, waiting for it to be mounted
+
+        :param timeout: seconds to wait for the blackbox
+        :type timeout: float
+        """
+        deadline = time.time() + timeout
+        if os.name == 'nt':
+            while True:
+                for i in self.get_available_drives():
                     try:
                         label = win32api.GetVolumeInformation(i+':')[0]
                         if label == 'BLACKBOX':
@@ -629,26 +1200,70 @@ class ServerlogsCommand(RdmcCommandBase):
                             return (False, abspathbb)
                     except:
                         pass
-            else:
-                with open('/proc/mounts', 'r') as fmount:
-                    while True:
-                        lin = fmount.readline()
-                        if len(lin.strip()) == 0:
-                            break
+                if time.time() >= deadline:
+                    break
+                time.sleep(0.2)
+        else:
+            found = self.waitforbbmount(deadline)
+            if found:
+                return found
+
+        raise PartitionMoutingError("iLO not responding to request "\
+                                   "for mounting BlackBox")
+
+    def waitforbbmount(self, deadline):
+        """Wait for the blackbox to show up in the mount table. The mount
+        table is re-read only when the kernel reports it changed and block
+        devices added by udev wake the wait up, so there is no polling.
+        The blackbox is mounted manually if it is not mounted automatically
+        within BBAUTOMOUNTGRACE seconds.
+
+        :param deadline: time at which to give up
+        :type deadline: float
+        """
+        manualat = time.time() + BBAUTOMOUNTGRACE
+        poller = select.poll()
+        monitor = None
+
+        with open('/proc/mounts', 'r') as fmount:
+            poller.register(fmount, select.POLLERR | select.POLLPRI)
+            try:
+                monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+                monitor.filter_by(subsystem='block')
+                monitor.start()
+                poller.register(monitor.fileno(), select.POLLIN)
+            except Exception:
+                monitor = None
+
+            try:
+                while True:
+                    fmount.seek(0)
+                    for lin in fmount.read().splitlines():
                         if r"/BLACKBOX" in lin:
-                            abspathbb = lin.split()[1]
-                            return (False, abspathbb)
+                            return (False, lin.split()[1])
 
-                if count > 3:
-                    found, path = self.manualmountbb()
-                    if found:
-                        return (True, path)
+                    now = time.time()
+                    if now >= manualat:
+                        found, path = self.manualmountbb()
+                        if found:
+                            return (True, path)
+                    if now >= deadline:
+                        return None
 
-            count = count+1
-            time.sleep(1)
+                    wake = deadline if now >= manualat else min(deadline, \
+                                                                    manualat)
+                    poller.poll(max(wake - now, 0) * 1000)
 
-        raise PartitionMoutingError("iLO not responding to request "\
-                                   "for mounting BlackBox")
+                    while monitor and monitor.poll(timeout=0):
+                        pass
+            finally:
+                poller.unregister(fmount)
+
+                #pyudev monitors have no stop, releasing the monitor closes
+                #its netlink socket
+                if monitor:
+                    poller.unregister(monitor.fileno())
+                    monitor = None
 
     def manualmountbb(self):
         """Manually mount blackbox when after fixed time."""
@@ -711,19 +1326,7 @@ class ServerlogsCommand(RdmcCommandBase):
         :type tofilter: str
         """
         if tofilter and data:
-            try:
-                if (str(tofilter)[0] == str(tofilter)[-1])\
-                        and str(tofilter).startswith(("'", '"')):
-                    tofilter = tofilter[1:-1]
-                (sel, val) = tofilter.split('=')
-                sel = sel.strip()
-                val = val.strip()
-                if val.lower() == "true" or val.lower() == "false":
-                    val = val.lower() in ("yes", "true", "t", "1")
-            except:
-                raise InvalidCommandLineError("Invalid filter" \
-                  " parameter format [filter_attribute]=[filter_value]")
-            data = self._rdmc.app.filter_output(data, sel, val)
+            data = list(compile_filter(tofilter).filter(data))
             if not data:
                 raise NoContentsFoundForOperationError("Filter returned"\
                                                          " no matches.")
@@ -753,6 +1356,9 @@ class ServerlogsCommand(RdmcCommandBase):
                                                 split()[0]).split('-')
             todaysdate = ''.join(timenow)
             ahsdefaultfilename = u'HPE_'+snum+u'_'+todaysdate+u'.ahs'
+            if compression_for(ahsdefaultfilename, options.compression):
+                ahsdefaultfilename += {'gzip': u'.gz', 'zstd': u'.zst'}[\
+                                                        options.compression]
         if options.directorypath:
             ahsdefaultfilename = os.path.join(options.directorypath, ahsdefaultfilename)
         return ahsdefaultfilename
@@ -841,7 +1447,11 @@ class ServerlogsCommand(RdmcCommandBase):
             " objects that are all of that type. If you want to modify"\
             " the properties of only one of those objects, use the filter"\
             " flag to narrow down results based on properties."\
-            "\t\t\t\t\t Usage: --filter [ATTRIBUTE]=[VALUE]",
+            "\t\t\t\t\t Usage: --filter [ATTRIBUTE]=[VALUE] or an"\
+            " expression such as --filter \"Severity=Critical AND"\
+            " Created>=2017-10-01\" combining =, !=, <, <=, >, >=, ~ (regex),"\
+            " !~, AND, OR, NOT and parenthesis. Nested properties are"\
+            " separated by dots.",
             default=None,
         )
         customparser.add_option(
@@ -899,9 +1509,109 @@ class ServerlogsCommand(RdmcCommandBase):
             help="""Allows complete AHS log data to be downloaded.""",
             default=None,
         )
+        customparser.add_option(
+            '--from',
+            dest='fromdate',
+            help="First day of the AHS logs to download, in the YYYY-MM-DD"\
+            " format. Defaults to the first day logged. (AHS LOGS ONLY"\
+            " FEATURE)",
+            default=None,
+        )
+        customparser.add_option(
+            '--to',
+            dest='todate',
+            help="Last day of the AHS logs to download, in the YYYY-MM-DD"\
+            " format. Defaults to the last day logged. (AHS LOGS ONLY"\
+            " FEATURE)",
+            default=None,
+        )
         customparser.add_option(
             '--directorypath',
             dest='directorypath',
             help="""Directory path for the ahs file.""",
             default=None,
         )
+        customparser.add_option(
+            '--sync',
+            dest='sync',
+            action="store_true",
+            help="Only download the entries newer than the ones collected"\
+            " by the previous sync of this server and append them as JSON"\
+            " lines to the file given with the filename flag."\
+            " (IML AND IEL LOGS ONLY FEATURE)",
+            default=False,
+        )
+        customparser.add_option(
+            '--follow',
+            dest='follow',
+            action="store_true",
+            help="Keep running and write every new log entry as a JSON line"\
+            " to the console or the file given with the filename flag."\
+            " The log is polled less often while nothing is logged."\
+            " (IML AND IEL LOGS ONLY FEATURE)",
+            default=False,
+        )
+        customparser.add_option(
+            '--interval',
+            dest='interval',
+            type="float",
+            help="Seconds between two polls of a log when new entries keep"\
+            " coming with the follow flag. (default 5)",
+            default=5.0,
+        )
+        customparser.add_option(
+            '--maxinterval',
+            dest='maxinterval',
+            type="float",
+            help="Longest time in seconds between two polls of a quiet log"\
+            " with the follow flag. (default 60)",
+            default=60.0,
+        )
+        customparser.add_option(
+            '--events',
+            dest='events',
+            action="store_true",
+            help="Also write the events of the Redfish EventService stream"\
+            " with the follow flag, when the server has one.",
+            default=False,
+        )
+        add_fleet_options(customparser, "Collect or follow the logs of every"\
+                " server", note="Several logs can be selected, such as "\
+                "--selectlog=IML,IEL,AHS. Each server gets a directory within"\
+                " the directory given with the directorypath flag.")
+        customparser.add_option(
+            '--parallel',
+            dest='parallel',
+            type="int",
+            help="Number of log pages or entries retrieved at the same time."\
+            " (IML AND IEL LOGS ONLY FEATURE) (default 4)",
+            default=4,
+        )
+        customparser.add_option(
+            '--compression',
+            dest='compression',
+            type="choice",
+            choices=['gzip', 'zstd', 'none'],
+            help="Compress the saved logs with gzip or zstd while they are"\
+            " written. By default files ending with .gz or .zst are"\
+            " compressed. zstd needs the zstandard module.",
+            default=None,
+        )
+        customparser.add_option(
+            '--checksum',
+            dest='checksum',
+            help="Print the checksum of the downloaded AHS file. Include"\
+            " the expected digest to verify the download. (AHS LOGS ONLY"\
+            " FEATURE IN REMOTE MODE)\t\t\t\t\t Usage:"\
+            " --checksum=sha256[:DIGEST]",
+            default=None,
+        )
+        customparser.add_option(
+            '--resume',
+            dest='resume',
+            action="store_true",
+            help="Continue a partial AHS file instead of downloading it"\
+            " again, if the server supports it. (AHS LOGS ONLY FEATURE IN"\
+            " REMOTE MODE)",
+            default=False,
+        )
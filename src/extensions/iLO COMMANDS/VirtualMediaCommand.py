@@ -17,12 +17,21 @@
 # -*- coding: utf-8 -*-
 """ Virtual Media Command for rdmc """
 
+import os
 import sys
+import time
+import urlparse
 
 from optparse import OptionParser
 from rdmc_base_classes import RdmcCommandBase
 from rdmc_helper import ReturnCodes, InvalidCommandLineError, \
-                    InvalidCommandLineErrorOPTS, IloLicenseError
+                    InvalidCommandLineErrorOPTS, IloLicenseError, \
+                    NoContentsFoundForOperationError
+from rdmc_file_server import FileServer, serving_address
+from rdmc_fleet import read_serverlist, run_on_servers, open_session, \
+                    add_fleet_options
+from rdmc_virtual_media import MediaPaths, manager_model, discover_media, \
+                    media_requests
 
 class VirtualMediaCommand(RdmcCommandBase):
     """ Changes the iscsi configuration for the server that is currently """ \
@@ -36,7 +45,11 @@ class VirtualMediaCommand(RdmcCommandBase):
                     'set to boot on next restart.\n\texample: virtualmedia 2 ' \
                     'http://xx.xx.xx.xx/vm.iso --bootnextreset\n\n\tRemove ' \
                     'current inserted media.\n\texample: virtualmedia 2 ' \
-                    '--remove',\
+                    '--remove\n\n\tInsert the same media on every server of a '\
+                    'server file. A local\n\timage is served to all of them '\
+                    'from this system until interrupted.\n\texample: '\
+                    'virtualmedia 2 deploy.iso --bootnextreset '\
+                    '--multiprocessing\n\tservers.txt',\
             summary='Command for inserting and removing virtual media.',\
             aliases=['virtualmedia'],\
             optparser=OptionParser())
@@ -49,6 +62,7 @@ class VirtualMediaCommand(RdmcCommandBase):
         self.selobj = rdmcObj.commandsDict["SelectCommand"](rdmcObj)
         self.rebootobj = rdmcObj.commandsDict["RebootCommand"](rdmcObj)
         self.rebootobj = rdmcObj.commandsDict["LogoutCommand"](rdmcObj)
+        self.mediapaths = MediaPaths()
 
     def run(self, line):
         """ Main iscsi configuration worker function
@@ -67,6 +81,8 @@ class VirtualMediaCommand(RdmcCommandBase):
         if len(args) > 2:
             raise InvalidCommandLineError("Invalid number of parameters. " \
                 "virtualmedia command takes a maximum of 2 parameters.")
+        elif options.mpfilename:
+            return self.vmfleethelper(args, options)
         else:
             self.virtualmediavalidation(options)
 
@@ -244,6 +260,161 @@ class VirtualMediaCommand(RdmcCommandBase):
                     {"Oem":{self.typepath.defs.oemhp:{"BootOnNextServerReset":\
                                             True}}}, service=True, silent=True)
 
+    def vmfleethelper(self, args, options):
+        """Worker function to insert or remove the media of every server of
+        the multiple server file
+
+        :param args: arguments passed from command line
+        :type args: list
+        :param options: command line options
+        :type options: list.
+        """
+        if not (len(args) == 2 and not options.removevm) and not \
+                                    (len(args) == 1 and options.removevm):
+            raise InvalidCommandLineError("Provide the virtual media ID and "\
+                    "image to insert, or the ID with the remove flag, to "\
+                                                    "work on multiple servers.")
+
+        servers = read_serverlist(options.mpfilename)
+        image = args[1] if len(args) == 2 else None
+        fileserver = None
+
+        if image and os.path.isfile(image):
+            (bindaddress, address) = serving_address([urlparse.urlparse(\
+                                server[u'url']).hostname for server in \
+                                servers], options.serveraddress)
+            fileserver = FileServer(image, address=bindaddress, port=\
+                            options.serverport, certfile=options.certfile, \
+                            keyfile=options.keyfile).start()
+            image = fileserver.url(address)
+            sys.stdout.write(u"Serving %s at %s\n" % (fileserver.filename, \
+                                                                        image))
+        try:
+            results = run_on_servers(servers, lambda server: self.\
+                        vmserverhelper(server, args[0], image, options), \
+                                                workers=options.maxservers)
+            mounted = self.vmfleetreport(results, image)
+
+            if fileserver and mounted:
+                self.vmserve(fileserver, options.servetime)
+        finally:
+            if fileserver:
+                fileserver.stop()
+
+        if mounted < len(results):
+            return ReturnCodes.MULTIPLE_SERVER_CONFIG_FAIL
+
+        return ReturnCodes.SUCCESS
+
+    def vmserverhelper(self, server, mediaid, image, options):
+        """Worker function to insert or remove the media of one server. The
+        virtual media found on the first server of an iLO model is used for
+        the other servers of that model, a request that finds nothing there
+        is sent again to the media of this server.
+
+        :param server: server read from the multiple server file
+        :type server: dict
+        :param mediaid: virtual media ID
+        :type mediaid: str
+        :param image: image URL, None to remove the media
+        :type image: str
+        :param options: command line options
+        :type options: list.
+        :returns: dictionary of Login and Mount seconds and Reused paths
+        """
+        starttime = time.time()
+
+        with open_session(server, self._rdmc.opts.verbose) as session:
+            logintime = time.time()
+            (model, oem, root) = manager_model(session.pool)
+            key = (model, mediaid) if model else None
+            discover = lambda: discover_media(session.pool, root, oem, mediaid)
+
+            (media, reused) = self.mediapaths.get(key, discover)
+            requests = media_requests(media, oem, image, options.bootnextreset)
+            (index, retried) = (0, False)
+
+            while index < len(requests):
+                (method, path, body) = requests[index]
+                response = session.pool.request(method, path, body=body)
+
+                #paths of another server of the model are searched for again
+                #when this server does not have them, and only the request
+                #that failed and the ones after it are sent again
+                if response.status == 404 and reused and not retried:
+                    self.mediapaths.forget(key)
+                    (media, _) = self.mediapaths.get(key, discover)
+                    requests = media_requests(media, oem, image, \
+                                                        options.bootnextreset)
+                    retried = True
+                    continue
+                elif response.status not in (200, 202, 204):
+                    raise NoContentsFoundForOperationError(u"%s %s failed, "\
+                            u"status %s." % (method, path, response.status))
+
+                index += 1
+
+            return {u'Login': logintime - starttime, u'Mount': time.time() - \
+                                                logintime, u'Reused': reused}
+
+    def vmfleetreport(self, results, image):
+        """Worker function to report the mount latency of every server
+
+        :param results: results of vmserverhelper per server
+        :type results: list
+        :param image: inserted image, None when removing the media
+        :type image: str
+        :returns: number of servers changed
+        """
+        latencies = []
+
+        for (server, result, error) in results:
+            if error:
+                sys.stderr.write(u"%s: %s\n" % (server[u'url'], error))
+                continue
+
+            latencies.append(result[u'Mount'])
+            sys.stdout.write(u"%s: %s in %.2f s (login %.2f s%s)\n" % (\
+                    server[u'url'], u'mounted' if image else u'removed', \
+                    result[u'Mount'], result[u'Login'], u', paths reused' if \
+                                                    result[u'Reused'] else u''))
+
+        sys.stdout.write(u"%s of %s server(s) %s." % (len(latencies), \
+                            len(results), u'mounted' if image else u'removed'))
+
+        if latencies:
+            latencies.sort()
+            sys.stdout.write(u" Latency min %.2f s, median %.2f s, max %.2f s."\
+                    % (latencies[0], latencies[len(latencies) // 2], \
+                                                                latencies[-1]))
+
+        sys.stdout.write(u"\n")
+
+        return len(latencies)
+
+    def vmserve(self, fileserver, servetime):
+        """Worker function to keep serving a local image to the servers
+
+        :param fileserver: server of the local image
+        :type fileserver: FileServer
+        :param servetime: seconds to serve, 0 until interrupted
+        :type servetime: int
+        """
+        sys.stdout.write(u"Serving the image %s.\n" % (u'for %s seconds' % \
+                            servetime if servetime else u'until interrupted '\
+                                                                u'(Ctrl+C)'))
+        endtime = time.time() + servetime
+
+        try:
+            while not servetime or time.time() < endtime:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+        for (client, stats) in sorted(fileserver.downloads.iteritems()):
+            sys.stdout.write(u"%s read %s bytes in %s request(s)\n" % (client, \
+                                            stats[u'Bytes'], stats[u'Requests']))
+
     def vmredfishhelper(self, action, number, image=None):
         """Redfish version of the worker function
 
@@ -386,3 +557,43 @@ class VirtualMediaCommand(RdmcCommandBase):
             "does not boot to this image twice.",
             default=False
         )
+        add_fleet_options(customparser, "Insert or remove the media of every"\
+                " server", note="A local image is served to all of them at once.")
+        customparser.add_option(
+            '--servetime',
+            dest='servetime',
+            type="int",
+            help="Seconds a local image is served after it is inserted. By "\
+            "default it is served until interrupted.",
+            default=0,
+        )
+        customparser.add_option(
+            '--serveraddress',
+            dest='serveraddress',
+            help="Address iLO reaches this system on when inserting a local"\
+            " image, the image is then served on every interface. By default"\
+            " it is only served on the interface every iLO is reached"\
+            " through.",
+            default=None,
+        )
+        customparser.add_option(
+            '--serverport',
+            dest='serverport',
+            type="int",
+            help="Port the local image is served on. By default any free port"\
+            " is used.",
+            default=0,
+        )
+        customparser.add_option(
+            '--certfile',
+            dest='certfile',
+            help="PEM certificate to serve the local image over HTTPS with.",
+            default=None,
+        )
+        customparser.add_option(
+            '--keyfile',
+            dest='keyfile',
+            help="PEM private key of the certificate given with the certfile"\
+            " flag, if it is not part of the certificate file.",
+            default=None,
+        )
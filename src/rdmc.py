@@ -50,10 +50,14 @@ from rdmc_helper import ReturnCodes, ConfigurationFileError, \
                     FirmwareUpdateError, BootOrderMissingEntriesError, \
                     NicMissingOrConfigurationError, StandardBlobErrorHandler, \
                     NoCurrentSessionEstablished, FailureDuringCommitError,\
+                    TaskTimeoutError, \
                     IncompatibleiLOVersionError, InvalidCListFileError,\
                     PartitionMoutingError, BirthcertParseError, AccountExists, \
 					IncompatableServerTypeError, IloLicenseError
 from rdmc_base_classes import RdmcCommandBase, RdmcOptionParser, HARDCODEDLIST
+from rdmc_type_index import TypeIndex
+from rdmc_registry_store import REGISTRIES, SCHEMAS, split_identifier, \
+                                                            get_registry_store
 
 if os.name != 'nt':
     import setproctitle
@@ -101,6 +105,7 @@ class RdmcCommand(RdmcCommandBase):
         self.candidates = dict()
         self.commlist = list()
         self._redobj = None
+        self.typeindex = TypeIndex()
         Args.remove('--showwarnings')
 
     def add_command(self, newcmd, section=None):
@@ -395,6 +400,9 @@ class RdmcCommand(RdmcCommandBase):
         except FailureDuringCommitError, excp:
             self.retcode = ReturnCodes.FAILURE_DURING_COMMIT_OPERATION
             UI().error(excp)
+        except TaskTimeoutError, excp:
+            self.retcode = ReturnCodes.TASK_TIMEOUT_ERROR
+            UI().error(excp)
         except BootOrderMissingEntriesError, excp:
             self.retcode = ReturnCodes.BOOT_ORDER_ENTRY_ERROR
             UI().error(excp)
@@ -560,8 +568,7 @@ class RdmcCommand(RdmcCommandBase):
         typeslist = list()
 
         try:
-            typeslist = list(set(self.app.types()))
-            typeslist.sort()
+            typeslist = self.typeindex.types(self.app)
             changes["select"] = typeslist
         except:
             pass
@@ -608,41 +615,61 @@ class RdmcCommand(RdmcCommandBase):
                         regfound = \
                             validation_manager.find_schema(dictcopy[typestr])
 
-                    if self.app.current_client.monolith.is_redfish\
+                    store = get_registry_store(self)
+                    storekind = REGISTRIES if biosmode else SCHEMAS
+                    identifier = attributeregistry[dictcopy[typestr]] if \
+                                                biosmode else dictcopy[typestr]
+                    currentschema = store.lookup_identifier(storekind, \
+                                                                    identifier)
+
+                    if currentschema is not None:
+                        currentschema = currentschema[u'RegistryEntries']\
+                                    [u'Attributes'] if biosmode else \
+                                    currentschema[u'properties']
+                    else:
+                        if self.app.current_client.monolith.is_redfish\
                                                 and not 'Location' in regfound:
-                        regfound = self.app.get_handler(\
+                            regfound = self.app.get_handler(\
                                         regfound[u'@odata.id'], verbose=False, \
                                         service=True, silent=True).obj
 
-                    if float(iloversion) >= 4.210:
-                        try:
-                            locationdict = self.app.geturidict(\
+                        if float(iloversion) >= 4.210:
+                            try:
+                                locationdict = self.app.geturidict(\
                                                            regfound.Location[0])
 
-                            self.app.check_type_and_download(\
-                                self.app.current_client.monolith, \
-                                locationdict, skipcrawl=True, loadtype='ref')
-                        except Exception, excp:
-                            raise excp
-
-                    if biosmode:
-                        schemas = self.app.current_client.monolith.types
-
-                        for type in schemas.iterkeys():
-                            if self.app.typepath.defs.attributeregtype in type:
-                                currentschema = schemas[type][u'Instances']\
-                                [0].resp.dict[u'RegistryEntries'][u'Attributes']
-                                break
-                    else:
-                        for schema in self.app.current_client.monolith.types\
-                                                        [u'ob'][u'Instances']:
-                            locationdict = self.app.geturidict(\
+                                self.app.check_type_and_download(\
+                                    self.app.current_client.monolith, \
+                                    locationdict, skipcrawl=True, loadtype='ref')
+                            except Exception, excp:
+                                raise excp
+
+                        if biosmode:
+                            schemas = self.app.current_client.monolith.types
+
+                            for type in schemas.iterkeys():
+                                if self.app.typepath.defs.attributeregtype in \
+                                                                        type:
+                                    content = schemas[type][u'Instances']\
+                                                                    [0].resp.dict
+                                    currentschema = content[u'RegistryEntries']\
+                                                                [u'Attributes']
+                                    break
+                        else:
+                            for schema in self.app.current_client.monolith.\
+                                                    types[u'ob'][u'Instances']:
+                                locationdict = self.app.geturidict(\
                                                            regfound.Location[0])
 
-                            if schema.resp._rest_request.path.lower() in \
-														locationdict.lower():
-                                currentschema = schema.resp.dict[u'properties']
-                                break
+                                if schema.resp._rest_request.path.lower() in \
+                                                        locationdict.lower():
+                                    content = schema.resp.dict
+                                    currentschema = content[u'properties']
+                                    break
+
+                        if currentschema:
+                            (name, version) = split_identifier(identifier)
+                            store.add(storekind, name, version, content)
 
                     if currentschema and biosmode:
                         for item in getlist:
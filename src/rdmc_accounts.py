@@ -0,0 +1,252 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+"""Bring the iLO accounts of a server to the state described by an account
+file with the fewest requests"""
+
+#---------Imports---------
+
+import os
+import json
+
+from rdmc_collection import collection_members, link_path, member_path
+from rdmc_helper import InvalidFileInputError, InvalidFileFormattingError
+
+#---------End of imports---------
+
+#accounts collection of iLO 4 and 5 when the service does not link it
+DEFAULTACCOUNTSPATH = u'/redfish/v1/AccountService/Accounts/'
+CREATE = u'Create'
+UPDATE = u'Update'
+DELETE = u'Delete'
+
+def read_account_file(filename):
+    """ Accounts described by an account file, a JSON object with an
+    Accounts list. Each account has a UserName and optionally a LoginName,
+    a Password, Privileges, or Absent set to true to delete it.
+
+    :param filename: account file
+    :type filename: str.
+    :returns: list of account dictionaries
+    """
+    if not os.path.isfile(filename):
+        raise InvalidFileInputError(u"File '%s' doesn't exist." % filename)
+
+    try:
+        with open(filename, 'r') as accountfile:
+            data = json.loads(accountfile.read())
+    except ValueError, excp:
+        raise InvalidFileFormattingError(u"File '%s' is not valid JSON: %s" \
+                                                            % (filename, excp))
+
+    accounts = data.get(u'Accounts') if isinstance(data, dict) else data
+
+    if not isinstance(accounts, list) or not accounts:
+        raise InvalidFileFormattingError(u"File '%s' holds no Accounts list." \
+                                                                    % filename)
+
+    usernames = set()
+
+    for account in accounts:
+        username = account.get(u'UserName') if isinstance(account, dict) \
+                                                                    else None
+        if not username:
+            raise InvalidFileFormattingError(u"Every account needs a "\
+                                                            u"UserName.")
+        elif username in usernames:
+            raise InvalidFileFormattingError(u"Account '%s' is listed more "\
+                                                u"than once." % username)
+        elif len(username) >= 60 or len(account.get(u'LoginName', \
+                                                                u'')) >= 60:
+            raise InvalidFileFormattingError(u"The user or login name of "\
+                                u"'%s' exceeds maximum length." % username)
+        elif u'Password' in account and not 8 <= len(account[u'Password']) \
+                                                                        < 40:
+            raise InvalidFileFormattingError(u"The password length of '%s' "\
+                                                u"is invalid." % username)
+        elif not isinstance(account.get(u'Privileges', {}), dict):
+            raise InvalidFileFormattingError(u"The privileges of '%s' must "\
+                                            u"be an object." % username)
+
+        usernames.add(username)
+
+    return accounts
+
+def accounts_path(pool):
+    """ Path of the accounts collection of a server
+
+    :param pool: session pool of the server
+    :type pool: SessionPool.
+    """
+    try:
+        root = pool.get(u'/redfish/v1/').dict or {}
+        service = pool.get(link_path(root[u'AccountService'])).dict
+        return link_path(service[u'Accounts']) or DEFAULTACCOUNTSPATH
+    except (KeyError, TypeError):
+        return DEFAULTACCOUNTSPATH
+
+def account_oem(accounts, default=u'Hpe'):
+    """ Oem key the accounts of a server are described under, Hpe or Hp
+
+    :param accounts: accounts of the server
+    :type accounts: list.
+    :param default: key used when no account tells
+    :type default: str.
+    """
+    for account in accounts:
+        for oem in (u'Hpe', u'Hp'):
+            if oem in (account.get(u'Oem') or {}):
+                return oem
+
+    return default
+
+def plan_accounts(desired, current, oem, prune=False, keep=None):
+    """ Requests turning the current accounts into the desired ones. Only
+    the properties that differ are patched, a password given is always set
+    since it cannot be read back.
+
+    :param desired: accounts of the account file
+    :type desired: list.
+    :param current: accounts of the server
+    :type current: list.
+    :param oem: Oem key of the server, Hpe or Hp
+    :type oem: str.
+    :param prune: delete the accounts the file does not list
+    :type prune: boolean.
+    :param keep: user name that is never deleted, the one logged in with
+    :type keep: str.
+    :returns: list of (action, user name, path, body), deletes first
+    """
+    existing = dict((account.get(u'UserName'), account) for account in \
+                                                                    current)
+    listed = set(account[u'UserName'] for account in desired)
+    deletes = []
+    updates = []
+    creates = []
+
+    for account in desired:
+        username = account[u'UserName']
+        found = existing.get(username)
+
+        if account.get(u'Absent'):
+            if found and username != keep:
+                deletes.append((DELETE, username, member_path(found), None))
+            continue
+
+        oemdata = {}
+
+        if not found:
+            if u'Password' not in account:
+                raise InvalidFileFormattingError(u"Account '%s' does not "\
+                                    u"exist and needs a Password." % username)
+
+            oemdata[u'LoginName'] = account.get(u'LoginName', username)
+
+            if account.get(u'Privileges'):
+                oemdata[u'Privileges'] = account[u'Privileges']
+
+            creates.append((CREATE, username, None, {u'UserName': username, \
+                    u'Password': account[u'Password'], u'Oem': {oem: oemdata}}))
+            continue
+
+        currentoem = (found.get(u'Oem') or {}).get(oem) or {}
+        currentprivs = currentoem.get(u'Privileges') or {}
+        body = {}
+
+        if u'LoginName' in account and account[u'LoginName'] != \
+                                                    currentoem.get(u'LoginName'):
+            oemdata[u'LoginName'] = account[u'LoginName']
+
+        privileges = dict((name, value) for (name, value) in account.get(\
+                        u'Privileges', {}).iteritems() if currentprivs.get(\
+                                                                name) != value)
+        if privileges:
+            oemdata[u'Privileges'] = privileges
+
+        if oemdata:
+            body[u'Oem'] = {oem: oemdata}
+
+        if u'Password' in account:
+            body[u'Password'] = account[u'Password']
+
+        if body:
+            updates.append((UPDATE, username, member_path(found), body))
+
+    if prune:
+        for (username, account) in sorted(existing.iteritems()):
+            if username not in listed and username != keep:
+                deletes.append((DELETE, username, member_path(account), None))
+
+    return deletes + updates + creates
+
+def apply_accounts(pool, desired, path=None, collectionstring=u'Members', \
+                                                oem=None, prune=False, keep=None):
+    """ Read the accounts of a server and apply the planned requests over
+    the session of the pool
+
+    :param pool: session pool of the server
+    :type pool: SessionPool.
+    :param desired: accounts of the account file
+    :type desired: list.
+    :param path: accounts collection, discovered when None
+    :type path: str.
+    :param collectionstring: property listing the accounts
+    :type collectionstring: str.
+    :param oem: Oem key of the server, taken from the accounts when None
+    :type oem: str.
+    :param prune: delete the accounts the file does not list
+    :type prune: boolean.
+    :param keep: user name that is never deleted
+    :type keep: str.
+    :returns: {"Created", "Updated", "Deleted": user names, "Unchanged":
+              count, "Errors": messages}
+    """
+    path = path or accounts_path(pool)
+    current = collection_members(pool, path, collectionstring)
+    plan = plan_accounts(desired, current, oem or account_oem(current), \
+                                                    prune=prune, keep=keep)
+    result = {u'Created': [], u'Updated': [], u'Deleted': [], u'Errors': [], \
+              u'Unchanged': len(set(account[u'UserName'] for account in \
+                        desired) - set(username for (_, username, _, _) in plan))}
+
+    for (action, username, target, body) in plan:
+        if action == CREATE:
+            response = pool.request('POST', path, body=body)
+        elif action == UPDATE:
+            response = pool.request('PATCH', target, body=body)
+        else:
+            response = pool.request('DELETE', target)
+
+        if response.status in (200, 201, 202, 204):
+            result[action + u'd'].append(username)
+        else:
+            result[u'Errors'].append(u"%s %s failed: %s" % (action, username, \
+                                                    response_error(response)))
+
+    return result
+
+def response_error(response):
+    """ Message id of a failed response, or its status
+
+    :param response: failed response
+    :type response: PooledResponse.
+    """
+    try:
+        return response.dict[u'error'][u'@Message.ExtendedInfo'][0]\
+                                                                [u'MessageId']
+    except (IndexError, KeyError, TypeError):
+        return u'status %s' % response.status
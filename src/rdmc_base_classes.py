@@ -215,6 +215,18 @@ class RdmcOptionParser(OptionParser):
             metavar='PATH'
         )
 
+        self.add_option(
+            '--registry-dir',
+            dest='registry_dir',
+            default=None,
+            help="Use the provided directory as the location of the shared"\
+            " registry and schema store. Point multiple installations at the"\
+            " same directory to share downloaded registries (default"\
+            " location: %s)" % os.path.join(config_dir_default, \
+                                                            'registrystore'),
+            metavar='PATH'
+        )
+
         globalgroup.add_option(
             '-v',
             '--verbose',
@@ -0,0 +1,187 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+"""Group the BIOS configurations of many servers by content and compare
+each distinct configuration with a baseline"""
+
+#---------Imports---------
+
+import os
+import json
+import hashlib
+import threading
+
+from rdmc_base_classes import HARDCODEDLIST
+from rdmc_collection import link_path
+from rdmc_helper import NoContentsFoundForOperationError, \
+                    InvalidFileInputError, InvalidFileFormattingError
+
+#---------End of imports---------
+
+#BIOS resource of the first system when the service does not link it
+DEFAULTBIOSPATH = u'/redfish/v1/Systems/1/Bios/'
+
+def bios_path(pool):
+    """ Path of the BIOS resource of the first system of a server
+
+    :param pool: session pool of the server
+    :type pool: SessionPool.
+    """
+    try:
+        root = pool.get(u'/redfish/v1/').dict or {}
+        systems = pool.get(link_path(root[u'Systems'])).dict
+        system = pool.get(link_path(systems[u'Members'][0])).dict
+    except (IndexError, KeyError, TypeError):
+        return DEFAULTBIOSPATH
+
+    path = link_path(system.get(u'Bios'))
+
+    for oem in (system.get(u'Oem') or {}).values():
+        if path:
+            break
+
+        links = (oem or {}).get(u'Links') or (oem or {}).get(u'links') or {}
+        path = link_path(links.get(u'BIOS'))
+
+    return path or DEFAULTBIOSPATH
+
+def bios_attributes(resource):
+    """ Attributes of a BIOS resource, without the properties describing the
+    resource itself
+
+    :param resource: BIOS resource, with an Attributes object or flat
+    :type resource: dict.
+    """
+    if isinstance(resource.get(u'Attributes'), dict):
+        resource = resource[u'Attributes']
+
+    return dict((key, value) for (key, value) in resource.iteritems() if \
+            key.lower() not in HARDCODEDLIST and u'@odata' not in key.lower())
+
+def read_baseline(filename):
+    """ BIOS attributes of a baseline file, either a file written by the
+    save command with the BIOS selected, a BIOS resource or a plain object of
+    attributes
+
+    :param filename: baseline file
+    :type filename: str.
+    """
+    if not os.path.isfile(filename):
+        raise InvalidFileInputError(u"File '%s' doesn't exist." % filename)
+
+    try:
+        with open(filename, 'r') as baselinefile:
+            data = json.loads(baselinefile.read())
+    except ValueError, excp:
+        raise InvalidFileFormattingError(u"File '%s' is not valid JSON: %s" \
+                                                            % (filename, excp))
+
+    if isinstance(data, list):
+        for entry in data:
+            for (selector, paths) in (entry if isinstance(entry, dict) else \
+                                                                {}).iteritems():
+                if u'bios' in selector.lower() and isinstance(paths, dict):
+                    for values in paths.values():
+                        return bios_attributes(values)
+
+        raise InvalidFileFormattingError(u"File '%s' holds no BIOS settings." \
+                                                                    % filename)
+    elif not isinstance(data, dict):
+        raise InvalidFileFormattingError(u"File '%s' holds no BIOS settings." \
+                                                                    % filename)
+
+    return bios_attributes(data)
+
+def attributes_digest(attributes):
+    """ Hash identifying a configuration, the same for equal attributes in
+    any order
+
+    :param attributes: BIOS attributes
+    :type attributes: dict.
+    """
+    return hashlib.sha256(json.dumps(attributes, sort_keys=True, \
+                                        separators=(',', ':'))).hexdigest()
+
+def attribute_diff(attributes, baseline):
+    """ Attributes differing from a baseline, a missing attribute has the
+    value None
+
+    :param attributes: BIOS attributes
+    :type attributes: dict.
+    :param baseline: BIOS attributes compared with
+    :type baseline: dict.
+    :returns: dictionary of name to {"Baseline": value, "Value": value}
+    """
+    return dict((name, {u'Baseline': baseline.get(name), u'Value': \
+                    attributes.get(name)}) for name in set(attributes) | \
+                    set(baseline) if attributes.get(name) != baseline.get(name))
+
+class ConfigGroups(object):
+    """ Servers grouped by identical BIOS configuration. Every distinct
+    configuration is kept once, servers only by name, so the memory used
+    follows the number of distinct configurations rather than servers.
+    Servers can be added from many threads. """
+    def __init__(self):
+        self.attributes = {}
+        self.hosts = {}
+        self._lock = threading.Lock()
+
+    def add(self, host, attributes):
+        """ Add the configuration of one server
+
+        :param host: name of the server
+        :type host: str.
+        :param attributes: BIOS attributes of the server
+        :type attributes: dict.
+        :returns: digest of the configuration
+        """
+        digest = attributes_digest(attributes)
+
+        with self._lock:
+            self.attributes.setdefault(digest, attributes)
+            self.hosts.setdefault(digest, []).append(host)
+
+        return digest
+
+    def digests(self):
+        """ Digests of the configurations, the most common first """
+        return sorted(self.hosts, key=lambda digest: (-len(self.hosts[\
+                                                        digest]), digest))
+
+    def majority(self):
+        """ Digest of the most common configuration """
+        if not self.hosts:
+            raise NoContentsFoundForOperationError(u"No BIOS configurations "\
+                                                            u"were collected.")
+
+        return self.digests()[0]
+
+    def report(self, baseline=None):
+        """ Every configuration with its servers and its differences from
+        the baseline
+
+        :param baseline: BIOS attributes compared with, the most common
+                         configuration when None
+        :type baseline: dict.
+        :returns: list of {"Digest", "Hosts", "Differences"}, most common first
+        """
+        if baseline is None:
+            baseline = self.attributes[self.majority()]
+
+        return [{u'Digest': digest, u'Hosts': sorted(self.hosts[digest]), \
+                 u'Differences': attribute_diff(self.attributes[digest], \
+                                    baseline)} for digest in self.digests()]
@@ -0,0 +1,134 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+"""HTTPS certificate resource of servers reached over their own sessions
+and the per host files of signing requests and signed certificates"""
+
+#---------Imports---------
+
+import os
+import re
+
+from rdmc_collection import link_path
+from rdmc_helper import NoContentsFoundForOperationError
+
+#---------End of imports---------
+
+#HTTPS certificate of iLO 4 and 5 when the service does not link it
+DEFAULTHTTPSCERTPATH = u'/redfish/v1/Managers/1/SecurityService/HttpsCert/'
+CSREXTENSION = u'.csr'
+#extensions a signed certificate of a host is looked for with
+CERTEXTENSIONS = (u'.crt', u'.pem', u'.cer', u'.txt')
+
+def https_cert(pool):
+    """ Path and resource of the HTTPS certificate of a server
+
+    :param pool: session pool of the server
+    :type pool: SessionPool.
+    :returns: (path, resource)
+    """
+    path = None
+
+    try:
+        root = pool.get(u'/redfish/v1/').dict or {}
+        managers = pool.get(link_path(root[u'Managers'])).dict
+        manager = pool.get(link_path(managers[u'Members'][0])).dict
+
+        for oem in (manager.get(u'Oem') or {}).values():
+            links = (oem or {}).get(u'Links') or (oem or {}).get(u'links') or {}
+            security = link_path(links.get(u'SecurityService'))
+
+            if security:
+                path = link_path(pool.get(security).dict[u'Links'][\
+                                                                u'HttpsCert'])
+                break
+    except (IndexError, KeyError, TypeError):
+        pass
+
+    for candidate in (path, DEFAULTHTTPSCERTPATH):
+        if not candidate:
+            continue
+
+        response = pool.get(candidate)
+
+        if response.status == 200 and isinstance(response.dict, dict):
+            return (candidate, response.dict)
+
+    raise NoContentsFoundForOperationError(u"Unable to find the HTTPS " \
+                                    u"certificate of %s." % pool.baseurl)
+
+def cert_action(path, resource, name, **properties):
+    """ Target and body of an action of the HTTPS certificate, named the
+    way the certificate command names it for each iLO
+
+    :param path: path of the HTTPS certificate
+    :type path: str.
+    :param resource: HTTPS certificate resource
+    :type resource: dict.
+    :param name: GenerateCSR or ImportCertificate
+    :type name: str.
+    :param properties: properties of the action
+    :type properties: dict.
+    :returns: (target, body)
+    """
+    target = path
+    action = name
+
+    for (item, value) in (resource.get(u'Actions') or {}).iteritems():
+        if name in item:
+            target = value[u'target']
+
+            if u'Hpe' in item:
+                action = item.split(u'#')[-1]
+            break
+
+    body = {u'Action': action}
+    body.update(properties)
+
+    return (target, body)
+
+def host_filename(directory, host, extension):
+    """ File of a host in a directory, the port separator replaced so that
+    the name is valid on every platform
+
+    :param directory: directory of the files
+    :type directory: str.
+    :param host: address of the server
+    :type host: str.
+    :param extension: extension of the file
+    :type extension: str.
+    """
+    return os.path.join(directory, re.sub(r'[^\w.\-]', u'_', host) + extension)
+
+def find_host_file(directory, host, extensions=CERTEXTENSIONS):
+    """ File of a host in a directory with the first extension that exists,
+    None when there is none
+
+    :param directory: directory of the files
+    :type directory: str.
+    :param host: address of the server
+    :type host: str.
+    :param extensions: extensions looked for, in order
+    :type extensions: tuple.
+    """
+    for extension in extensions:
+        filename = host_filename(directory, host, extension)
+
+        if os.path.isfile(filename):
+            return filename
+
+    return None
@@ -0,0 +1,117 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+"""Read the members of a collection in as few requests as the service
+allows and keep them for the rest of the session"""
+
+#---------Imports---------
+
+from rdmc_helper import NoContentsFoundForOperationError
+
+#---------End of imports---------
+
+def link_path(value):
+    """ Path of a Redfish or legacy REST link, None when missing
+
+    :param value: link such as {"@odata.id": path} or {"href": path}
+    :type value: dict.
+    """
+    if not isinstance(value, dict):
+        return None
+
+    return value.get(u'@odata.id') or value.get(u'href')
+
+def member_path(member):
+    """ Path of a collection member, a link or a full resource
+
+    :param member: member of a collection
+    :type member: dict.
+    """
+    return link_path(member) or link_path((member.get(u'links') or \
+                                                        {}).get(u'self'))
+
+def collection_members(pool, path, collectionstring=u'Members'):
+    """ Every member of a collection as a full resource. The members are
+    expanded in the collection request, services ignoring $expand have the
+    members fetched concurrently.
+
+    :param pool: session pool of the server
+    :type pool: SessionPool.
+    :param path: path of the collection
+    :type path: str.
+    :param collectionstring: property listing the members, Members or Items
+    :type collectionstring: str.
+    :returns: list of member resources
+    """
+    response = pool.get(u'%s?$expand=.' % path.rstrip(u'/'))
+
+    if response.status != 200 or not isinstance(response.dict, dict):
+        response = pool.get(path)
+
+    data = response.dict if response.status == 200 else None
+
+    if not isinstance(data, dict):
+        raise NoContentsFoundForOperationError(u"Unable to read %s, status " \
+                                            u"%s." % (path, response.status))
+
+    members = data.get(collectionstring) or data.get(u'Members') or \
+                data.get(u'Items') or (data.get(u'links') or {}).get(\
+                                                        u'Member') or []
+
+    if any(u'Id' not in member for member in members):
+        links = [member_path(member) for member in members]
+        members = [member.dict for member in pool.getall([link for link in \
+                                                            links if link])]
+
+    return [member for member in members if isinstance(member, dict)]
+
+class MemberCache(object):
+    """ Members of collections read once per session, so that the commands
+    following a listing in the same session do not read the collection
+    again. Sessions are told apart by their server and credentials. """
+    def __init__(self):
+        self._members = {}
+
+    def members(self, pool, path, collectionstring=u'Members', \
+                                                                refresh=False):
+        """ Members of a collection, read when not cached or when refreshing
+
+        :param pool: session pool of the server
+        :type pool: SessionPool.
+        :param path: path of the collection
+        :type path: str.
+        :param collectionstring: property listing the members
+        :type collectionstring: str.
+        :param refresh: read the collection even when cached
+        :type refresh: boolean.
+        """
+        key = (pool.baseurl, tuple(sorted(pool.authheaders.items())), path)
+
+        if refresh or key not in self._members:
+            self._members[key] = collection_members(pool, path, \
+                                                            collectionstring)
+
+        return self._members[key]
+
+    def invalidate(self, path):
+        """ Forget the members of a collection after changing it
+
+        :param path: path of the collection
+        :type path: str.
+        """
+        for key in [key for key in self._members if key[2] == path]:
+            del self._members[key]
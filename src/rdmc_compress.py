@@ -0,0 +1,160 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+"""Output files compressed on the fly with gzip or zstd, picked by the file
+extension or the --compression option"""
+
+#---------Imports---------
+
+import os
+import json
+import gzip
+
+from rdmc_helper import InvalidCommandLineError
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+#---------End of imports---------
+
+CHUNKSIZE = 64 * 1024
+COMPRESSIONS = ['gzip', 'zstd', 'none']
+EXTENSIONS = {'.gz': 'gzip', '.gzip': 'gzip', '.zst': 'zstd', '.zstd': 'zstd'}
+
+def compression_for(filename, compression=None):
+    """ Compression of an output file, the option wins over the extension
+
+    :param filename: name of the output file
+    :type filename: str.
+    :param compression: gzip, zstd, none or None to go by the extension
+    :type compression: str.
+    :returns: gzip, zstd or None
+    """
+    if compression:
+        compression = compression.lower()
+
+        if compression not in COMPRESSIONS:
+            raise InvalidCommandLineError("Invalid compression '%s', use "\
+                        "one of %s." % (compression, ', '.join(COMPRESSIONS)))
+
+        return None if compression == 'none' else compression
+
+    return EXTENSIONS.get(os.path.splitext(filename)[1].lower(), None)
+
+class _ZstdFile(object):
+    """ Write only file compressing into one zstd frame per open """
+    def __init__(self, filename, mode):
+        self._file = open(filename, mode)
+        self._compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def write(self, data):
+        """ Compress and write data """
+        compressed = self._compressor.compress(data)
+
+        if compressed:
+            self._file.write(compressed)
+
+    def flush(self):
+        """ Write out everything compressed so far """
+        self._file.write(self._compressor.flush(\
+                                    zstandard.COMPRESSOBJ_FLUSH_BLOCK))
+        self._file.flush()
+
+    def close(self):
+        """ End the frame and close the file """
+        if self._file.closed:
+            return
+
+        try:
+            self._file.write(self._compressor.flush())
+        finally:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def open_output(filename, mode='w', compression=None):
+    """ Open a file for writing, compressed when asked for or when the name
+    ends with .gz or .zst. Appending adds a new gzip member or zstd frame,
+    which decompressors read as one stream.
+
+    :param filename: name of the output file
+    :type filename: str.
+    :param mode: w or a, with an optional b
+    :type mode: str.
+    :param compression: gzip, zstd, none or None to go by the extension
+    :type compression: str.
+    :returns: file like object
+    """
+    compression = compression_for(filename, compression)
+
+    if compression == 'gzip':
+        return gzip.open(filename, mode.replace('b', '') + 'b')
+    elif compression == 'zstd':
+        if not zstandard:
+            raise InvalidCommandLineError("zstd compression needs the "\
+                                                "zstandard module installed.")
+
+        return _ZstdFile(filename, mode.replace('b', '') + 'b')
+
+    return open(filename, mode)
+
+def write_json(output, data, indent=None):
+    """ Encode data as JSON straight into an output in chunks, never holding
+    the whole document in memory
+
+    :param output: file like object to write to
+    :type output: file.
+    :param data: data to encode
+    :type data: any.
+    :param indent: indentation of the JSON document
+    :type indent: int.
+    """
+    pending = []
+    size = 0
+
+    for chunk in json.JSONEncoder(indent=indent).iterencode(data):
+        pending.append(chunk)
+        size += len(chunk)
+
+        if size >= CHUNKSIZE:
+            output.write(str(''.join(pending)))
+            pending = []
+            size = 0
+
+    if pending:
+        output.write(str(''.join(pending)))
+
+def compress_file(source, filename, compression=None):
+    """ Compress an existing file chunk by chunk into another file
+
+    :param source: file to compress
+    :type source: str.
+    :param filename: compressed file to write
+    :type filename: str.
+    :param compression: gzip, zstd, none or None to go by the extension
+    :type compression: str.
+    """
+    with open(source, 'rb') as infile:
+        with open_output(filename, 'wb', compression) as outfile:
+            for chunk in iter(lambda: infile.read(CHUNKSIZE), b''):
+                outfile.write(chunk)
@@ -0,0 +1,252 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+"""Chunked downloads of large resources straight to a file"""
+
+#---------Imports---------
+
+import os
+import re
+import sys
+import time
+import hashlib
+
+from rdmc_helper import InvalidCommandLineError, InvalidFileInputError, \
+                                            NoContentsFoundForOperationError
+from rdmc_compress import compression_for, open_output
+
+#---------End of imports---------
+
+CHUNKSIZE = 64 * 1024
+CONTENTRANGEPATTERN = re.compile(r'^bytes\s+(?:(\d+)-\d+|\*)/(\d+|\*)$')
+
+def parse_checksum(checksum):
+    """ Split a --checksum value into the hash algorithm and the expected
+    digest, ALGORITHM or ALGORITHM:DIGEST
+
+    :param checksum: checksum option value
+    :type checksum: str.
+    :returns: (algorithm, expected digest or None)
+    """
+    if not checksum:
+        return (None, None)
+
+    (algorithm, _, expected) = checksum.partition(':')
+    algorithm = algorithm.strip().lower()
+
+    try:
+        hashlib.new(algorithm)
+    except ValueError:
+        raise InvalidCommandLineError("Unsupported checksum algorithm '%s'." \
+                                                                    % algorithm)
+
+    return (algorithm, expected.strip().lower() or None)
+
+class DownloadProgress(object):
+    """ Byte counter printing the progress and throughput of a download.
+    The running counter is only shown on a terminal. """
+    def __init__(self, total=None, offset=0, out=None, interval=0.5, \
+                                                                quiet=False):
+        self.out = out or sys.stdout
+        self.total = total
+        self.offset = offset
+        self.interval = interval
+        self.quiet = quiet
+        self.received = offset
+        self.starttime = time.time()
+        self._lastshown = 0
+        self._live = not quiet and getattr(self.out, 'isatty', lambda: False)()
+
+    @property
+    def elapsed(self):
+        """ Seconds since the download started """
+        return time.time() - self.starttime
+
+    @property
+    def throughput(self):
+        """ Bytes per second received so far """
+        return (self.received - self.offset) / max(self.elapsed, 0.001)
+
+    def update(self, size):
+        """ Count received bytes
+
+        :param size: number of bytes received
+        :type size: int.
+        """
+        self.received += size
+
+        if self._live and time.time() - self._lastshown >= self.interval:
+            self._lastshown = time.time()
+            self.out.write(u"\r%s" % self.status())
+            self.out.flush()
+
+    def status(self):
+        """ One line description of the progress """
+        if self.total:
+            done = u"%s of %s bytes (%d%%)" % (self.received, self.total, \
+                                        self.received * 100 // self.total)
+        else:
+            done = u"%s bytes" % self.received
+
+        return u"%s, %.2f MB/s" % (done, self.throughput / (1024 * 1024))
+
+    def finish(self):
+        """ Print the final size, duration and throughput """
+        if self.quiet:
+            return
+
+        if self._live:
+            self.out.write(u"\r")
+
+        self.out.write(u"Downloaded %s in %.1f seconds.\n" % (self.status(), \
+                                                                self.elapsed))
+
+def _continues(response, offset):
+    """ Whether the answer to a Range request from offset continues the
+    partial file: a 206 range starting at the offset, or a 416 for a file
+    whose total size is the size of the partial file
+
+    :param response: 206 or 416 response
+    :type response: PooledResponse.
+    :param offset: size of the partial file
+    :type offset: int.
+    """
+    match = CONTENTRANGEPATTERN.match((response.getheader('content-range') \
+                                                                or '').strip())
+    if not match:
+        return False
+
+    (first, total) = match.groups()
+
+    if response.status == 206:
+        return first is not None and int(first) == offset
+
+    return first is None and total.isdigit() and int(total) == offset
+
+def _hashexisting(hasher, filename):
+    """ Feed the already downloaded part of a file to the hasher """
+    with open(filename, 'rb') as partial:
+        for chunk in iter(lambda: partial.read(CHUNKSIZE), b''):
+            hasher.update(chunk)
+
+def download(pool, path, filename, headers=None, checksum=None, resume=False,\
+                                                quiet=False, compression='none'):
+    """ Stream a resource to a file in chunks, optionally resuming a partial
+    download with an HTTP Range request and computing a checksum
+
+    :param pool: session pool of the logged in server
+    :type pool: SessionPool.
+    :param path: path of the resource to download
+    :type path: str.
+    :param filename: file to write
+    :type filename: str.
+    :param headers: additional request headers
+    :type headers: dict.
+    :param checksum: ALGORITHM or ALGORITHM:DIGEST, see parse_checksum
+    :type checksum: str.
+    :param resume: continue a partial file when the server allows ranges
+    :type resume: boolean.
+    :param quiet: do not print progress and the summary
+    :type quiet: boolean.
+    :param compression: gzip, zstd, none or None to go by the extension,
+                        the data is written as received by default
+    :type compression: str.
+    :returns: (bytes written, hex digest or None)
+    """
+    if resume and compression_for(filename, compression):
+        raise InvalidCommandLineError("Compressed downloads cannot be "\
+                                                                "resumed.")
+
+    (algorithm, expected) = parse_checksum(checksum)
+    hasher = hashlib.new(algorithm) if algorithm else None
+    reqheaders = dict(headers or {})
+
+    offset = 0
+    if resume and os.path.isfile(filename):
+        offset = os.path.getsize(filename)
+        if offset:
+            reqheaders['Range'] = 'bytes=%s-' % offset
+
+    while True:
+        response = pool.stream(path, headers=reqheaders)
+        #local sessions return the whole body at once
+        islocal = isinstance(response.read, basestring)
+
+        if not offset or response.status not in (206, 416) or \
+                                            _continues(response, offset):
+            break
+
+        #the range does not continue the partial file, download it again
+        if not islocal:
+            response.read()
+
+        offset = 0
+        reqheaders.pop('Range', None)
+
+    if response.status == 416 and offset:
+        #the partial file is already complete
+        if not islocal:
+            response.read()
+        length = 0
+        mode = 'ab'
+    elif response.status == 206 and offset:
+        length = response.getheader('content-length')
+        mode = 'ab'
+    elif response.status == 200:
+        length = response.getheader('content-length')
+        offset = 0
+        mode = 'wb'
+    else:
+        if not islocal:
+            response.read()
+        raise NoContentsFoundForOperationError("Unable to download '%s', " \
+                                        "status %s." % (path, response.status))
+
+    if hasher and offset:
+        _hashexisting(hasher, filename)
+
+    total = offset + int(length) if length else None
+    progress = DownloadProgress(total=total, offset=offset, quiet=quiet)
+
+    if response.status == 416:
+        reader = iter([])
+    elif islocal:
+        data = response.read
+        reader = (data[index:index + CHUNKSIZE] for index in \
+                                            xrange(0, len(data), CHUNKSIZE))
+    else:
+        reader = iter(lambda: response.read(CHUNKSIZE), b'')
+
+    with open_output(filename, mode, compression) as output:
+        for chunk in reader:
+            output.write(chunk)
+            progress.update(len(chunk))
+
+            if hasher:
+                hasher.update(chunk)
+
+    progress.finish()
+    digest = hasher.hexdigest() if hasher else None
+
+    if hasher and not quiet:
+        sys.stdout.write(u"%s: %s\n" % (algorithm, digest))
+
+    if expected and digest != expected:
+        raise InvalidFileInputError("Checksum mismatch for '%s', expected %s " \
+                                    "got %s." % (filename, expected, digest))
+
+    return (progress.received, digest)
@@ -0,0 +1,361 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+"""Temporary HTTP(S) server handing one local file, such as a firmware image
+or an ISO, to the iLOs that pull it"""
+
+#---------Imports---------
+
+import os
+import re
+import ssl
+import sys
+import errno
+import ctypes
+import ctypes.util
+import select
+import socket
+import urllib
+import threading
+import urlparse
+import SocketServer
+import BaseHTTPServer
+
+from rdmc_helper import LOGGER, InvalidFileInputError, \
+                                                    InvalidCommandLineError
+
+#---------End of imports---------
+
+CHUNKSIZE = 64 * 1024
+RANGEPATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+def _loadsendfile():
+    """ sendfile of the C library, None where it is not available """
+    if not sys.platform.startswith('linux'):
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        sendfile = getattr(libc, 'sendfile64', None) or libc.sendfile
+    except (OSError, AttributeError):
+        return None
+
+    sendfile.argtypes = [ctypes.c_int, ctypes.c_int, \
+                            ctypes.POINTER(ctypes.c_int64), ctypes.c_size_t]
+    sendfile.restype = ctypes.c_ssize_t
+
+    return sendfile
+
+_SENDFILE = _loadsendfile()
+
+def send_file(sock, infile, offset, count):
+    """ Send part of a file over a socket. Plain sockets are sent to by the
+    kernel straight from the page cache, encrypted ones chunk by chunk.
+
+    :param sock: connected socket
+    :type sock: socket.
+    :param infile: file opened for reading
+    :type infile: file.
+    :param offset: first byte to send
+    :type offset: int.
+    :param count: number of bytes to send
+    :type count: int.
+    :returns: number of bytes sent
+    """
+    sent = 0
+
+    if _SENDFILE and not isinstance(sock, ssl.SSLSocket):
+        position = ctypes.c_int64(offset)
+
+        while sent < count:
+            result = _SENDFILE(sock.fileno(), infile.fileno(), \
+                        ctypes.byref(position), min(count - sent, 1 << 30))
+
+            if result < 0:
+                error = ctypes.get_errno()
+
+                if error in (errno.EAGAIN, errno.EINTR):
+                    select.select([], [sock], [])
+                    continue
+
+                raise socket.error(error, os.strerror(error))
+            elif result == 0:
+                break
+
+            sent += result
+
+        return sent
+
+    infile.seek(offset)
+
+    while sent < count:
+        chunk = infile.read(min(CHUNKSIZE, count - sent))
+
+        if not chunk:
+            break
+
+        sock.sendall(chunk)
+        sent += len(chunk)
+
+    return sent
+
+def local_address(host):
+    """ Address of the interface this machine reaches a host with, which
+    is the address the host can reach this machine on
+
+    :param host: address of the remote host, an iLO
+    :type host: str.
+    """
+    probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    try:
+        probe.connect((host, 443))
+        return probe.getsockname()[0]
+    finally:
+        probe.close()
+
+def serving_address(hosts, serveraddress=None):
+    """ Address to listen on for a group of hosts and the address they
+    reach this machine on. Without a server address the file is only
+    served on the one interface every host is reached through.
+
+    :param hosts: addresses of the remote hosts, iLOs
+    :type hosts: list.
+    :param serveraddress: address the hosts reach this machine on, given
+                          by the user, to listen on every interface
+    :type serveraddress: str.
+    :returns: (address to listen on, address the hosts reach)
+    """
+    if serveraddress:
+        return ('', serveraddress)
+
+    addresses = set()
+
+    for host in hosts:
+        try:
+            addresses.add(local_address(host))
+        except socket.error, excp:
+            LOGGER.info(u"Unable to find the route to %s: %s" % (host, excp))
+
+    if len(addresses) != 1:
+        raise InvalidCommandLineError("The servers are not all reached "\
+                    "through one interface of this system. Provide the "\
+                    "address they can reach this system on with the "\
+                    "serveraddress flag.")
+
+    address = addresses.pop()
+
+    return (address, address)
+
+def parse_range(header, size):
+    """ First and last byte of a single byte range request
+
+    :param header: Range header value
+    :type header: str.
+    :param size: size of the file
+    :type size: int.
+    :returns: (first, last), None for the whole file, False if unsatisfiable
+    """
+    match = RANGEPATTERN.match((header or '').strip())
+
+    if not match or not any(match.groups()):
+        return None
+
+    (first, last) = match.groups()
+
+    if not first:
+        length = int(last)
+        return (max(size - length, 0), size - 1) if length and size else False
+
+    first = int(first)
+
+    if last and int(last) < first:
+        return None
+    elif first >= size:
+        return False
+
+    last = min(int(last), size - 1) if last else size - 1
+
+    return (first, last)
+
+class _FileRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """ GET and HEAD of the served file, with single byte ranges """
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        """ Headers of the file only """
+        self.respond(body=False)
+
+    def do_GET(self):
+        """ The file or the requested range of it """
+        self.respond(body=True)
+
+    def respond(self, body):
+        """ Send the file, part of it or an error """
+        server = self.server
+
+        if urllib.unquote(urlparse.urlparse(self.path).path) != server.path:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        size = server.size
+        byterange = parse_range(self.headers.getheader('range'), size)
+
+        if byterange is False:
+            self.send_response(416)
+            self.send_header('Content-Range', 'bytes */%s' % size)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        (first, last) = byterange or (0, size - 1)
+        length = max(last - first + 1, 0)
+
+        self.send_response(206 if byterange else 200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(length))
+        self.send_header('Accept-Ranges', 'bytes')
+
+        if byterange:
+            self.send_header('Content-Range', 'bytes %s-%s/%s' % (first, last, \
+                                                                        size))
+
+        self.end_headers()
+
+        if not body or not length:
+            return
+
+        self.wfile.flush()
+
+        with open(server.filename, 'rb') as infile:
+            sent = send_file(self.connection, infile, first, length)
+
+        server.record(self.client_address[0], sent, complete=sent == size)
+
+    def log_message(self, fmt, *args):
+        """ Requests go to the log file instead of the console """
+        LOGGER.info(u"%s %s" % (self.client_address[0], fmt % args))
+
+class FileServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """ Serve one file over HTTP, or HTTPS when given a certificate, to many
+    clients at the same time. Each download runs in its own thread and reads
+    the file independently. """
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 256
+
+    def __init__(self, filename, address='', port=0, certfile=None, \
+                                                                keyfile=None):
+        """
+        :param filename: local file to serve
+        :type filename: str.
+        :param address: address to listen on, all interfaces by default
+        :type address: str.
+        :param port: port to listen on, any free port by default
+        :type port: int.
+        :param certfile: PEM certificate to serve HTTPS with
+        :type certfile: str.
+        :param keyfile: PEM private key of the certificate
+        :type keyfile: str.
+        """
+        if not os.path.isfile(filename):
+            raise InvalidFileInputError("File '%s' doesn't exist." % filename)
+
+        self.filename = os.path.abspath(filename)
+        self.path = u'/' + os.path.basename(self.filename)
+        self.size = os.path.getsize(self.filename)
+        self.certfile = certfile
+        self.keyfile = keyfile
+        self.downloads = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+        BaseHTTPServer.HTTPServer.__init__(self, (address, port), \
+                                                        _FileRequestHandler)
+
+    def finish_request(self, request, client_address):
+        """ TLS handshakes happen in the thread of the request """
+        if self.certfile:
+            request = ssl.wrap_socket(request, certfile=self.certfile, \
+                            keyfile=self.keyfile or None, server_side=True)
+
+        BaseHTTPServer.HTTPServer.finish_request(self, request, client_address)
+
+    def handle_error(self, request, client_address):
+        """ Failed requests, mostly connections closed by the client, are
+        logged instead of printed """
+        LOGGER.info(u"Request from %s failed: %s" % (client_address[0], \
+                                                        sys.exc_info()[1]))
+
+    def record(self, client, sent, complete):
+        """ Count the bytes sent to a client
+
+        :param client: client address
+        :type client: str.
+        :param sent: bytes sent by one request
+        :type sent: int.
+        :param complete: the whole file was sent
+        :type complete: boolean.
+        """
+        with self._lock:
+            stats = self.downloads.setdefault(client, {u'Bytes': 0, \
+                                                        u'Requests': 0, \
+                                                        u'Complete': False})
+            stats[u'Bytes'] += sent
+            stats[u'Requests'] += 1
+            stats[u'Complete'] = stats[u'Complete'] or complete
+
+    def url(self, address=None):
+        """ Url of the file
+
+        :param address: address the client reaches this server on, the
+                        listening address by default
+        :type address: str.
+        """
+        port = self.server_address[1]
+        host = address or self.server_address[0]
+
+        if ':' in host:
+            host = u'[%s]' % host
+
+        return u'%s://%s:%s%s' % (u'https' if self.certfile else u'http', \
+                                host, port, urllib.quote(self.path))
+
+    def start(self):
+        """ Serve in a background thread """
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+        return self
+
+    def stop(self):
+        """ Stop serving and close the listening socket """
+        if self._thread:
+            self.shutdown()
+            self._thread.join()
+            self._thread = None
+
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
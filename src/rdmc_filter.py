@@ -0,0 +1,494 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+"""Filter expressions for the --filter options, compiled once into
+predicates evaluated against each entry
+
+    Severity=Critical AND (Created>=2017-10-01 OR Oem.Hpe.Class!=33)
+    Message~"(?i)fan [0-9]+ failed" AND NOT Id<100
+
+Comparisons are =, !=, <, <=, >, >=, ~ (regex search) and !~. Paths are
+dotted property names, list indexes included. Values can be quoted. Text
+is compared with = and != ignoring case, and a date such as 2017-10-01
+stands for midnight UTC of that day. A single ATTRIBUTE=VALUE with spaces
+or = in the value is still accepted."""
+
+#---------Imports---------
+
+import re
+
+from rdmc_helper import InvalidCommandLineError
+
+#---------End of imports---------
+
+#property types a comparison can be sent to the service as a $filter for
+NUMBER = 'number'
+BOOLEAN = 'boolean'
+TIMESTAMP = 'timestamp'
+
+ODATAOPERATORS = {'=': 'eq', '==': 'eq', '!=': 'ne', '<': 'lt', '<=': 'le', \
+                  '>': 'gt', '>=': 'ge'}
+KEYWORDS = ['AND', 'OR', 'NOT']
+
+TOKENIZER = re.compile(r'\s*(?:(?P<paren>[()])|(?P<op>>=|<=|!=|!~|==|=|<|>|~)'\
+                       r'|"(?P<dquoted>(?:[^"\\]|\\.)*)"|\'(?P<squoted>'\
+                       r'(?:[^\'\\]|\\.)*)\'|(?P<word>[^\s()=<>!~"\']+))')
+TIMESTAMPPATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2})(?:[T ](\d{2}:\d{2})'\
+                              r'(:\d{2}(?:\.\d+)?)?(Z|[+-]\d{2}:\d{2})?)?$')
+
+def _timestamp(text):
+    """ Full timestamp of a date or a date and time, None if the text is
+    neither. Missing parts are midnight and UTC.
+
+    :param text: text to read
+    :type text: str.
+    """
+    match = TIMESTAMPPATTERN.match(text.strip())
+
+    if not match:
+        return None
+
+    (date, minutes, seconds, zone) = match.groups()
+
+    return u'%sT%s%s%s' % (date, minutes or u'00:00', seconds or u':00', \
+                                                                zone or u'Z')
+
+class Literal(object):
+    """ Value of a comparison, keeps the text and its typed forms """
+    def __init__(self, text, quoted=False):
+        self.text = text
+        self.quoted = quoted
+        self.number = None
+        self.boolean = None
+        self.timestamp = _timestamp(text)
+
+        if not quoted:
+            try:
+                self.number = float(text)
+            except ValueError:
+                pass
+
+            if text.lower() in ('true', 'false'):
+                self.boolean = text.lower() == 'true'
+
+    def odata(self, kind):
+        """ Literal in $filter syntax, None unless it is of the type of
+        the property it is compared with
+
+        :param kind: NUMBER, BOOLEAN or TIMESTAMP
+        :type kind: str.
+        """
+        if kind == BOOLEAN and self.boolean is not None:
+            return 'true' if self.boolean else 'false'
+        elif kind == NUMBER and self.number is not None:
+            return self.text
+        elif kind == TIMESTAMP and self.timestamp:
+            return self.timestamp
+
+        return None
+
+def _resolve(entry, path):
+    """ Values found at a dotted path, lists in the middle are searched
+
+    :param entry: entry to read from
+    :type entry: dict.
+    :param path: list of path parts
+    :type path: list.
+    :returns: list of values, empty when the path does not exist
+    """
+    values = [entry]
+
+    for part in path:
+        found = []
+
+        for value in values:
+            if isinstance(value, dict):
+                if part in value:
+                    found.append(value[part])
+                else:
+                    lowered = part.lower()
+                    found.extend(item for (key, item) in value.iteritems() if \
+                                                    key.lower() == lowered)
+            elif isinstance(value, list):
+                if part.isdigit():
+                    if int(part) < len(value):
+                        found.append(value[int(part)])
+                else:
+                    found.extend(item[part] for item in value if \
+                                    isinstance(item, dict) and part in item)
+
+        values = found
+
+    flattened = []
+
+    for value in values:
+        if isinstance(value, list):
+            flattened.extend(value)
+        else:
+            flattened.append(value)
+
+    return flattened
+
+def _isnumber(text):
+    """ Check if a string holds a number """
+    try:
+        float(text)
+    except ValueError:
+        return False
+
+    return True
+
+def _compare(value, operator, literal):
+    """ Compare one value with a literal, typed by the value
+
+    :param value: value of the entry
+    :type value: any.
+    :param operator: comparison operator
+    :type operator: str.
+    :param literal: literal of the expression
+    :type literal: Literal.
+    """
+    if isinstance(value, bool):
+        if literal.boolean is None:
+            return operator == '!='
+
+        (left, right) = (value, literal.boolean)
+    elif isinstance(value, (int, long, float)) and literal.number is not None:
+        (left, right) = (value, literal.number)
+    elif isinstance(value, basestring) and literal.number is not None and \
+                                                            _isnumber(value):
+        #numeric Ids and counters are often strings
+        (left, right) = (float(value), literal.number)
+    elif value is None:
+        isnull = literal.text.lower() in ('null', 'none')
+        return isnull if operator in ('=', '==') else (operator == '!=' and \
+                                                                    not isnull)
+    elif isinstance(value, basestring) and literal.timestamp and \
+                                                    _timestamp(value):
+        (left, right) = (_timestamp(value), literal.timestamp)
+    elif operator in ('=', '==', '!='):
+        #text is matched ignoring case, as the ATTRIBUTE=VALUE filter did
+        (left, right) = ((u'%s' % value).lower(), literal.text.lower())
+    else:
+        (left, right) = (u'%s' % value, literal.text)
+
+    if operator in ('=', '=='):
+        return left == right
+    elif operator == '!=':
+        return left != right
+    elif operator == '<':
+        return left < right
+    elif operator == '<=':
+        return left <= right
+    elif operator == '>':
+        return left > right
+
+    return left >= right
+
+class Comparison(object):
+    """ PATH OPERATOR VALUE node """
+    def __init__(self, path, operator, literal):
+        self.path = path
+        self.operator = operator
+        self.literal = literal
+        self.regex = None
+
+        if operator in ('~', '!~'):
+            try:
+                self.regex = re.compile(literal.text)
+            except re.error, excp:
+                raise InvalidCommandLineError("Invalid regular expression " \
+                                            "'%s': %s" % (literal.text, excp))
+
+    def match(self, entry):
+        """ Evaluate the comparison against an entry """
+        values = _resolve(entry, self.path)
+
+        if self.regex:
+            found = any(self.regex.search(u'%s' % value) for value in values)
+            return found if self.operator == '~' else not found
+
+        if self.operator == '!=':
+            return bool(values) and all(_compare(value, '!=', self.literal) \
+                                                            for value in values)
+
+        return any(_compare(value, self.operator, self.literal) for value in \
+                                                                        values)
+
+    def odata(self, types, exact=False):
+        """ Comparison in $filter syntax, None if the service would not
+        compare the way match does. Only properties of a known type that
+        the literal has are sent, text is matched ignoring case here.
+
+        :param types: dotted property path to NUMBER, BOOLEAN or TIMESTAMP
+        :type types: dict.
+        :param exact: unused, a comparison is always sent exactly or not
+        :type exact: boolean.
+        """
+        if self.regex:
+            return None
+
+        kind = dict((path.lower(), kind) for (path, kind) in (types or \
+                                {}).iteritems()).get(u'.'.join(self.path).lower())
+        value = self.literal.odata(kind) if kind else None
+
+        if value is None:
+            return None
+
+        return u"%s %s %s" % (u'/'.join(self.path), \
+                                        ODATAOPERATORS[self.operator], value)
+
+class Operation(object):
+    """ AND, OR and NOT nodes """
+    def __init__(self, operator, operands):
+        self.operator = operator
+        self.operands = operands
+
+    def match(self, entry):
+        """ Evaluate the operation against an entry """
+        if self.operator == 'AND':
+            return all(operand.match(entry) for operand in self.operands)
+        elif self.operator == 'OR':
+            return any(operand.match(entry) for operand in self.operands)
+
+        return not self.operands[0].match(entry)
+
+    def odata(self, types, exact=False):
+        """ Operation in $filter syntax, None if it cannot be expressed.
+        The operands of AND that cannot be sent are left out, which selects
+        more entries than the expression, unless the expression has to be
+        sent exactly as under NOT.
+
+        :param types: dotted property path to NUMBER, BOOLEAN or TIMESTAMP
+        :type types: dict.
+        :param exact: select no more entries than the expression does
+        :type exact: boolean.
+        """
+        exact = exact or self.operator == 'NOT'
+        operands = [operand.odata(types, exact) for operand in self.operands]
+
+        if self.operator == 'AND' and not exact:
+            operands = [operand for operand in operands if operand is not None]
+
+        if not operands or None in operands:
+            return None
+        elif self.operator == 'NOT':
+            return u"not (%s)" % operands[0]
+        elif len(operands) == 1:
+            return operands[0]
+
+        return (u" %s " % self.operator.lower()).join(u"(%s)" % operand for \
+                                                        operand in operands)
+
+class _Parser(object):
+    """ Recursive descent parser of filter expressions """
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens = self.tokenize(expression)
+        self.position = 0
+
+    def tokenize(self, expression):
+        """ Split an expression into (kind, text) tokens """
+        tokens = []
+        position = 0
+        expression = expression.rstrip()
+
+        while position < len(expression):
+            match = TOKENIZER.match(expression, position)
+
+            if not match or match.end() == position:
+                self.error("unexpected character at position %s" % position)
+
+            kind = match.lastgroup
+            text = match.group(kind)
+
+            if kind in ('dquoted', 'squoted'):
+                (kind, text) = ('quoted', re.sub(r'\\(.)', r'\1', text))
+            elif kind == 'word' and text.upper() in KEYWORDS:
+                (kind, text) = ('keyword', text.upper())
+
+            tokens.append((kind, text))
+            position = match.end()
+
+        return tokens
+
+    def error(self, message):
+        """ Raise a command line error for the expression """
+        raise InvalidCommandLineError("Invalid filter '%s': %s." % \
+                                                    (self.expression, message))
+
+    def peek(self):
+        """ Next token, (None, None) at the end """
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+
+        return (None, None)
+
+    def take(self):
+        """ Consume the next token """
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        """ Parse the whole expression """
+        if not self.tokens:
+            self.error("empty expression")
+
+        node = self.parseor()
+
+        if self.peek()[0] is not None:
+            self.error("unexpected '%s'" % self.peek()[1])
+
+        return node
+
+    def parseor(self):
+        """ OR has the lowest precedence """
+        operands = [self.parseand()]
+
+        while self.peek() == ('keyword', 'OR'):
+            self.take()
+            operands.append(self.parseand())
+
+        return operands[0] if len(operands) == 1 else Operation('OR', operands)
+
+    def parseand(self):
+        """ AND binds tighter than OR """
+        operands = [self.parsenot()]
+
+        while self.peek() == ('keyword', 'AND'):
+            self.take()
+            operands.append(self.parsenot())
+
+        return operands[0] if len(operands) == 1 else Operation('AND', operands)
+
+    def parsenot(self):
+        """ NOT, parenthesis and comparisons """
+        (kind, text) = self.take()
+
+        if (kind, text) == ('keyword', 'NOT'):
+            return Operation('NOT', [self.parsenot()])
+        elif (kind, text) == ('paren', '('):
+            node = self.parseor()
+
+            if self.take() != ('paren', ')'):
+                self.error("missing ')'")
+
+            return node
+        elif kind not in ('word', 'quoted'):
+            self.error("expected a property name instead of '%s'" % text)
+
+        path = text.split('.') if kind == 'word' else [text]
+        (opkind, operator) = self.take()
+
+        if opkind != 'op':
+            self.error("expected a comparison after '%s'" % text)
+
+        (valkind, value) = self.take()
+
+        if valkind not in ('word', 'quoted'):
+            self.error("expected a value after '%s'" % operator)
+
+        return Comparison(path, operator, Literal(value, quoted=valkind == \
+                                                                    'quoted'))
+
+class CompiledFilter(object):
+    """ Filter expression compiled into a predicate """
+    def __init__(self, expression):
+        expression = expression.strip()
+
+        if len(expression) > 1 and expression[0] == expression[-1] and \
+                                            expression.startswith(("'", '"')):
+            expression = expression[1:-1]
+
+        self.expression = expression
+
+        try:
+            self.root = _Parser(expression).parse()
+        except InvalidCommandLineError, excp:
+            self.root = self.legacy(expression)
+
+            if not self.root:
+                raise excp
+
+    def legacy(self, expression):
+        """ ATTRIBUTE=VALUE form of the previous filter option, split at
+        the first = so that the value may contain spaces and =. None if the
+        expression is not of that form. """
+        try:
+            (sel, val) = expression.split('=', 1)
+        except ValueError:
+            return None
+
+        if not sel.strip():
+            return None
+
+        return Comparison(sel.strip().split('.'), '=', Literal(val.strip()))
+
+    @property
+    def simple(self):
+        """ (attribute, value) if the expression is a single equality, as
+        accepted by the library filters """
+        root = self.root
+
+        if isinstance(root, Comparison) and root.operator in ('=', '=='):
+            value = root.literal.text
+
+            if root.literal.boolean is not None:
+                value = root.literal.boolean
+
+            return (u'.'.join(root.path), value)
+
+        return None
+
+    def match(self, entry):
+        """ Evaluate the filter against an entry
+
+        :param entry: entry to test
+        :type entry: dict.
+        """
+        return self.root.match(entry)
+
+    def filter(self, entries):
+        """ Yield the matching entries
+
+        :param entries: entries to filter
+        :type entries: iterable.
+        """
+        for entry in entries:
+            if isinstance(entry, dict) and self.root.match(entry):
+                yield entry
+
+    def odata(self, types=None):
+        """ The expression as a $filter query value selecting the same or
+        more entries, None if it cannot be sent to the service. The entries
+        the service returns are still matched, see match.
+
+        :param types: dotted property path to NUMBER, BOOLEAN or TIMESTAMP,
+                      the properties that can be sent
+        :type types: dict.
+        """
+        return self.root.odata(types)
+
+def compile_filter(expression):
+    """ Compile a filter expression
+
+    :param expression: filter expression
+    :type expression: str.
+    :returns: CompiledFilter
+    """
+    return CompiledFilter(expression)
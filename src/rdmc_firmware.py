@@ -0,0 +1,151 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+"""Firmware update service and firmware versions of servers reached over
+their own sessions"""
+
+#---------Imports---------
+
+from rdmc_helper import NoContentsFoundForOperationError
+from rdmc_log_follow import odata_id
+
+#---------End of imports---------
+
+#update service of iLO 4, iLO 5 links it from the service root
+GEN9UPDATESERVICE = u'/redfish/v1/Managers/1/UpdateService/'
+
+def update_state(results):
+    """ State of an update service
+
+    :param results: update service resource
+    :type results: dict.
+    """
+    for oem in ('Hpe', 'Hp'):
+        try:
+            return results['Oem'][oem]['State']
+        except (KeyError, TypeError):
+            pass
+
+    return results['State']
+
+def update_request(service, uri, tpmenabled=False):
+    """ Target and body of the request updating from a firmware URI, the
+    same requests the firmwareupdate command sends
+
+    :param service: update service resource
+    :type service: dict.
+    :param uri: URI iLO downloads the firmware from
+    :type uri: str.
+    :param tpmenabled: override the TPM check of iLO 4
+    :type tpmenabled: boolean.
+    :returns: (target, body)
+    """
+    actions = service.get(u'Actions') or {}
+
+    for (name, action) in actions.iteritems():
+        if u'SimpleUpdate' in name:
+            return (action[u'target'], {u'Action': name.split(u'#')[-1], \
+                                                            u'ImageURI': uri})
+
+    for (name, action) in actions.iteritems():
+        if u'InstallFromURI' in name:
+            body = {u'Action': u'InstallFromURI', u'FirmwareURI': uri}
+
+            if tpmenabled:
+                body[u'TPMOverrideFlag'] = True
+
+            return (action[u'target'], body)
+
+    raise NoContentsFoundForOperationError(u"Unable to find the firmware " \
+                                                        u"update action.")
+
+def update_service(pool):
+    """ Path and resource of the update service of a server
+
+    :param pool: session pool of the server
+    :type pool: SessionPool.
+    :returns: (path, resource)
+    """
+    paths = []
+
+    try:
+        paths.append(odata_id(pool.get(u'/redfish/v1/').dict[\
+                                                            u'UpdateService']))
+    except (KeyError, TypeError):
+        pass
+
+    paths.append(GEN9UPDATESERVICE)
+
+    for path in paths:
+        if not path:
+            continue
+
+        response = pool.get(path)
+
+        if response.status == 200 and response.dict and \
+                                                response.dict.get(u'Actions'):
+            return (path, response.dict)
+
+    raise NoContentsFoundForOperationError(u"Unable to find the update " \
+                                            u"service of %s." % pool.baseurl)
+
+def firmware_versions(pool):
+    """ Versions of the firmware components of a server, from the firmware
+    inventory or the iLO version when there is no inventory
+
+    :param pool: session pool of the server
+    :type pool: SessionPool.
+    :returns: dictionary of component to version, components named by
+              their Name and Id since several can share a Name
+    """
+    versions = {}
+
+    try:
+        (_, service) = update_service(pool)
+        inventory = odata_id(service.get(u'FirmwareInventory'))
+    except NoContentsFoundForOperationError:
+        inventory = None
+
+    if inventory:
+        data = pool.get(u'%s?$expand=.' % inventory.rstrip(u'/')).dict or {}
+        members = data.get(u'Members', [])
+        links = [odata_id(member) for member in members if \
+                                        set(member) <= set([u'@odata.id'])]
+
+        if links:
+            members = [response.dict for response in pool.getall(links)]
+
+        for member in members:
+            if not isinstance(member, dict) or not member.get(u'Version'):
+                continue
+
+            (name, memberid) = (member.get(u'Name'), member.get(u'Id'))
+
+            if name and memberid is not None and u'%s' % memberid != name:
+                name = u'%s (%s)' % (name, memberid)
+
+            versions[name or u'%s' % memberid] = member[u'Version']
+
+    if not versions:
+        try:
+            managers = odata_id(pool.get(u'/redfish/v1/').dict[u'Managers'])
+            manager = odata_id(pool.get(managers).dict[u'Members'][0])
+            versions[u'iLO'] = pool.get(manager).dict[u'FirmwareVersion']
+        except (IndexError, KeyError, TypeError):
+            pass
+
+    return versions
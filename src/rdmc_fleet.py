@@ -0,0 +1,253 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+"""Sessions to many servers at once, opened next to the library client"""
+
+#---------Imports---------
+
+import os
+import sys
+import shlex
+import threading
+
+from optparse import OptionParser
+from multiprocessing.pool import ThreadPool
+
+from rdmc_helper import LOGGER, InvalidFileInputError, \
+                    InvalidMSCfileInputError, NoCurrentSessionEstablished
+from rdmc_session_pool import SessionPool
+
+#---------End of imports---------
+
+SESSIONSPATH = u'/redfish/v1/SessionService/Sessions/'
+
+def normalize_url(url):
+    """ Add the https scheme to a bare iLO address
+
+    :param url: iLO url or address
+    :type url: str.
+    """
+    if url.startswith(('"', "'")) and url.endswith(('"', "'")):
+        url = url[1:-1]
+
+    return url if u'://' in url else u'https://' + url
+
+def server_host(url):
+    """ Address of a server, its url without the scheme and trailing /
+
+    :param url: iLO url or address
+    :type url: str.
+    """
+    return normalize_url(url).split(u'://', 1)[-1].rstrip(u'/')
+
+def read_serverlist(filename):
+    """ Read a multiple server file, the same file used by load -m, one
+    '--url URL -u USER -p PASSWORD' line per server
+
+    :param filename: multiple server file
+    :type filename: str.
+    :returns: list of dictionaries with url, user and password
+    """
+    if not os.path.isfile(filename):
+        raise InvalidFileInputError("File '%s' doesn't exist." % filename)
+
+    parser = OptionParser()
+    parser.add_option('--url', dest='url', default=None)
+    parser.add_option('-u', '--user', dest='user', default=None)
+    parser.add_option('-p', '--password', dest='password', default=None)
+
+    servers = []
+
+    with open(filename, 'r') as serverfile:
+        for line in serverfile:
+            line = line.strip()
+
+            if not line or line.startswith('#'):
+                continue
+
+            try:
+                (options, _) = parser.parse_args(shlex.split(line, \
+                                                                posix=False))
+            except SystemExit:
+                options = None
+
+            if not options or not (options.url and options.user and \
+                                                            options.password):
+                sys.stderr.write('Incomplete data in input file: %s\n' % line)
+                raise InvalidMSCfileInputError('Please verify the contents of '\
+                                                    'the %s file' % filename)
+
+            servers.append({u'url': normalize_url(options.url), u'user': \
+                    options.user, u'password': options.password.strip('"\'')})
+
+    if not servers:
+        raise InvalidMSCfileInputError("No servers found in '%s'." % filename)
+
+    return servers
+
+class RemoteSession(object):
+    """ Redfish session to one server with its own pool of connections, so
+    that many servers can be worked on concurrently """
+    def __init__(self, url, user, password, workers=1, timeout=None, \
+                                                                verbose=False):
+        self.url = normalize_url(url)
+        self.user = user
+        self.password = password
+        self.location = None
+        self.pool = SessionPool(None, workers=workers, timeout=timeout, \
+                                                verbose=verbose, url=self.url)
+
+    @property
+    def host(self):
+        """ Address of the server """
+        return server_host(self.url)
+
+    def login(self):
+        """ Create the session """
+        response = self.pool.request('POST', SESSIONSPATH, body={u'UserName': \
+                                    self.user, u'Password': self.password})
+        token = response.getheader('x-auth-token')
+
+        if response.status not in (200, 201) or not token:
+            raise NoCurrentSessionEstablished("Unable to log in to %s, " \
+                                "status %s." % (self.host, response.status))
+
+        self.location = response.getheader('location')
+        self.pool.authheaders['X-Auth-Token'] = token
+
+        return self
+
+    def logout(self):
+        """ Delete the session and close the connections """
+        try:
+            if self.location:
+                self.pool.request('DELETE', self.location)
+        except Exception, excp:
+            LOGGER.info(u"Unable to log out of %s: %s" % (self.host, excp))
+        finally:
+            self.location = None
+            self.pool.close()
+
+    def __enter__(self):
+        return self.login()
+
+    def __exit__(self, *args):
+        self.logout()
+
+def open_session(server, verbose=False, workers=1, timeout=60):
+    """ Session to one server of a multiple server file, logged in to
+    when used as a context manager or with login
+
+    :param server: server as returned by read_serverlist
+    :type server: dict.
+    :param verbose: log the requests sent to the server
+    :type verbose: boolean.
+    :param workers: number of connections to the server
+    :type workers: int.
+    :param timeout: seconds to wait for a response, None to wait forever
+    :type timeout: int.
+    """
+    return RemoteSession(server[u'url'], server[u'user'], server[u'password'], \
+                        workers=workers, timeout=timeout, verbose=verbose)
+
+def add_fleet_options(parser, action, note=None, maxservers=True):
+    """ Add the options of a command that works on every server of a
+    multiple server file
+
+    :param parser: option parser of the command
+    :type parser: OptionParser.
+    :param action: what is done, such as 'Update every server'
+    :type action: str.
+    :param note: sentence added to the help of the file option
+    :type note: str.
+    :param maxservers: add the option limiting the servers worked on at
+                       the same time
+    :type maxservers: boolean.
+    """
+    parser.add_option(
+        '--multiprocessing',
+        dest='mpfilename',
+        help="%s of the given file, one '--url URL -u USER -p PASSWORD' "\
+        "line per server, as used by the load command.%s" % (action, \
+                                                    ' ' + note if note else ''),
+        default=None,
+    )
+
+    if maxservers:
+        parser.add_option(
+            '--maxservers',
+            dest='maxservers',
+            type="int",
+            help="Number of servers worked on at the same time. (default 8)",
+            default=8,
+        )
+
+def run_on_servers(servers, func, workers=8):
+    """ Call func for every server concurrently, errors are collected
+    instead of stopping the other servers
+
+    :param servers: servers as returned by read_serverlist
+    :type servers: list.
+    :param func: function called with a server dictionary
+    :type func: callable.
+    :param workers: number of servers worked on at the same time
+    :type workers: int.
+    :returns: list of (server, result, error) in the order of servers
+    """
+    def runone(server):
+        """ Run func for one server """
+        try:
+            return (server, func(server), None)
+        except Exception, excp:
+            LOGGER.info(u"%s failed: %s" % (server[u'url'], excp))
+            return (server, None, excp)
+
+    if workers <= 1 or len(servers) <= 1:
+        return [runone(server) for server in servers]
+
+    pool = ThreadPool(min(workers, len(servers)))
+
+    try:
+        return pool.map(runone, servers)
+    finally:
+        pool.close()
+        pool.join()
+
+class LineWriter(object):
+    """ Thread safe writer of whole lines to one output """
+    def __init__(self, output):
+        self.output = output
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def write(self, line):
+        """ Write one line and flush it
+
+        :param line: line without the trailing newline
+        :type line: str.
+        """
+        with self._lock:
+            if self.closed:
+                return
+
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def close(self):
+        """ Drop the lines written from now on, before the output closes """
+        with self._lock:
+            self.closed = True
@@ -103,6 +103,7 @@ class ReturnCodes(object):
     NIC_MISSING_OR_INVALID_ERROR = 43
     NO_CURRENT_SESSION_ESTABLISHED = 44
     FAILURE_DURING_COMMIT_OPERATION = 45
+    TASK_TIMEOUT_ERROR = 46
     MULTIPLE_SERVER_CONFIG_FAIL = 51
     MULTIPLE_SERVER_INPUT_FILE_ERROR = 52
     LOAD_SKIP_SETTING_ERROR = 53
@@ -214,6 +215,10 @@ class InvalidMSCfileInputError(RdmcError):
 class FirmwareUpdateError(RdmcError):
     """ Raised when there is an error while updating firmware """
     pass
+class TaskTimeoutError(RdmcError):
+    """ Raised when an operation does not complete in the given time """
+    pass
+
 class FailureDuringCommitError(RdmcError):
     """ Raised when there is an error during commit """
     pass
@@ -0,0 +1,171 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+"""Collect the logs of servers over their own sessions, for collecting a
+whole fleet at once"""
+
+#---------Imports---------
+
+import os
+import json
+import time
+import errno
+
+from rdmc_filter import NUMBER, BOOLEAN, TIMESTAMP
+from rdmc_helper import NoContentsFoundForOperationError
+from rdmc_log_follow import odata_id
+
+#---------End of imports---------
+
+#output file of each log, compressed files get the extension added
+LOGFILES = {u'IML': u'IML.ndjson', u'IEL': u'IEL.ndjson', u'AHS': u'AHS.ahs'}
+COMPRESSEDEXTENSIONS = {'gzip': u'.gz', 'zstd': u'.zst'}
+#typed properties of IML and IEL entries, filters on them can be sent to
+#the service
+LOGENTRYTYPES = {u'Created': TIMESTAMP, u'Modified': TIMESTAMP, \
+                 u'EventTimestamp': TIMESTAMP, u'SensorNumber': NUMBER, \
+                 u'Oem.Hpe.Updated': TIMESTAMP, u'Oem.Hp.Updated': TIMESTAMP, \
+                 u'Oem.Hpe.Class': NUMBER, u'Oem.Hp.Class': NUMBER, \
+                 u'Oem.Hpe.Code': NUMBER, u'Oem.Hp.Code': NUMBER, \
+                 u'Oem.Hpe.Count': NUMBER, u'Oem.Hp.Count': NUMBER, \
+                 u'Oem.Hpe.Repaired': BOOLEAN, u'Oem.Hp.Repaired': BOOLEAN}
+
+def log_filename(outdir, host, service, compression=None):
+    """ Path of the file a log of a server is collected into, the host
+    directory is created when missing
+
+    :param outdir: output directory of the collection
+    :type outdir: str.
+    :param host: file name safe server identifier
+    :type host: str.
+    :param service: IML, IEL or AHS
+    :type service: str.
+    :param compression: gzip, zstd or None
+    :type compression: str.
+    """
+    hostdir = os.path.join(outdir, host)
+
+    try:
+        os.makedirs(hostdir)
+    except OSError, excp:
+        if excp.errno != errno.EEXIST:
+            raise
+
+    return os.path.join(hostdir, LOGFILES[service] + \
+                                COMPRESSEDEXTENSIONS.get(compression, u''))
+
+def iter_log_entries(pool, path):
+    """ Yield every entry of a log collection, page after page. Members are
+    expanded in the collection request, services ignoring $expand have the
+    members of each page fetched concurrently.
+
+    :param pool: session pool of the server
+    :type pool: SessionPool.
+    :param path: path of the log entries collection
+    :type path: str.
+    """
+    nextpath = u'%s?$expand=.' % path.rstrip(u'/')
+    seen = set()
+
+    while nextpath and nextpath not in seen:
+        seen.add(nextpath)
+        response = pool.get(nextpath)
+
+        if response.status != 200:
+            raise NoContentsFoundForOperationError(u"Unable to read %s, " \
+                                u"status %s." % (nextpath, response.status))
+
+        data = response.dict or {}
+        members = data.get(u'Members', [])
+        links = [odata_id(member) for member in members if \
+                                        set(member) <= set([u'@odata.id'])]
+
+        if links:
+            members = [member.dict for member in pool.getall(links)]
+
+        for member in members:
+            if isinstance(member, dict):
+                yield member
+
+        nextpath = data.get(u'Members@odata.nextLink')
+
+def discover_ahs(pool):
+    """ Active Health System resource of the manager of a server
+
+    :param pool: session pool of the server
+    :type pool: SessionPool.
+    :returns: AHS resource dictionary
+    """
+    paths = []
+
+    try:
+        managers = odata_id((pool.get(u'/redfish/v1/').dict or {})\
+                                                                [u'Managers'])
+        manager = pool.get(odata_id(pool.get(managers).dict[u'Members'][0]))\
+                                                                        .dict
+        for oem in (manager.get(u'Oem') or {}).values():
+            link = odata_id(((oem or {}).get(u'Links') or {}).get(\
+                                                    u'ActiveHealthSystem'))
+            if link:
+                paths.append(link)
+    except (AttributeError, IndexError, KeyError, TypeError):
+        pass
+
+    paths.append(u'/redfish/v1/Managers/1/ActiveHealthSystem/')
+
+    for path in paths:
+        response = pool.get(path)
+
+        if response.status == 200 and response.dict:
+            return response.dict
+
+    raise NoContentsFoundForOperationError(u"Unable to find the AHS of %s." % \
+                                                                pool.baseurl)
+
+def ahs_location(ahs):
+    """ Download path of the AHS log as given by the service, it ends with
+    the query downloading the whole log
+
+    :param ahs: AHS resource
+    :type ahs: dict.
+    """
+    links = ahs.get(u'Links') or ahs.get(u'links') or {}
+
+    try:
+        return links[u'AHSLocation'][u'extref']
+    except (KeyError, TypeError):
+        raise NoContentsFoundForOperationError(u"Unable to find the AHS "\
+                                                        u"download location.")
+
+def write_manifest(outdir, results):
+    """ Write the manifest of a collection next to the host directories
+
+    :param outdir: output directory of the collection
+    :type outdir: str.
+    :param results: per server results
+    :type results: list.
+    :returns: path of the manifest
+    """
+    filename = os.path.join(outdir, u'manifest.json')
+    manifest = {u'Created': time.strftime(u'%Y-%m-%dT%H:%M:%SZ', \
+                                                            time.gmtime()), \
+                u'Servers': results}
+
+    with open(filename, 'w') as output:
+        json.dump(manifest, output, indent=2, sort_keys=True)
+
+    return filename
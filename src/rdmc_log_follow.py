@@ -0,0 +1,337 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+"""Follow the IML and IEL of servers as new entries are logged"""
+
+#---------Imports---------
+
+import json
+
+from rdmc_helper import LOGGER, NoContentsFoundForOperationError
+from rdmc_log_sync import entry_key, is_newer
+
+#---------End of imports---------
+
+#log service name and the collection holding it
+LOGSERVICES = {u'IML': u'Systems', u'IEL': u'Managers'}
+#entries read per request when paging back through a log
+FOLLOWPAGESIZE = 32
+
+def odata_id(value):
+    """ @odata.id of a link, None when missing """
+    return value.get(u'@odata.id') if isinstance(value, dict) else None
+
+def discover_log_path(pool, service):
+    """ Find the entries collection of the IML or IEL of a Redfish server
+
+    :param pool: session pool of the server
+    :type pool: SessionPool.
+    :param service: IML or IEL
+    :type service: str.
+    """
+    root = pool.get(u'/redfish/v1/').dict or {}
+    collection = odata_id(root.get(LOGSERVICES[service]))
+
+    try:
+        member = odata_id(pool.get(collection).dict[u'Members'][0])
+        logservices = odata_id(pool.get(member).dict[u'LogServices'])
+
+        for link in pool.get(logservices).dict[u'Members']:
+            if odata_id(link).rstrip(u'/').lower().endswith(u'/' + \
+                                                            service.lower()):
+                return odata_id(pool.get(odata_id(link)).dict[u'Entries'])
+    except (AttributeError, IndexError, KeyError, TypeError):
+        pass
+
+    raise NoContentsFoundForOperationError(u"Unable to find the %s of %s." % \
+                                                    (service, pool.baseurl))
+
+class LogFollower(object):
+    """ Poll one log for new entries. The collection is probed with a
+    conditional request, then read a page at a time from its newest end
+    until an entry that is not newer than the last one written is reached.
+    Services list the entries newest or oldest first, which end is the
+    newest is learned from the two ends of the log. The interval grows
+    while nothing is logged. """
+    def __init__(self, pool, path, host, service, writer, interval=5.0, \
+                                            maxinterval=60.0, entryfilter=None):
+        self.pool = pool
+        self.path = path
+        self.host = host
+        self.service = service
+        self.writer = writer
+        self.mininterval = interval
+        self.maxinterval = max(interval, maxinterval)
+        self.interval = interval
+        self.entryfilter = entryfilter
+        self.etag = None
+        self.count = None
+        self.mark = None
+        self.newestfirst = None
+
+    def probe(self):
+        """ Number of entries in the log, None when unchanged since the last
+        probe """
+        headers = {'If-None-Match': self.etag} if self.etag else None
+        response = self.pool.get(self.path, headers=headers)
+
+        if response.status == 304:
+            return None
+        elif response.status != 200:
+            raise NoContentsFoundForOperationError(u"Unable to read %s, " \
+                                        u"status %s." % (self.path, \
+                                                        response.status))
+
+        self.etag = response.getheader('etag')
+        data = response.dict or {}
+
+        return data.get(u'Members@odata.count', len(data.get(u'Members', [])))
+
+    def entries(self, skip=0, top=None):
+        """ Entries of the log, members are expanded one by one when the
+        service ignores $expand and sliced when it ignores $skip or $top
+
+        :param skip: number of entries skipped
+        :type skip: int.
+        :param top: number of entries read, None for all
+        :type top: int.
+        """
+        query = u'%s?$expand=.' % self.path
+
+        if skip:
+            query += u'&$skip=%s' % skip
+        if top:
+            query += u'&$top=%s' % top
+
+        data = self.pool.get(query).dict
+        members = (data or {}).get(u'Members', [])
+        total = (data or {}).get(u'Members@odata.count')
+
+        if (skip or top) and total and len(members) == total:
+            members = members[skip:skip + top if top else None]
+
+        links = [odata_id(member) for member in members if \
+                                        set(member) <= set([u'@odata.id'])]
+
+        if links:
+            members = [response.dict for response in self.pool.getall(links)]
+
+        return [member for member in members if isinstance(member, dict)]
+
+    def newest(self, count):
+        """ The newest entry of the log, learning which end of the log
+        the service lists it at
+
+        :param count: number of entries in the log
+        :type count: int.
+        """
+        if not count:
+            return None
+
+        first = self.entries(top=1)
+        last = self.entries(skip=count - 1, top=1) if count > 1 else first
+
+        if first and last and entry_key(first[0]) != entry_key(last[0]):
+            self.newestfirst = entry_key(first[0]) > entry_key(last[0])
+
+        return max(first + last, key=entry_key) if first or last else None
+
+    def newentries(self, count, added=None):
+        """ Entries newer than the mark, oldest first, read a page at a
+        time from the newest end of the log until an entry that is not
+        newer than the mark is reached
+
+        :param count: number of entries in the log
+        :type count: int.
+        :param added: number of entries the log grew by, the first page
+                      reads one more so that the end of the new entries is
+                      seen in the same request
+        :type added: int.
+        """
+        if self.newestfirst is None and count > 1:
+            self.newest(count)
+
+        if self.newestfirst is None:
+            #a log of one entry, or one whose ends look alike
+            return sorted([entry for entry in self.entries() if \
+                                is_newer(entry, self.mark)], key=entry_key)
+
+        found = {}
+        read = 0
+        size = added + 1 if added else FOLLOWPAGESIZE
+
+        while read < count:
+            size = min(size, count - read)
+            skip = read if self.newestfirst else count - read - size
+            page = self.entries(skip=skip, top=size)
+            fresh = [entry for entry in page if is_newer(entry, self.mark)]
+            found.update((entry_key(entry), entry) for entry in fresh)
+            read += size
+
+            if not page or len(fresh) < len(page):
+                break
+
+            size = FOLLOWPAGESIZE
+
+        return [found[key] for key in sorted(found)]
+
+    def poll(self):
+        """ Check the log once and write its new entries
+
+        :returns: number of new entries
+        """
+        count = self.probe()
+
+        if count is None:
+            return 0
+
+        if self.count is None:
+            #first poll, only the newest entry is needed for the watermark
+            self.count = count
+            self.mark = self.newest(count)
+
+            return 0
+
+        #a count that did not grow is a full log that wrapped or a log that
+        #was cleared and refilled, so the number of new entries is unknown
+        newentries = self.newentries(count, added=count - self.count if \
+                                                    count > self.count else None)
+
+        self.count = count
+
+        if newentries:
+            self.mark = max(newentries + ([self.mark] if self.mark else []), \
+                                                                key=entry_key)
+
+        for entry in newentries:
+            if self.entryfilter and not self.entryfilter.match(entry):
+                continue
+
+            self.writer.write(json.dumps({u'host': self.host, u'log': \
+                                            self.service, u'entry': entry}))
+
+        return len(newentries)
+
+    def run(self, stopevent):
+        """ Poll until stopevent is set
+
+        :param stopevent: event ending the loop
+        :type stopevent: threading.Event.
+        """
+        while not stopevent.is_set():
+            try:
+                if self.poll():
+                    self.interval = self.mininterval
+                else:
+                    self.interval = min(self.interval * 1.5, self.maxinterval)
+            except Exception, excp:
+                LOGGER.info(u"Polling %s of %s failed: %s" % (self.service, \
+                                                            self.host, excp))
+                self.interval = self.maxinterval
+
+            stopevent.wait(self.interval)
+
+def stream_lines(response):
+    """ Lines of a streamed response as they arrive, read a line or a chunk
+    at a time from the socket. A chunk is read whole since its size is
+    known, so no read waits for data the server has not sent yet.
+
+    :param response: response returned by SessionPool.stream
+    :type response: httplib.HTTPResponse or PooledResponse.
+    """
+    if not hasattr(response, 'fp'):
+        #local sessions return the whole body at once
+        for line in (response.text or '').splitlines(True):
+            yield line
+        return
+
+    if not response.chunked:
+        while True:
+            line = response.fp.readline()
+
+            if not line:
+                return
+
+            yield line
+
+    pending = ''
+
+    while True:
+        size = int(response.fp.readline().split(';')[0].strip() or '0', 16)
+
+        if not size:
+            return
+
+        pending += response.fp.read(size)
+        response.fp.readline()
+        lines = pending.split('\n')
+        pending = lines.pop()
+
+        for line in lines:
+            yield line + '\n'
+
+def follow_events(pool, host, writer, stopevent):
+    """ Write the events of the Redfish EventService server sent event
+    stream until stopevent is set
+
+    :param pool: session pool of the server
+    :type pool: SessionPool.
+    :param host: server address written with the events
+    :type host: str.
+    :param writer: thread safe line writer
+    :type writer: LineWriter.
+    :param stopevent: event ending the stream
+    :type stopevent: threading.Event.
+    :returns: False when the service has no event stream
+    """
+    try:
+        root = pool.get(u'/redfish/v1/EventService/').dict or {}
+    except Exception:
+        root = {}
+
+    uri = root.get(u'ServerSentEventUri')
+
+    if not uri:
+        return False
+
+    while not stopevent.is_set():
+        try:
+            response = pool.stream(uri, headers={'Accept': 'text/event-stream'})
+
+            if response.status != 200:
+                if hasattr(response, 'fp'):
+                    response.read()
+                return False
+
+            for line in stream_lines(response):
+                if stopevent.is_set():
+                    break
+
+                line = line.strip()
+
+                if line.startswith('data:'):
+                    try:
+                        event = json.loads(line[len('data:'):])
+                    except ValueError:
+                        continue
+
+                    writer.write(json.dumps({u'host': host, u'event': event}))
+        except Exception, excp:
+            LOGGER.info(u"Event stream of %s failed: %s" % (host, excp))
+            stopevent.wait(5)
+
+    return True
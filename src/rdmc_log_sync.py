@@ -0,0 +1,145 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+"""Per host watermarks of the newest log entries already collected"""
+
+#---------Imports---------
+
+import os
+import re
+import json
+import errno
+import tempfile
+import urlparse
+
+#---------End of imports---------
+
+__syncdir__ = 'logsync'
+
+def entry_key(entry):
+    """ Sort key of a log entry, creation time first and Id second
+
+    :param entry: log entry
+    :type entry: dict.
+    :returns: tuple of (created, id)
+    """
+    try:
+        ident = int(entry.get(u'Id', -1))
+    except (TypeError, ValueError):
+        ident = -1
+
+    return (entry.get(u'Created', u'') or u'', ident)
+
+def is_newer(entry, mark):
+    """ Check if a log entry is newer than a watermark
+
+    :param entry: log entry
+    :type entry: dict.
+    :param mark: watermark, None when nothing was collected yet
+    :type mark: dict.
+    """
+    if not mark:
+        return True
+
+    return entry_key(entry) > entry_key(mark)
+
+def member_id(href):
+    """ Numeric Id at the end of a log entry path, None if there is none
+
+    :param href: path of a log entry
+    :type href: str.
+    """
+    match = re.search(r'/(\d+)/?$', href or u'')
+
+    return int(match.group(1)) if match else None
+
+def host_key(url):
+    """ File name safe identifier of the server a url points to
+
+    :param url: url of the server, blobstore url for local sessions
+    :type url: str.
+    """
+    if not url or url.lower().startswith(u'blobstore'):
+        return u'local'
+
+    host = urlparse.urlparse(url if u'://' in url else u'https://' + url)
+
+    return re.sub(r'[^A-Za-z0-9_.-]', u'_', host.netloc or url)
+
+class LogWatermarks(object):
+    """ Newest entry collected for every log of one server, kept in a JSON
+    file of the cache directory """
+    def __init__(self, cachedir, url):
+        self.syncdir = os.path.join(cachedir, __syncdir__)
+        self.filename = os.path.join(self.syncdir, host_key(url) + '.json')
+        self._marks = None
+
+    @property
+    def marks(self):
+        """ Watermarks by log name """
+        if self._marks is None:
+            try:
+                with open(self.filename, 'r') as markfile:
+                    self._marks = json.load(markfile)
+            except (IOError, ValueError):
+                self._marks = {}
+
+        return self._marks
+
+    def get(self, logname):
+        """ Watermark of a log, None if it was never collected
+
+        :param logname: log name such as IML or IEL
+        :type logname: str.
+        """
+        return self.marks.get(logname, None)
+
+    def update(self, logname, entries):
+        """ Move the watermark of a log to the newest of the given entries
+        and write it out atomically
+
+        :param logname: log name such as IML or IEL
+        :type logname: str.
+        :param entries: entries that were collected
+        :type entries: list.
+        """
+        if not entries:
+            return
+
+        newest = max(entries, key=entry_key)
+
+        if not is_newer(newest, self.get(logname)):
+            return
+
+        (created, ident) = entry_key(newest)
+        self.marks[logname] = {u'Created': created, u'Id': ident}
+
+        try:
+            os.makedirs(self.syncdir)
+        except OSError, excp:
+            if excp.errno != errno.EEXIST:
+                raise
+
+        (fdesc, tmpname) = tempfile.mkstemp(dir=self.syncdir)
+
+        with os.fdopen(fdesc, 'w') as tmphndl:
+            tmphndl.write(json.dumps(self.marks, indent=2, sort_keys=True))
+
+        if os.name == 'nt' and os.path.exists(self.filename):
+            os.remove(self.filename)
+
+        os.rename(tmpname, self.filename)
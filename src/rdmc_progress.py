@@ -0,0 +1,297 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+"""Wait for long running operations such as firmware updates and resets by
+polling the state of a resource"""
+
+#---------Imports---------
+
+import sys
+import json
+import time
+
+from multiprocessing.pool import ThreadPool
+
+from rdmc_helper import LOGGER, TaskTimeoutError
+from rdmc_session_pool import SessionPool
+
+#---------End of imports---------
+
+#state of a resource that cannot be read, such as an iLO while it resets
+UNREACHABLE = u'Unreachable'
+AVAILABLE = u'Available'
+#outcomes of poll_many
+DONE = u'Done'
+FAILED = u'Failed'
+TIMEDOUT = u'TimedOut'
+SPINNER = ['|', '/', '-', '\\']
+
+class ProgressPoller(object):
+    """ Poll one resource until its state is final. Requests are conditional
+    on the ETag of the previous response, the interval starts short, grows
+    while the state does not change and is short again after a change. State
+    changes are shown on one updating line on a terminal and written as JSON
+    lines otherwise. """
+    def __init__(self, pool, path, statefunc, label=u'', interval=0.5, \
+                    maxinterval=10.0, timeout=None, output=None, quiet=False, \
+                                                                lines=False):
+        """
+        :param pool: session pool of the server
+        :type pool: SessionPool.
+        :param path: path of the resource to poll
+        :type path: str.
+        :param statefunc: returns the state of the resource dictionary
+        :type statefunc: callable.
+        :param label: name of the operation shown with the state
+        :type label: str.
+        :param timeout: seconds after which waiting fails, None for no limit
+        :type timeout: float.
+        :param lines: write each change on its own line on a terminal too,
+                      for many resources polled together
+        :type lines: boolean.
+        """
+        self.pool = pool
+        self.path = path
+        self.statefunc = statefunc
+        self.label = label
+        self.mininterval = interval
+        self.maxinterval = max(interval, maxinterval)
+        self.interval = interval
+        self.timeout = timeout
+        self.output = output or sys.stdout
+        self.quiet = quiet
+        self.istty = hasattr(self.output, 'isatty') and self.output.isatty()
+        self.lines = lines
+        self.etag = None
+        self.state = None
+        self.resource = None
+        self.history = []
+        self.starttime = None
+        self.nextpoll = 0
+        self._position = 0
+
+    @property
+    def elapsed(self):
+        """ Seconds since polling started """
+        return time.time() - self.starttime if self.starttime else 0.0
+
+    @property
+    def timedout(self):
+        """ True once the timeout has passed """
+        return bool(self.timeout) and self.elapsed >= self.timeout
+
+    def probe(self):
+        """ Read the state of the resource once
+
+        :returns: the state, UNREACHABLE when the resource cannot be read
+        """
+        headers = {'If-None-Match': self.etag} if self.etag else None
+
+        try:
+            response = self.pool.get(self.path, headers=headers)
+        except Exception, excp:
+            LOGGER.info(u"Polling %s failed: %s" % (self.path, excp))
+            self.etag = None
+            return UNREACHABLE
+
+        if response.status == 304 and self.state is not None:
+            return self.state
+        elif response.status != 200 or not isinstance(response.dict, dict):
+            self.etag = None
+            return UNREACHABLE
+
+        self.etag = response.getheader('etag')
+        self.resource = response.dict
+
+        try:
+            return self.statefunc(self.resource)
+        except (AttributeError, KeyError, TypeError):
+            return None
+
+    def wait(self, isdone, isfailed=None, error=TaskTimeoutError):
+        """ Poll until isdone returns True for the state
+
+        :param isdone: called with each new state, True when finished
+        :type isdone: callable.
+        :param isfailed: called with each new state, True when failed
+        :type isfailed: callable.
+        :param error: exception raised when isfailed returns True
+        :type error: class.
+        :returns: the final state
+        """
+        self.starttime = time.time()
+
+        while True:
+            if self.step():
+                if isdone(self.state):
+                    self.finish()
+                    return self.state
+                elif isfailed and isfailed(self.state):
+                    self.finish()
+                    raise error(u"%s failed, the state is %s." % \
+                                                    (self.label, self.state))
+
+            if self.timedout:
+                self.finish()
+                raise TaskTimeoutError(u"%s did not complete within %s " \
+                    u"seconds, the state is %s." % (self.label, \
+                                            int(self.timeout), self.state))
+
+            pause = self.interval
+
+            if self.timeout:
+                pause = min(pause, self.timeout - self.elapsed)
+
+            time.sleep(max(pause, 0))
+
+    def step(self):
+        """ Poll once, record and show the state and adapt the interval
+
+        :returns: True when the state changed
+        """
+        if self.starttime is None:
+            self.starttime = time.time()
+
+        state = self.probe()
+        changed = state != self.state or not self.history
+
+        if changed:
+            self.state = state
+            self.history.append(state)
+            self.interval = self.mininterval
+        else:
+            self.interval = min(self.interval * 1.5, self.maxinterval)
+
+        self.nextpoll = time.time() + self.interval
+        self.report(state, changed=changed)
+
+        return changed
+
+    def report(self, state, changed):
+        """ Show the state, after every poll on a terminal and only when it
+        changed as JSON lines otherwise
+
+        :param state: current state
+        :type state: str.
+        :param changed: the state differs from the previous poll
+        :type changed: boolean.
+        """
+        if self.quiet or not (changed or self.istty):
+            return
+
+        if self.istty and self.lines:
+            if not changed:
+                return
+
+            self.output.write(u"%s: %s\n" % (self.label, state))
+        elif self.istty:
+            self.output.write(u"\r%s: %s %s   " % (self.label, state, \
+                                            SPINNER[self._position % 4]))
+            self._position += 1
+        else:
+            self.output.write(json.dumps({u'time': time.strftime(\
+                        u'%Y-%m-%dT%H:%M:%SZ', time.gmtime()), u'operation': \
+                        self.label, u'path': self.path, u'state': state, \
+                        u'elapsed': round(time.time() - self.starttime, 1)}) \
+                                                                        + '\n')
+
+        self.output.flush()
+
+    def finish(self):
+        """ End the updating line of a terminal """
+        if self.istty and not (self.quiet or self.lines):
+            self.output.write(u'\n')
+            self.output.flush()
+
+def wait_for_reset(baseurl, label, timeout=600, output=None, quiet=False, \
+                                                            resetting=False):
+    """ Wait for an iLO to go away and answer again after a reset. The
+    service root is polled without a session, which does not survive the
+    reset.
+
+    :param baseurl: url of the iLO
+    :type baseurl: str.
+    :param label: name of the operation shown with the state
+    :type label: str.
+    :param timeout: seconds after which waiting fails
+    :type timeout: float.
+    :param resetting: iLO is known to have gone away already, it is waited
+                      for until it answers
+    :type resetting: boolean.
+    """
+    pool = SessionPool(None, workers=1, timeout=10, url=baseurl)
+    poller = ProgressPoller(pool, u'/redfish/v1/', lambda _: AVAILABLE, \
+                            label=label, interval=2.0, maxinterval=15.0, \
+                            timeout=timeout, output=output, quiet=quiet)
+
+    try:
+        return poller.wait(lambda state: state == AVAILABLE and (resetting \
+                                            or UNREACHABLE in poller.history))
+    finally:
+        pool.close()
+
+def poll_many(pollers, isdone, isfailed=None, workers=8):
+    """ Poll many resources together, such as the update services of a
+    group of servers, until each one is done, failed or out of time. The
+    resources due for a poll are polled concurrently, each at its own
+    adaptive interval.
+
+    :param pollers: one poller per resource, polled with lines=True
+    :type pollers: list.
+    :param isdone: called with a poller after each poll, True when finished
+    :type isdone: callable.
+    :param isfailed: called with a poller after each poll, True when failed
+    :type isfailed: callable.
+    :param workers: number of resources polled at the same time
+    :type workers: int.
+    :returns: dictionary of poller to DONE, FAILED or TIMEDOUT
+    """
+    outcomes = {}
+    pending = list(pollers)
+    threadpool = ThreadPool(max(1, min(workers, len(pending))))
+    starttime = time.time()
+
+    for poller in pending:
+        poller.starttime = starttime
+        poller.nextpoll = 0
+
+    try:
+        while pending:
+            now = time.time()
+            due = [poller for poller in pending if poller.nextpoll <= now]
+            threadpool.map(lambda poller: poller.step(), due)
+
+            for poller in due:
+                if isdone(poller):
+                    outcomes[poller] = DONE
+                elif isfailed and isfailed(poller):
+                    outcomes[poller] = FAILED
+                elif poller.timedout:
+                    outcomes[poller] = TIMEDOUT
+                else:
+                    continue
+
+                pending.remove(poller)
+
+            if pending:
+                time.sleep(max(min(poller.nextpoll for poller in pending) - \
+                                                            time.time(), 0))
+    finally:
+        threadpool.close()
+        threadpool.join()
+
+    return outcomes
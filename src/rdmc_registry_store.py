@@ -0,0 +1,603 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+"""Local content addressed store for registries and schemas shared between
+sessions to servers running the same firmware"""
+
+#---------Imports---------
+
+import os
+import re
+import json
+import time
+import errno
+import shutil
+import hashlib
+import tarfile
+import tempfile
+
+from StringIO import StringIO
+
+from rdmc_helper import LOGGER, InvalidFileInputError, \
+                    InvalidFileFormattingError
+
+#---------End of imports---------
+
+REGISTRIES = u'registries'
+SCHEMAS = u'schemas'
+
+__indexfile__ = 'index.json'
+__objectsdir__ = 'objects'
+
+def split_identifier(identifier):
+    """ Split a registry or schema identifier into name and version
+
+    :param identifier: identifier such as Base.1.0.0, iLO.0.10 or
+                       HpBiosAttributeRegistryP89.1.1.00
+    :type identifier: str.
+    :returns: tuple of (name, version), version is None when absent
+    """
+    identifier = identifier.strip().lstrip(u'#').rsplit(u'/', 1)[-1]
+
+    if identifier.endswith(u'.json'):
+        identifier = identifier[:-len(u'.json')]
+
+    identifier = identifier.split(u':')[0]
+    match = re.match(r'^([^.]+)\.v?(\d+(?:[._]\d+)*)', identifier)
+
+    if not match:
+        return (identifier, None)
+
+    return (match.group(1), match.group(2).replace(u'_', u'.'))
+
+def version_key(version):
+    """ Sort key of a dotted version, numeric parts compared as numbers
+
+    :param version: version such as 1.0.10
+    :type version: str.
+    """
+    return [int(x) if x.isdigit() else x for x in (version or u'').split(u'.')]
+
+def version_matches(version, wanted):
+    """ True when a version starts with the parts of a partial version, any
+    version matches no wanted version
+
+    :param version: full version
+    :type version: str.
+    :param wanted: full or partial version such as the major.minor of a
+                   MessageId
+    :type wanted: str.
+    """
+    if not wanted:
+        return True
+
+    wanted = wanted.split(u'.')
+    return (version or u'').split(u'.')[:len(wanted)] == wanted
+
+def content_digest(content):
+    """ Hash used to address stored content
+
+    :param content: registry or schema content
+    :type content: dict.
+    :returns: (digest, serialized content)
+    """
+    data = json.dumps(content, sort_keys=True, separators=(',', ':'))
+    return (hashlib.sha256(data).hexdigest(), data)
+
+def location_uri(locations):
+    """ Return the download uri out of a Location list, english preferred
+
+    :param locations: Location property of a registry or schema file
+    :type locations: list.
+    """
+    if isinstance(locations, dict):
+        locations = [locations]
+
+    uri = None
+    for location in locations or []:
+        value = location.get(u'Uri', None)
+
+        if isinstance(value, dict):
+            value = value.get(u'extref', None)
+
+        if not value:
+            continue
+
+        if location.get(u'Language', u'en') == u'en':
+            return value
+        elif not uri:
+            uri = value
+
+    return uri
+
+class RegistryStore(object):
+    """ Content addressed store of registries and schemas keyed by name,
+    version and hash """
+    def __init__(self, storedir, readonly=False):
+        self.storedir = storedir
+        self.readonly = readonly
+        self.objectsdir = os.path.join(storedir, __objectsdir__)
+        self.indexfile = os.path.join(storedir, __indexfile__)
+        self._index = None
+
+    @property
+    def index(self):
+        """ Lazily loaded store index """
+        if self._index is None:
+            self._index = self._readindex()
+
+        return self._index
+
+    def _readindex(self):
+        """ Read the index from disk """
+        index = {REGISTRIES: {}, SCHEMAS: {}}
+
+        try:
+            with open(self.indexfile, 'r') as indexhndl:
+                index.update(json.loads(indexhndl.read()))
+        except IOError:
+            pass
+        except ValueError:
+            LOGGER.warn(u"Registry store index '%s' is corrupt and will be "\
+                                                "rebuilt." % self.indexfile)
+
+        return index
+
+    def _writeindex(self):
+        """ Merge the in memory index with the one on disk and write it out
+        atomically so that concurrent sessions sharing the store do not lose
+        each others entries """
+        ondisk = self._readindex()
+
+        for kind, names in self.index.iteritems():
+            for name, versions in names.iteritems():
+                ondisk.setdefault(kind, {}).setdefault(name, {}).update(\
+                                                                    versions)
+
+        self._index = ondisk
+        self._atomicwrite(self.indexfile, json.dumps(ondisk, indent=2, \
+                                                            sort_keys=True))
+
+    def _makedirs(self):
+        """ Create the store directories """
+        try:
+            os.makedirs(self.objectsdir)
+        except OSError, excp:
+            if excp.errno != errno.EEXIST:
+                raise
+
+    def _atomicwrite(self, filename, data):
+        """ Write to a temporary file and move it into place """
+        (fdesc, tmpname) = tempfile.mkstemp(dir=self.storedir)
+
+        with os.fdopen(fdesc, 'wb') as tmphndl:
+            tmphndl.write(data)
+
+        if os.name == 'nt' and os.path.exists(filename):
+            os.remove(filename)
+
+        os.rename(tmpname, filename)
+
+    def _objectpath(self, digest):
+        """ Path of the object holding the given hash """
+        return os.path.join(self.objectsdir, digest + '.json')
+
+    def _readobject(self, digest):
+        """ Read and verify a stored object
+
+        :param digest: hash of the object
+        :type digest: str.
+        """
+        try:
+            with open(self._objectpath(digest), 'rb') as objhndl:
+                data = objhndl.read()
+        except IOError:
+            return None
+
+        if hashlib.sha256(data).hexdigest() != digest:
+            LOGGER.warn(u"Registry store object %s failed verification." % \
+                                                                        digest)
+            return None
+
+        return json.loads(data)
+
+    def find(self, kind, name, version=None):
+        """ Find the index entry for a name and version. Partial versions
+        such as the major.minor found in a MessageId match the highest
+        stored version starting with them.
+
+        :param kind: REGISTRIES or SCHEMAS
+        :type kind: str.
+        :param name: registry prefix or schema name
+        :type name: str.
+        :param version: full or partial version
+        :type version: str.
+        :returns: (version, entry) or (None, None)
+        """
+        versions = self.index.get(kind, {}).get(name, {})
+
+        if not versions:
+            return (None, None)
+
+        if version in versions:
+            return (version, versions[version])
+
+        candidates = [ver for ver in versions if version_matches(ver, version)]
+
+        if not candidates:
+            return (None, None)
+
+        best = max(candidates, key=version_key)
+        return (best, versions[best])
+
+    def lookup(self, kind, name, version=None):
+        """ Return the stored content for a name and version
+
+        :param kind: REGISTRIES or SCHEMAS
+        :type kind: str.
+        :param name: registry prefix or schema name
+        :type name: str.
+        :param version: full or partial version
+        :type version: str.
+        """
+        (_, entry) = self.find(kind, name, version)
+
+        if not entry:
+            return None
+
+        return self._readobject(entry[u'hash'])
+
+    def lookup_identifier(self, kind, identifier):
+        """ Return the stored content for an identifier such as Base.1.0
+
+        :param kind: REGISTRIES or SCHEMAS
+        :type kind: str.
+        :param identifier: registry or schema identifier
+        :type identifier: str.
+        """
+        (name, version) = split_identifier(identifier)
+        return self.lookup(kind, name, version)
+
+    def add(self, kind, name, version, content, uri=None):
+        """ Add content to the store
+
+        :param kind: REGISTRIES or SCHEMAS
+        :type kind: str.
+        :param name: registry prefix or schema name
+        :type name: str.
+        :param version: registry or schema version
+        :type version: str.
+        :param content: registry or schema content
+        :type content: dict.
+        :param uri: uri the content was downloaded from
+        :type uri: str.
+        :returns: hash of the stored content
+        """
+        (digest, data) = content_digest(content)
+
+        if self.readonly:
+            return digest
+
+        self._makedirs()
+
+        if not os.path.isfile(self._objectpath(digest)):
+            self._atomicwrite(self._objectpath(digest), data)
+
+        self.index.setdefault(kind, {}).setdefault(name, {})[version or \
+                        u'0'] = {u'hash': digest, u'uri': uri, u'added': \
+                        time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}
+        self._writeindex()
+
+        return digest
+
+    def entries(self):
+        """ List all entries of the store as (kind, name, version, entry) """
+        result = []
+
+        for kind in sorted(self.index):
+            for name in sorted(self.index[kind]):
+                for version in sorted(self.index[kind][name]):
+                    result.append((kind, name, version, \
+                                            self.index[kind][name][version]))
+
+        return result
+
+    def clear(self):
+        """ Remove everything from the store """
+        self._index = {REGISTRIES: {}, SCHEMAS: {}}
+
+        if os.path.isdir(self.storedir):
+            shutil.rmtree(self.storedir)
+
+    def export_archive(self, filename):
+        """ Export the store to a gzip compressed tar archive
+
+        :param filename: archive to create
+        :type filename: str.
+        :returns: number of exported entries
+        """
+        entries = self.entries()
+
+        with tarfile.open(filename, 'w:gz') as archive:
+            for digest in set(entry[u'hash'] for (_, _, _, entry) in entries):
+                if os.path.isfile(self._objectpath(digest)):
+                    archive.add(self._objectpath(digest), arcname=\
+                                        __objectsdir__ + '/' + digest + '.json')
+
+            data = json.dumps(self.index, indent=2, sort_keys=True)
+            info = tarfile.TarInfo(__indexfile__)
+            info.size = len(data)
+            info.mtime = time.time()
+            archive.addfile(info, StringIO(data))
+
+        return len(entries)
+
+    def import_archive(self, filename):
+        """ Import an archive created by export_archive, only entries whose
+        content matches their hash are kept
+
+        :param filename: archive to import
+        :type filename: str.
+        :returns: number of imported entries
+        """
+        if not os.path.isfile(filename):
+            raise InvalidFileInputError(u"File '%s' doesn't exist." % filename)
+
+        try:
+            archive = tarfile.open(filename, 'r:*')
+        except tarfile.TarError:
+            raise InvalidFileFormattingError(u"File '%s' is not a registry "\
+                                                    "store archive." % filename)
+
+        imported = 0
+        with archive:
+            try:
+                index = json.loads(archive.extractfile(__indexfile__).read())
+            except (KeyError, ValueError):
+                raise InvalidFileFormattingError(u"File '%s' does not contain"\
+                                        " a valid registry index." % filename)
+
+            self._makedirs()
+
+            for kind, names in index.iteritems():
+                for name, versions in names.iteritems():
+                    for version, entry in versions.iteritems():
+                        digest = entry[u'hash']
+
+                        if not os.path.isfile(self._objectpath(digest)):
+                            try:
+                                data = archive.extractfile(__objectsdir__ + \
+                                                '/' + digest + '.json').read()
+                            except KeyError:
+                                continue
+
+                            if hashlib.sha256(data).hexdigest() != digest:
+                                LOGGER.warn(u"Skipping corrupt registry store "\
+                                            "object %s." % digest)
+                                continue
+
+                            self._atomicwrite(self._objectpath(digest), data)
+
+                        self.index.setdefault(kind, {}).setdefault(name, \
+                                                            {})[version] = entry
+                        imported += 1
+
+        self._writeindex()
+
+        return imported
+
+class RegistryFetcher(object):
+    """ Resolves registries and schemas of the logged in server through the
+    registry store, only downloading content the store does not hold """
+    def __init__(self, app, store, verbose=False):
+        self._app = app
+        self.store = store
+        self.verbose = verbose
+        self.downloaded = 0
+        self.reused = 0
+
+    def _get(self, path):
+        """ Silent GET returning the response dictionary """
+        results = self._app.get_handler(path, verbose=self.verbose, \
+                                                    service=True, silent=True)
+
+        if results and results.status == 200:
+            return results.dict
+
+        return None
+
+    def _collectionpath(self, collection):
+        """ Path of the Registries or JsonSchemas collection
+
+        :param collection: service root property name
+        :type collection: str.
+        """
+        prefix = self._app.current_client._rest_client.default_prefix
+        root = self._get(prefix)
+
+        if not root:
+            return None
+
+        for links in (root, root.get(u'links', {}), root.get(u'Links', {})):
+            if collection in links:
+                link = links[collection]
+                return link.get(u'@odata.id', link.get(u'href', None))
+
+        return None
+
+    def files(self, kind):
+        """ Metadata of the registry or schema files of the server
+
+        :param kind: REGISTRIES or SCHEMAS
+        :type kind: str.
+        """
+        path = self._collectionpath(u'Registries' if kind == REGISTRIES else \
+                                                                u'JsonSchemas')
+
+        if not path:
+            return []
+
+        data = None
+        if self._app.typepath.defs.isgen10:
+            data = self._get(path + u'?$expand=.')
+
+        if not data:
+            data = self._get(path)
+
+        if not data:
+            return []
+
+        members = data.get(u'Items', data.get(u'Members', []))
+        result = []
+
+        for member in members:
+            if u'Location' not in member:
+                href = member.get(u'@odata.id', member.get(u'links', {}).\
+                                            get(u'self', {}).get(u'href', None))
+                member = self._get(href) if href else None
+
+                if not member:
+                    continue
+
+            identifier = member.get(u'Registry', member.get(u'Schema', \
+                                                    member.get(u'Id', u'')))
+            uri = location_uri(member.get(u'Location', []))
+
+            if not identifier or not uri:
+                continue
+
+            (name, version) = split_identifier(identifier)
+            result.append((name, version, uri))
+
+        return result
+
+    def fetch(self, kind, name, version, uri):
+        """ Return content from the store or download and store it
+
+        :param kind: REGISTRIES or SCHEMAS
+        :type kind: str.
+        :param name: registry prefix or schema name
+        :type name: str.
+        :param version: registry or schema version
+        :type version: str.
+        :param uri: location to download the content from on a miss
+        :type uri: str.
+        """
+        content = self.store.lookup(kind, name, version)
+
+        if content is not None:
+            self.reused += 1
+            return content
+
+        content = self._get(uri)
+
+        if content is not None:
+            self.downloaded += 1
+            self.store.add(kind, name, version, content, uri=uri)
+
+        return content
+
+    def populate(self, kinds=(REGISTRIES,)):
+        """ Make sure every registry or schema of the server is in the store
+
+        :param kinds: kinds of content to populate
+        :type kinds: tuple.
+        :returns: dictionary of identifier to content
+        """
+        result = {}
+
+        for kind in kinds:
+            for (name, version, uri) in self.files(kind):
+                content = self.fetch(kind, name, version, uri)
+
+                if content is not None:
+                    result[(kind, name, version)] = content
+
+        return result
+
+    def get_error_messages(self):
+        """ Message registry lookup table in the same layout as the one
+        returned by RmcApp.get_error_messages """
+        messages = {}
+
+        for (_, name, _), content in self.populate().iteritems():
+            if u'Messages' in content:
+                messages[content.get(u'RegistryPrefix', name)] = \
+                                                            content[u'Messages']
+
+        return messages
+
+    def get_registry_messages(self, messageids):
+        """ Message registry lookup table of only the registries named by
+        the prefixes of some message ids. Each registry is read from the
+        store for the version in the message id, the registries of the
+        server are only listed and downloaded when the store misses one.
+
+        :param messageids: message ids such as iLO.2.1.SystemResetRequired
+        :type messageids: list.
+        :returns: lookup table in the layout of get_error_messages
+        """
+        messages = {}
+        missing = []
+
+        for (name, version) in sorted(set(split_identifier(messageid) for \
+                                                    messageid in messageids)):
+            content = self.store.lookup(REGISTRIES, name, version)
+
+            if content is None:
+                missing.append((name, version))
+            else:
+                self.reused += 1
+                messages.setdefault(name, {}).update(content.get(\
+                                                            u'Messages', {}))
+
+        files = self.files(REGISTRIES) if missing else []
+
+        for (name, version) in missing:
+            matches = [(fileversion, uri) for (filename, fileversion, uri) in \
+                    files if filename == name and version_matches(fileversion, \
+                                                                    version)]
+            if not matches:
+                continue
+
+            (fileversion, uri) = max(matches, key=lambda match: version_key(\
+                                                                    match[0]))
+            content = self.fetch(REGISTRIES, name, fileversion, uri)
+
+            if content and u'Messages' in content:
+                messages.setdefault(name, {}).update(content[u'Messages'])
+
+        return messages
+
+def get_registry_store(rdmc, readonly=None):
+    """ Return the registry store configured for this rdmc instance
+
+    :param rdmc: rdmc command object
+    :type rdmc: RdmcCommand.
+    :param readonly: do not write to the store, defaults to True when
+                     caching is disabled
+    :type readonly: boolean.
+    """
+    storedir = getattr(rdmc.opts, 'registry_dir', None)
+
+    if not storedir:
+        storedir = os.path.join(rdmc.opts.config_dir, 'registrystore')
+
+    if readonly is None:
+        readonly = not rdmc.app.config.get_cache()
+
+    return RegistryStore(storedir, readonly=readonly)
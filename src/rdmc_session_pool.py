@@ -0,0 +1,420 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+"""Pool of keep-alive connections sharing the session of the logged in
+server, used to issue independent requests concurrently"""
+
+#---------Imports---------
+
+import ssl
+import json
+import time
+import base64
+import socket
+import httplib
+import urlparse
+import threading
+
+from multiprocessing.pool import ThreadPool
+
+from rdmc_helper import LOGGER, NoCurrentSessionEstablished
+
+#---------End of imports---------
+
+#requests are retried once when a kept alive connection was closed by iLO
+RETRYERRORS = (httplib.BadStatusLine, httplib.CannotSendRequest, \
+               httplib.ResponseNotReady, socket.error)
+#methods that are safe to send again when the response was lost
+IDEMPOTENTMETHODS = ('GET', 'HEAD')
+
+def _clientattr(restclient, name):
+    """ Read a RestClientBase attribute through its getter or private name
+
+    :param restclient: rest client of the current session
+    :type restclient: RestClientBase.
+    :param name: attribute name without the leading underscores
+    :type name: str.
+    """
+    getter = getattr(restclient, 'get_' + name, None)
+
+    if getter:
+        try:
+            return getter()
+        except Exception:
+            pass
+
+    return getattr(restclient, '_RestClientBase__' + name, None)
+
+def _islocal(baseurl):
+    """ Check if a url is a local (blobstore) session
+
+    :param baseurl: url of the session
+    :type baseurl: str.
+    """
+    return not baseurl or baseurl.lower().startswith('blobstore')
+
+def session_url(app):
+    """ Url of the server the library is logged in to, for commands that
+    need it once the session is gone
+
+    :param app: rmc application holding the session
+    :type app: RmcApp.
+    :returns: (url, True for local sessions)
+    """
+    restclient = app.get_current_client()._rest_client
+    baseurl = _clientattr(restclient, 'base_url') or app.typepath.url
+
+    return (baseurl, _islocal(baseurl))
+
+def session_credentials(app):
+    """ User name and password the library logged in with, to log in again
+    after iLO resets
+
+    :param app: rmc application holding the session
+    :type app: RmcApp.
+    :returns: (username, password), None for what is not known
+    """
+    restclient = app.get_current_client()._rest_client
+
+    return (_clientattr(restclient, 'username'), _clientattr(restclient, \
+                                                                'password'))
+
+class PooledResponse(object):
+    """ Response returned by the pool, mirrors the parts of the redfish
+    library RestResponse used by the commands """
+    def __init__(self, status, headers, read, elapsed=0.0, request=None):
+        self.status = status
+        self.read = read
+        self.elapsed = elapsed
+        self.request = request
+        self._headers = [(key.lower(), value) for (key, value) in headers]
+        self._dict = None
+
+    @classmethod
+    def fromresponse(cls, response, elapsed=0.0, request=None):
+        """ Wrap a redfish library response
+
+        :param response: response returned by one of the app handlers
+        :type response: RestResponse.
+        """
+        headers = []
+
+        try:
+            headers = response._http_response.getheaders()
+        except Exception:
+            try:
+                headers = response.getheaders()
+            except Exception:
+                pass
+
+        return cls(response.status, headers or [], response.read, \
+                                            elapsed=elapsed, request=request)
+
+    @property
+    def text(self):
+        """ Body of the response as text """
+        return self.read
+
+    @property
+    def dict(self):
+        """ Body of the response decoded from JSON, None if not JSON """
+        if self._dict is None and self.read:
+            try:
+                self._dict = json.loads(self.read)
+            except ValueError:
+                pass
+
+        return self._dict
+
+    def getheader(self, name, default=None):
+        """ Return the value of a response header
+
+        :param name: header name
+        :type name: str.
+        """
+        name = name.lower()
+
+        for (key, value) in self._headers:
+            if key == name:
+                return value
+
+        return default
+
+    def getheaders(self):
+        """ Return all response headers as (name, value) pairs """
+        return list(self._headers)
+
+class SessionPool(object):
+    """ Keep-alive connections to the logged in server sharing its session.
+    Each worker thread owns one connection so requests are never interleaved
+    on a socket. Local (blobstore) sessions have a single channel, requests
+    are then serialized through the redfish library handlers. Pools for
+    servers the library is not logged in to take a url and a session id, or
+    no app at all to send unauthenticated requests. """
+    def __init__(self, app, workers=4, timeout=None, verbose=False, url=None, \
+                                                                sessionid=None):
+        self._app = app
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._threadpool = None
+        self.verbose = verbose
+        self.timeout = timeout
+
+        if sessionid or app is None:
+            restclient = None
+            self.baseurl = url
+        else:
+            restclient = app.get_current_client()._rest_client
+            (self.baseurl, _) = session_url(app)
+
+        self.islocal = _islocal(self.baseurl)
+        self.workers = 1 if self.islocal else max(1, int(workers))
+
+        self.authheaders = {}
+
+        if not self.islocal:
+            parsed = urlparse.urlparse(self.baseurl)
+            self.host = parsed.hostname
+            self.port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+            self.secure = parsed.scheme != 'http'
+
+            if sessionid:
+                self.authheaders['X-Auth-Token'] = sessionid
+                return
+            elif restclient is None:
+                return
+
+            sessionkey = _clientattr(restclient, 'session_key')
+
+            if sessionkey:
+                self.authheaders['X-Auth-Token'] = sessionkey
+            else:
+                authkey = _clientattr(restclient, 'authorization_key')
+
+                if not authkey:
+                    username = _clientattr(restclient, 'username')
+                    password = _clientattr(restclient, 'password')
+
+                    if username is None or password is None:
+                        raise NoCurrentSessionEstablished("The current "\
+                                    "session has neither a session key nor "\
+                                    "credentials to share.")
+
+                    authkey = 'Basic ' + base64.b64encode('%s:%s' % (\
+                                                        username, password))
+
+                self.authheaders['Authorization'] = authkey
+
+    def _connection(self, fresh=False):
+        """ Connection owned by the calling thread
+
+        :param fresh: drop the current connection and open a new one
+        :type fresh: boolean.
+        """
+        conn = getattr(self._local, 'conn', None)
+
+        if conn and not fresh:
+            return conn
+
+        if conn:
+            conn.close()
+
+        if self.secure:
+            kwargs = {}
+            if hasattr(ssl, '_create_unverified_context'):
+                kwargs['context'] = ssl._create_unverified_context()
+
+            conn = httplib.HTTPSConnection(self.host, self.port, \
+                                                timeout=self.timeout, **kwargs)
+        else:
+            conn = httplib.HTTPConnection(self.host, self.port, \
+                                                        timeout=self.timeout)
+
+        self._local.conn = conn
+
+        with self._lock:
+            self._connections.append(conn)
+
+        return conn
+
+    def _localrequest(self, method, path, body, headers):
+        """ Route a request through the redfish library handlers """
+        method = method.upper()
+        app = self._app
+        kwargs = dict(silent=True, service=True)
+
+        if headers:
+            kwargs['headers'] = headers
+
+        with self._lock:
+            if method == 'GET':
+                return app.get_handler(path, uncache=True, **kwargs)
+            elif method == 'HEAD':
+                return app.head_handler(path, silent=True, service=True)
+            elif method == 'DELETE':
+                return app.delete_handler(path, **kwargs)
+            elif method == 'PATCH':
+                return app.patch_handler(path, body, **kwargs)
+            elif method == 'PUT':
+                return app.put_handler(path, body, **kwargs)
+            elif method == 'POST':
+                return app.post_handler(path, body, **kwargs)
+
+        raise ValueError("Unsupported method '%s'" % method)
+
+    def request(self, method, path, body=None, headers=None):
+        """ Issue one request over the calling thread's connection
+
+        :param method: HTTP method
+        :type method: str.
+        :param path: path of the resource
+        :type path: str.
+        :param body: request body, dictionaries are sent as JSON
+        :type body: dict or str.
+        :param headers: additional request headers
+        :type headers: dict.
+        :returns: PooledResponse
+        """
+        starttime = time.time()
+        request = {'method': method.upper(), 'path': path}
+
+        if self.islocal:
+            response = self._localrequest(method, path, body, headers)
+            return PooledResponse.fromresponse(response, elapsed=time.time() \
+                                                - starttime, request=request)
+
+        reqheaders = {'Accept': '*/*', 'Connection': 'Keep-Alive', \
+                                                        'OData-Version': '4.0'}
+        reqheaders.update(self.authheaders)
+
+        if body is not None and not isinstance(body, basestring):
+            body = json.dumps(body)
+
+        if body is not None:
+            reqheaders['Content-Type'] = 'application/json'
+
+        if headers:
+            reqheaders.update(headers)
+
+        if self.verbose:
+            LOGGER.info(u"%s %s" % (method.upper(), path))
+
+        response = self._send(method.upper(), path, body, reqheaders)
+        data = response.read()
+
+        return PooledResponse(response.status, response.getheaders(), data, \
+                        elapsed=time.time() - starttime, request=request)
+
+    def stream(self, path, headers=None):
+        """ GET a path without reading the body, the returned response must
+        be read to the end before the calling thread sends another request
+
+        :param path: path of the resource
+        :type path: str.
+        :param headers: additional request headers
+        :type headers: dict.
+        :returns: httplib.HTTPResponse or, for local sessions, PooledResponse
+        """
+        if self.islocal:
+            return self.request('GET', path, headers=headers)
+
+        reqheaders = {'Accept': '*/*', 'Connection': 'Keep-Alive', \
+                                                        'OData-Version': '4.0'}
+        reqheaders.update(self.authheaders)
+
+        if headers:
+            reqheaders.update(headers)
+
+        if self.verbose:
+            LOGGER.info(u"GET %s" % path)
+
+        return self._send('GET', path, None, reqheaders)
+
+    def _send(self, method, path, body, headers):
+        """ Send a request, reconnecting once if the kept alive connection
+        was dropped. Requests that may have reached the server are only sent
+        again for GET and HEAD, so that an action or a login is never
+        carried out twice. """
+        for attempt in (0, 1):
+            conn = self._connection(fresh=attempt > 0)
+
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                return conn.getresponse()
+            except RETRYERRORS, excp:
+                if attempt or not (method in IDEMPOTENTMETHODS or \
+                                isinstance(excp, httplib.CannotSendRequest)):
+                    raise
+                LOGGER.info(u"Reconnecting after error: %s" % excp)
+
+    def get(self, path, headers=None):
+        """ GET a path, see request """
+        return self.request('GET', path, headers=headers)
+
+    def imap(self, func, items):
+        """ Apply func to every item with up to workers concurrent calls,
+        yielding the results in the order of items
+
+        :param func: function to call for every item
+        :type func: callable.
+        :param items: items to process
+        :type items: iterable.
+        """
+        if self.workers == 1:
+            for item in items:
+                yield func(item)
+            return
+
+        #worker threads, and so their connections, live as long as the pool
+        if not self._threadpool:
+            self._threadpool = ThreadPool(self.workers)
+
+        for result in self._threadpool.imap(func, items):
+            yield result
+
+    def map(self, func, items):
+        """ Apply func to every item concurrently, see imap
+
+        :returns: list of results in the order of items
+        """
+        return list(self.imap(func, items))
+
+    def getall(self, paths, headers=None):
+        """ GET every path concurrently
+
+        :param paths: paths to fetch
+        :type paths: list.
+        :returns: list of PooledResponse in the order of paths
+        """
+        return self.map(lambda path: self.get(path, headers=headers), paths)
+
+    def close(self):
+        """ Stop the worker threads and close all connections of the pool """
+        if self._threadpool:
+            self._threadpool.close()
+            self._threadpool.join()
+            self._threadpool = None
+
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+            self._connections = []
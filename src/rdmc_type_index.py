@@ -0,0 +1,166 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+"""Live sorted index of the types held in the monolith"""
+
+#---------Imports---------
+
+import bisect
+
+#---------End of imports---------
+
+#monolith buckets that hold downloaded schemas instead of resources
+SKIPPEDBUCKETS = [u'ob']
+
+def short_type(typestr):
+    """ Simplified type name, #Bios.v1_0_0.Bios becomes Bios.v1_0_0
+
+    :param typestr: full type name
+    :type typestr: str.
+    """
+    if typestr.startswith(u'#'):
+        return typestr[1:].rsplit(u'.', 1)[0]
+
+    return typestr
+
+class SortedCounter(object):
+    """ Sorted list of unique names with a reference count per name """
+    def __init__(self):
+        self.names = []
+        self.counts = {}
+
+    def add(self, name):
+        """ Add a reference to name
+
+        :param name: name to add
+        :type name: str.
+        """
+        if name in self.counts:
+            self.counts[name] += 1
+            return
+
+        self.counts[name] = 1
+        bisect.insort(self.names, name)
+
+    def remove(self, name):
+        """ Drop a reference to name
+
+        :param name: name to remove
+        :type name: str.
+        """
+        if name not in self.counts:
+            return
+
+        self.counts[name] -= 1
+
+        if self.counts[name]:
+            return
+
+        del self.counts[name]
+        del self.names[bisect.bisect_left(self.names, name)]
+
+class TypeIndex(object):
+    """ Sorted full and simplified type names of the monolith. The index is
+    brought up to date before a read only when the monolith was crawled
+    since the last one, and then only the buckets whose number of instances
+    changed are read again. The monolith keeps the instances of a type in
+    the bucket of that type, so a bucket of the same size holds the same
+    types. """
+    def __init__(self):
+        self.full = SortedCounter()
+        self.short = SortedCounter()
+        self._monolith = None
+        self._signature = None
+        self._buckets = {}
+
+    def reset(self):
+        """ Drop everything from the index """
+        self.__init__()
+
+    def _bucketsignature(self, monolith):
+        """ Cheap value that changes whenever the monolith is crawled or
+        its buckets are loaded again """
+        return (id(monolith.types), len(monolith.types), len(getattr(\
+                                        monolith, '_visited_urls', ()) or ()))
+
+    def sync(self, app):
+        """ Update the index with the resources crawled or removed since the
+        last call
+
+        :param app: rmc application holding the monolith
+        :type app: RmcApp.
+        """
+        monolith = app.current_client.monolith
+
+        if monolith is not self._monolith:
+            self.reset()
+            self._monolith = monolith
+
+        signature = self._bucketsignature(monolith)
+
+        if signature == self._signature:
+            return
+
+        for bucket in set(self._buckets) - set(monolith.types):
+            self._update(bucket, 0, [])
+
+        for bucket, content in monolith.types.iteritems():
+            if bucket in SKIPPEDBUCKETS:
+                continue
+
+            instances = content.get(u'Instances', [])
+
+            if self._buckets.get(bucket, (0, None))[0] != len(instances):
+                self._update(bucket, len(instances), [instance.type for \
+                                        instance in instances if instance.type])
+
+        self._signature = signature
+
+    def _update(self, bucket, count, types):
+        """ Replace the types contributed by a monolith bucket
+
+        :param bucket: monolith types key
+        :type bucket: str.
+        :param count: number of instances in the bucket
+        :type count: int.
+        :param types: full type names of the instances
+        :type types: list.
+        """
+        for typestr in self._buckets.get(bucket, (0, []))[1]:
+            self.full.remove(typestr)
+            self.short.remove(short_type(typestr))
+
+        for typestr in types:
+            self.full.add(typestr)
+            self.short.add(short_type(typestr))
+
+        if count:
+            self._buckets[bucket] = (count, types)
+        else:
+            self._buckets.pop(bucket, None)
+
+    def types(self, app, fulltypes=False):
+        """ Sorted list of the selectable types
+
+        :param app: rmc application holding the monolith
+        :type app: RmcApp.
+        :param fulltypes: return full type names instead of simplified ones
+        :type fulltypes: boolean.
+        """
+        self.sync(app)
+
+        return list(self.full.names if fulltypes else self.short.names)
@@ -0,0 +1,171 @@
+###
+# Copyright 2017 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+"""Virtual media of servers reached over their own sessions, discovered
+once per iLO model"""
+
+#---------Imports---------
+
+import threading
+
+from rdmc_collection import collection_members, link_path
+from rdmc_helper import NoContentsFoundForOperationError
+
+#---------End of imports---------
+
+def manager_model(pool):
+    """ Model and Oem key of the iLO of a server, from its service root
+
+    :param pool: session pool of the server
+    :type pool: SessionPool.
+    :returns: (model such as iLO 5, Hpe or Hp, service root)
+    """
+    root = pool.get(u'/redfish/v1/').dict or {}
+
+    for oem in (u'Hpe', u'Hp'):
+        try:
+            return (root[u'Oem'][oem][u'Manager'][0][u'ManagerType'], oem, root)
+        except (IndexError, KeyError, TypeError):
+            pass
+
+    return (None, u'Hpe' if u'Hpe' in (root.get(u'Oem') or {}) else u'Hp', \
+                                                                        root)
+
+def media_action(media, oem, name):
+    """ Target and action name of an Oem action of a virtual media, named
+    the way the virtualmedia command names it for each iLO
+
+    :param media: virtual media resource
+    :type media: dict.
+    :param oem: Oem key of the server
+    :type oem: str.
+    :param name: InsertVirtualMedia or EjectVirtualMedia
+    :type name: str.
+    :returns: (target, action), (None, None) when there is no such action
+    """
+    actions = ((media.get(u'Oem') or {}).get(oem) or {}).get(u'Actions') or {}
+
+    for (item, value) in actions.iteritems():
+        if name in item:
+            return (value[u'target'], item.split(u'#')[-1] if u'Hpe' in item \
+                                                                    else name)
+
+    return (None, None)
+
+def discover_media(pool, root, oem, mediaid):
+    """ Path and actions of one virtual media of a server
+
+    :param pool: session pool of the server
+    :type pool: SessionPool.
+    :param root: service root of the server
+    :type root: dict.
+    :param oem: Oem key of the server
+    :type oem: str.
+    :param mediaid: Id of the virtual media, such as 2 for the CD/DVD
+    :type mediaid: str.
+    :returns: dictionary of Path, Insert and Eject, each action (target,
+              action) or (None, None)
+    """
+    try:
+        managers = pool.get(link_path(root[u'Managers'])).dict
+        manager = pool.get(link_path(managers[u'Members'][0])).dict
+        path = link_path(manager[u'VirtualMedia'])
+    except (IndexError, KeyError, TypeError):
+        raise NoContentsFoundForOperationError(u"Unable to find the virtual "\
+                                        u"media of %s." % pool.baseurl)
+
+    for media in collection_members(pool, path):
+        if u'%s' % media.get(u'Id') == u'%s' % mediaid:
+            return {u'Path': link_path(media), u'Insert': media_action(\
+                    media, oem, u'InsertVirtualMedia'), u'Eject': \
+                    media_action(media, oem, u'EjectVirtualMedia')}
+
+    raise NoContentsFoundForOperationError(u"Virtual media %s does not exist "\
+                                                u"on %s." % (mediaid, pool.baseurl))
+
+def media_requests(media, oem, image=None, bootnextreset=False):
+    """ Requests inserting an image into a virtual media, or ejecting it
+    when there is no image
+
+    :param media: virtual media as returned by discover_media
+    :type media: dict.
+    :param oem: Oem key of the server
+    :type oem: str.
+    :param image: URL of the image to insert
+    :type image: str.
+    :param bootnextreset: boot from the image on the next server reset
+    :type bootnextreset: boolean.
+    :returns: list of (method, path, body)
+    """
+    (target, action) = media[u'Insert'] if image else media[u'Eject']
+
+    if target:
+        body = {u'Action': action}
+
+        if image:
+            body[u'Image'] = image
+
+        requests = [('POST', target, body)]
+    else:
+        requests = [('PATCH', media[u'Path'], {u'Image': image})]
+
+    if image and bootnextreset:
+        requests.append(('PATCH', media[u'Path'], {u'Oem': {oem: {\
+                                        u'BootOnNextServerReset': True}}}))
+
+    return requests
+
+class MediaPaths(object):
+    """ Virtual media discovered once per iLO model and media Id. The
+    servers of a model share the same paths, so only the first server of
+    each model is searched, while the others of that model wait for it. """
+    def __init__(self):
+        self._media = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, discover):
+        """ Virtual media of a model, discovered when not known yet
+
+        :param key: model and media Id, None for a model that is not known
+        :type key: tuple.
+        :param discover: returns the virtual media of the current server
+        :type discover: callable.
+        :returns: (virtual media, True when found by an earlier server)
+        """
+        if key is None:
+            return (discover(), False)
+
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+
+        with lock:
+            if key in self._media:
+                return (self._media[key], True)
+
+            self._media[key] = discover()
+
+            return (self._media[key], False)
+
+    def forget(self, key):
+        """ Discover the virtual media of a model again
+
+        :param key: model and media Id
+        :type key: tuple.
+        """
+        with self._lock:
+            self._media.pop(key, None)